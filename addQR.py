@@ -2,33 +2,53 @@
 Flexible QR Code Generator for PDF Forms
 Supports multiple form types with different identifiers
 """
-import PyPDF2, qrcode, os, io, fitz, re
-from PIL import Image
-import tkinter as tk
-from tkinter import filedialog
+import io, os, re, shutil, logging
+from functools import lru_cache
+
+from manifest import Manifest, file_sha256, is_current, is_resumable
+from progress import Cancelled, Progress
+from form_profiles import DEFAULT_MARKER, DEFAULT_QR, profile_clips, resolve_form_profile
+from text_clean import DEFAULT_CLEANER, Cleaner, normalize_spaces
+from pdf_text import (INCREMENTAL_SAVE_OPTIONS, SAVE_OPTIONS, extract_identity_text, extract_page_text,
+                      extract_page_texts, extract_page_texts_parallel, has_marker)
+from run_log import RunStats, get_logger, setup_logging
+from text_cache import open_text_cache
+
+log = get_logger("addQR")
+
+# Number of distinct QR payloads kept rendered in memory
+QR_CACHE_SIZE = 512
+
+# Pages per incremental save in windowed mode (embed_qr_codes_in_pdf window=...)
+DEFAULT_WINDOW = 500
 
 def extract_text_from_pdf(pdf_file: str) -> dict[int, str]:
-    """Extract text from all pages of a PDF file"""
+    """Extract text from all pages of a PDF file (1-based page numbers), through the text cache"""
+    import fitz
     page_text_dict = {}
 
     try:
-        with open(pdf_file, 'rb') as pdf:
-            reader = PyPDF2.PdfReader(pdf)
-
-            for page_num in range(len(reader.pages)):
-                page = reader.pages[page_num]
-                page_text = page.extract_text()
-                page_text_dict[page_num + 1] = page_text
-
-    except FileNotFoundError:
-        print(f"Error: File '{pdf_file}' not found.")
-    except PyPDF2.errors.PdfReadError:
-        print(f"Error: Unable to read PDF file '{pdf_file}'.")
+        with fitz.open(pdf_file) as pdf_doc:
+            cache = open_text_cache(pdf_file, pdf_doc.page_count)
+            try:
+                page_text_dict = text_dict_from_pages(extract_page_texts(pdf_doc, cache=cache))
+            finally:
+                if cache is not None:
+                    cache.close()
+
+    except fitz.FileNotFoundError:
+        log.error(f"Error: File '{pdf_file}' not found.")
+    except fitz.FileDataError:
+        log.error(f"Error: Unable to read PDF file '{pdf_file}'.")
     except Exception as e:
-        print(f"An unexpected error occurred: {e}")
+        log.error(f"An unexpected error occurred: {e}")
 
     return page_text_dict
 
+def text_dict_from_pages(page_texts: list[str]) -> dict[int, str]:
+    """Convert a 0-based list of page texts to the 1-based dict used here"""
+    return {page_num + 1: page_text for page_num, page_text in enumerate(page_texts)}
+
 def extract_identity_data(text: str) -> str:
     """
     Extract identity/location data from text using flexible pattern matching.
@@ -51,230 +71,615 @@ def extract_identity_data(text: str) -> str:
 
     return result
 
-def generate_qr_code_for_text(text: str, filename: str):
-    """Generate QR code from text with extensive cleaning and logging"""
+def new_qr_code(data: str) -> "qrcode.QRCode":
+    """QR code object with the tools' settings and data added (nothing computed yet)"""
+    # Imported on first use: runs that never render a QR code (scans,
+    # previews, skipped inputs) do not pay for qrcode and PIL
+    import qrcode
+
     qr = qrcode.QRCode(
         version=None,  # Auto-adjust version based on data size
         error_correction=qrcode.constants.ERROR_CORRECT_H,  # High error correction (30%)
         box_size=10,
         border=4,
     )
+    qr.add_data(data)
+    return qr
 
-    # LOG: Original text
-    print(f"\n  [LOG] ORIGINAL TEXT (length={len(text)}):")
-    print(f"  {'-'*70}")
-    print(f"  {text[:200]}")
-    if len(text) > 200:
-        print(f"  ... (truncated, total {len(text)} chars)")
-    print(f"  {'-'*70}")
+def make_qr_code(data: str) -> "qrcode.QRCode":
+    """Build the QR code for already cleaned data (matrix only, no image)"""
+    qr = new_qr_code(data)
+    qr.make(fit=True)
+    return qr
 
-    # Clean the text more thoroughly
-    filtered_text = text.strip()
+def qr_module_count(data: str) -> int:
+    """Modules per side, border included, of the QR code for data (version only, no matrix)"""
+    qr = new_qr_code(data)
+    return qr.best_fit() * 4 + 17 + 2 * qr.border
+
+@lru_cache(maxsize=QR_CACHE_SIZE)
+def render_qr_png(data: str) -> tuple[bytes, int]:
+    """
+    Render QR code for already cleaned data as PNG bytes (in memory).
+    Memoized by payload, returns (png_bytes, qr_version).
+    """
+    qr = make_qr_code(data)
+
+    img = qr.make_image(fill_color="black", back_color="white")
+    png = io.BytesIO()
+    img.save(png, format='PNG')
+
+    return png.getvalue(), qr.version
+
+def dark_runs(row: list[bool]) -> list[tuple[int, int]]:
+    """(start, length) of every run of dark modules in one matrix row"""
+    runs = []
+    x = 0
+    while x < len(row):
+        if row[x]:
+            start = x
+            while x < len(row) and row[x]:
+                x += 1
+            runs.append((start, x - start))
+        else:
+            x += 1
+    return runs
+
+@lru_cache(maxsize=QR_CACHE_SIZE)
+def render_qr_pdf(data: str) -> tuple[bytes, int]:
+    """
+    Render QR code as the content stream of a unit-square Form XObject:
+    one cm scales the module grid (white quiet zone included) to 1x1, dark
+    runs are integer rectangles, merged down while the next rows repeat
+    them, and filled as a single path. No PIL image or PNG encoding.
+    Memoized by payload, returns (content_bytes, qr_version).
+    """
+    qr = make_qr_code(data)
+    matrix = qr.get_matrix()  # includes the border
+    modules = len(matrix)
+
+    # PDF y axis points up: row y covers modules-y-1 .. modules-y
+    ops = [f"{1 / modules:.6g} 0 0 {1 / modules:.6g} 0 0 cm 1 g 0 0 {modules} {modules} re f 0 g"]
+    open_runs = {}  # (start, length) -> first row of a run still repeated
+    for y, row in enumerate(matrix + [[]]):
+        runs = set(dark_runs(row))
+        for run in sorted(run for run in open_runs if run not in runs):
+            top = open_runs.pop(run)
+            ops.append(f"{run[0]} {modules - y} {run[1]} {y - top} re")
+        for run in runs:
+            open_runs.setdefault(run, y)
+    ops.append("f")
+
+    return "\n".join(ops).encode(), qr.version
+
+def log_text_block(title: str, text: str, limit: int = 200, indent: str = "  "):
+    """DEBUG dump of a (truncated) text, e.g. the payload at each cleaning step"""
+    log.debug(f"\n{indent}[LOG] {title} (length={len(text)}):")
+    log.debug(f"{indent}{'-'*70}")
+    log.debug(f"{indent}{text[:limit] if text else '<EMPTY - NO DATA LEFT>'}")
+    if len(text) > limit:
+        log.debug(f"{indent}... (truncated, total {len(text)} chars)")
+    log.debug(f"{indent}{'-'*70}")
+
+def generate_qr_code_for_text(text: str, qr_mode: str = "raster", stats: RunStats = None,
+                              cleaner: Cleaner = DEFAULT_CLEANER) -> tuple[str, bytes]:
+    """
+    Generate QR code from text with extensive cleaning and logging.
+    Returns (cleaned_payload, image_bytes); nothing is written to disk.
+    image_bytes is a PNG for qr_mode="raster" and a Form XObject content stream for "vector".
+    Header strings are removed with the cleaner's (form profile's) vocabulary.
+    The step-by-step text dumps are only produced at DEBUG level.
+    """
+    stats = stats or RunStats()
+    debug = log.isEnabledFor(logging.DEBUG)
+    if debug:
+        log_text_block("ORIGINAL TEXT", text)
 
     # Remove all newlines and extra spaces
-    filtered_text = ' '.join(filtered_text.split())
-
-    # LOG: After normalizing spaces
-    print(f"\n  [LOG] AFTER NORMALIZING SPACES (length={len(filtered_text)}):")
-    print(f"  {'-'*70}")
-    print(f"  {filtered_text[:200]}")
-    if len(filtered_text) > 200:
-        print(f"  ... (truncated, total {len(filtered_text)} chars)")
-    print(f"  {'-'*70}")
-
-    # Remove common headers and labels
-    remove_strings = [
-        "SERUTI24.DSRT", "DAFTAR SAMPEL RUMAH TANGGA", "RAHASIA",
-        "BLOK I. IDENTITAS SAMPEL BLOK SENSUS", "1. Provinsi",
-        "2. Kabupaten/Kota", "3. Kecamatan", "4. Desa/Kelurahan",
-        "5. Klasifikasi Desa/Kelurahan", "7. Nomor Kode Sampel (NKS)Perkotaan",
-        "BLOK II. KETERANGAN PETUGAS", "Nama Pencacah",
-        "Pedesaan", "Perkotaan", "Nomor Blok Sensus", "Tgl. Pelaksanaan",
-        "Tanda Tangan", "Nama Pengawas", "BLOK III. CATATAN",
-        "SURVEI EKONOMI RUMAH TANGGA TRIWULANAN 2024", "Triwulan 2",
-        "BLOK I. IDENTITAS SAMPEL SATUAN LINGKUNGAN SETEMPAT",
-        "6. Kode SLS/Sub-SLS", "8. Satuan Lingkungan Setempat (SLS)",
-        "BLOK II. REKAPITULASI HASIL PEMUTAKHIRAN",
-        "BLOK III. KETERANGAN PETUGAS", "BLOK IV. CATATAN",
-        "Identitas Blok Sensus", "Identitas SLS",
-        "SURVEI SOSIAL EKONOMI NASIONAL 2020",
-        "DAFTAR PEMUTAKHIRAN RUMAH TANGGA", "Sumber Data : DTSEN",
-        "SAMPEL SERUTI", "BLOK I.", "BLOK II.", "BLOK III.", "BLOK IV.",
-        "Kabupaten/Kota *)", "Desa/Kelurahan *)", "*) Coret yang tidak perlu"
-    ]
-
-    for s in remove_strings:
-        filtered_text = filtered_text.replace(s, "")
-
-    # Remove extra spaces again after replacements
-    filtered_text = ' '.join(filtered_text.split()).strip()
-
-    # LOG: After filtering
-    print(f"\n  [LOG] AFTER FILTERING (length={len(filtered_text)}):")
-    print(f"  {'-'*70}")
-    if filtered_text:
-        print(f"  {filtered_text}")
-    else:
-        print(f"  <EMPTY - NO DATA LEFT>")
-    print(f"  {'-'*70}")
+    filtered_text = normalize_spaces(text)
+    if debug:
+        log_text_block("AFTER NORMALIZING SPACES", filtered_text)
+
+    # Remove common headers and labels and extra spaces
+    filtered_text = cleaner.strip_headers(filtered_text)
+    if debug:
+        log_text_block("AFTER FILTERING", filtered_text, limit=len(filtered_text))
 
     # Ensure we have data to encode
     if not filtered_text:
-        print(f"\n  [WARNING] No data after filtering! Using 'NO_DATA'")
+        log.warning(f"  [WARNING] No data after filtering! Using 'NO_DATA'")
         filtered_text = "NO_DATA"
+        stats.count("no_data")
 
-    # LOG: Final data to encode
-    print(f"\n  [LOG] FINAL DATA TO ENCODE IN QR:")
-    print(f"  {'-'*70}")
-    print(f"  {filtered_text}")
-    print(f"  {'-'*70}")
-    print(f"  Length: {len(filtered_text)} characters")
+    if debug:
+        log_text_block("FINAL DATA TO ENCODE IN QR", filtered_text, limit=len(filtered_text))
 
-    qr.add_data(filtered_text)
-    qr.make(fit=True)
+    render = render_qr_pdf if qr_mode == "vector" else render_qr_png
+    with stats.stage("qr_render"):
+        image_bytes, version = render(filtered_text)
 
-    img = qr.make_image(fill_color="black", back_color="white")
-    img.save(filename)
+    log.debug(f"  QR Code Version: {version}")
+    stats.observe("qr_version", version)
 
-    print(f"  QR Code Version: {qr.version}")
+    return filtered_text, image_bytes
 
-def embed_qr_codes_in_pdf(pdf_file: str, search_text: str, search_text_id: str, qr: object):
-    """
-    Embed QR codes in PDF with flexible keyword matching.
-    Searches for multiple possible identifiers in the next page.
-    """
-    page_text_dict = extract_text_from_pdf(pdf_file)
+def qr_rect(page: "fitz.Page", qr: dict) -> "fitz.Rect":
+    """QR rectangle on the page; qr["y"] is measured from the bottom edge"""
+    import fitz
+    return fitz.Rect(qr["x"], page.rect.height - qr["size"] - qr["y"], qr["x"] + qr["size"], page.rect.height - qr["y"])
 
-    pdf_doc = fitz.open(pdf_file)
-    qr_count = 0
+def add_qr_xobject(pdf_doc: "fitz.Document", content: bytes) -> int:
+    """Add a vector QR (render_qr_pdf content) as a unit-square Form XObject, returns its xref"""
+    xref = pdf_doc.get_new_xref()
+    pdf_doc.update_object(xref, "<</Type/XObject/Subtype/Form/BBox[0 0 1 1]/Resources<<>>>>")
+    pdf_doc.update_stream(xref, content)
+    return xref
 
-    for page_num, page_text in page_text_dict.items():
-        if search_text.lower() in page_text.lower():
+def show_qr_xobject(page: "fitz.Page", xref: int, rect: "fitz.Rect"):
+    """
+    Draw the Form XObject xref into rect: one resource entry and a
+    "q w 0 0 h x y cm /Name Do Q" stream appended to the page contents,
+    instead of the wrapper XObject show_pdf_page adds for every call.
+    """
+    pdf_doc = page.parent
+    if pdf_doc.xref_get_key(page.xref, "Resources")[0] == "null":
+        # Inherited resources: give the page its own reference first
+        parent = pdf_doc.xref_get_key(page.xref, "Parent")
+        while parent[0] == "xref":
+            kind, value = pdf_doc.xref_get_key(int(parent[1].split()[0]), "Resources")
+            if kind != "null":
+                pdf_doc.xref_set_key(page.xref, "Resources", value)
+                break
+            parent = pdf_doc.xref_get_key(int(parent[1].split()[0]), "Parent")
+    # Key paths of xref_set_key cannot cross indirect objects: follow them
+    name = f"QR{xref}"
+    dict_xref, path = page.xref, ""
+    for key in ("Resources", "XObject"):
+        kind, value = pdf_doc.xref_get_key(dict_xref, path + key)
+        if kind == "xref":
+            dict_xref, path = int(value.split()[0]), ""
+        else:
+            path += key + "/"
+    pdf_doc.xref_set_key(dict_xref, path + name, f"{xref} 0 R")
+
+    target = rect * ~page.transformation_matrix  # rect in PDF coordinates
+    page.wrap_contents()
+    contents_xref = pdf_doc.get_new_xref()
+    pdf_doc.update_object(contents_xref, "<<>>")
+    pdf_doc.update_stream(contents_xref, f"q {target.width:g} 0 0 {target.height:g} {target.x0:g} {target.y0:g} cm "
+                                         f"/{name} Do Q".encode())
+    kind, value = pdf_doc.xref_get_key(page.xref, "Contents")
+    if kind == "array":
+        contents = f"{value[:-1].rstrip()} {contents_xref} 0 R]"
+    elif kind == "xref":
+        contents = f"[{value} {contents_xref} 0 R]"
+    else:
+        contents = f"{contents_xref} 0 R"
+    pdf_doc.xref_set_key(page.xref, "Contents", contents)
 
-            print(f"\n{'='*80}")
-            print(f"PROCESSING PAGE {page_num}")
-            print(f"{'='*80}")
+def stamp_qr(page: "fitz.Page", qr: dict, payload: str, image_bytes: bytes, qr_mode: str, image_xrefs: dict):
+    """
+    Insert a rendered QR code into the page. Repeated payloads reuse the
+    object already embedded instead of adding another stream: image_xrefs
+    maps payload -> image (raster) or Form XObject (vector) xref in the
+    page's document.
+    """
+    image_rect = qr_rect(page, qr)
+    if qr_mode == "vector":
+        if payload not in image_xrefs:
+            image_xrefs[payload] = add_qr_xobject(page.parent, image_bytes)
+        show_qr_xobject(page, image_xrefs[payload], image_rect)
+    elif payload in image_xrefs:
+        page.insert_image(image_rect, xref=image_xrefs[payload])
+    else:
+        image_xrefs[payload] = page.insert_image(image_rect, stream=image_bytes)
 
-            # Check if next page exists
-            if page_num + 1 not in page_text_dict:
-                print(f"[WARNING] Page {page_num + 1} does not exist, skipping...")
-                continue
+def stamp_marker_page(pdf_doc: "fitz.Document", page_num: int, next_page_text: str | None, qr: dict,
+                      qr_mode: str, clips: dict, stats: RunStats, cleaner: Cleaner,
+                      image_xrefs: dict, cache=None) -> str:
+    """
+    Build the payload of the 1-based marker page page_num from the page after
+    it and stamp the QR code on the marker page. next_page_text is the full
+    text of that next page (only used without clips; with clips the identity
+    block is extracted here, through the text cache). Returns the payload.
+    """
+    debug = log.isEnabledFor(logging.DEBUG)
+
+    log.debug(f"\n{'='*80}")
+    log.debug(f"PROCESSING PAGE {page_num}")
+    log.debug(f"{'='*80}")
+
+    with stats.stage("clean"):
+        if clips:
+            filtered_text = extract_identity_text(pdf_doc[page_num], clips, cleaner, cache).strip()
+        else:
+            filtered_text = next_page_text.strip()
+
+        if debug:
+            log.debug(f"\n[STEP 1] Full text from page {page_num + 1} (length={len(filtered_text)}):")
+            log.debug(f"{'-'*70}")
+            log.debug(f"{filtered_text[:300]}")
+            if len(filtered_text) > 300:
+                log.debug(f"... (truncated, total {len(filtered_text)} chars)")
+            log.debug(f"{'-'*70}")
 
-            filtered_text = page_text_dict[page_num + 1].strip()
+        # Try multiple possible keywords (FLEXIBLE SEARCH)
+        filtered_lines, keyword_found = cleaner.select_identity_lines(filtered_text)
 
-            print(f"\n[STEP 1] Full text from page {page_num + 1} (length={len(filtered_text)}):")
-            print(f"{'-'*70}")
-            print(f"{filtered_text[:300]}")
-            if len(filtered_text) > 300:
-                print(f"... (truncated, total {len(filtered_text)} chars)")
-            print(f"{'-'*70}")
-
-            # Try multiple possible keywords (FLEXIBLE SEARCH)
-            possible_keywords = [
-                'Identitas Blok Sensus',
-                'Identitas SLS',
-                'IDENTITAS SAMPEL SATUAN LINGKUNGAN SETEMPAT',
-                'IDENTITAS SAMPEL BLOK SENSUS',
-                'Identitas',
-            ]
-
-            filtered_lines = []
-            keyword_found = None
-            filtered_text_lines = filtered_text.splitlines()
-
-            # Try each keyword until we find matching lines
-            for keyword in possible_keywords:
-                temp_lines = []
-                for line in filtered_text_lines:
-                    if keyword.lower() in line.lower():  # Case-insensitive search
-                        temp_lines.append(line)
-
-                if temp_lines:
-                    filtered_lines = temp_lines
-                    keyword_found = keyword
-                    break
-
-            print(f"\n[STEP 2] Keyword search result:")
-            print(f"{'-'*70}")
+        if debug:
+            log.debug(f"\n[STEP 2] Keyword search result:")
+            log.debug(f"{'-'*70}")
             if keyword_found:
-                print(f"✓ Found keyword: '{keyword_found}'")
-                print(f"  Matched lines: {len(filtered_lines)}")
+                log.debug(f"✓ Found keyword: '{keyword_found}'")
+                log.debug(f"  Matched lines: {len(filtered_lines)}")
                 for i, line in enumerate(filtered_lines[:5], 1):  # Show first 5
-                    print(f"  {i}. {line}")
+                    log.debug(f"  {i}. {line}")
                 if len(filtered_lines) > 5:
-                    print(f"  ... and {len(filtered_lines) - 5} more lines")
+                    log.debug(f"  ... and {len(filtered_lines) - 5} more lines")
             else:
-                print(f"✗ No specific keyword found")
-                print(f"  Using entire page text")
-                filtered_lines = []
-            print(f"{'-'*70}")
+                log.debug(f"✗ No specific keyword found")
+                log.debug(f"  Using entire page text")
+            log.debug(f"{'-'*70}")
 
-            # Process the text
-            if filtered_lines:
-                # Use only the matched lines
-                filtered_text = "\n".join(filtered_lines)
-                # Remove all possible keywords
-                for keyword in possible_keywords:
-                    filtered_text = filtered_text.replace(keyword, "")
-            # else: keep the entire page text
+        # Process the text
+        if filtered_lines:
+            # Use only the matched lines, without the keywords
+            filtered_text = cleaner.strip_keywords("\n".join(filtered_lines))
+        # else: keep the entire page text
 
-            print(f"\n[STEP 3] Text to be encoded:")
-            print(f"{'-'*70}")
-            print(f"Length: {len(filtered_text)}")
-            print(f"Preview: {filtered_text[:200] if filtered_text else '<EMPTY>'}")
-            print(f"{'-'*70}")
+        if debug:
+            log.debug(f"\n[STEP 3] Text to be encoded:")
+            log.debug(f"{'-'*70}")
+            log.debug(f"Length: {len(filtered_text)}")
+            log.debug(f"Preview: {filtered_text[:200] if filtered_text else '<EMPTY>'}")
+            log.debug(f"{'-'*70}")
 
-            qr_code_filename = f"qr_code_{page_num}.png"
-            generate_qr_code_for_text(filtered_text, qr_code_filename)
+    payload, image_bytes = generate_qr_code_for_text(filtered_text, qr_mode, stats, cleaner)
 
-            print(f"\n[SUCCESS] QR code generated: {qr_code_filename}\n")
+    log.info(f"[SUCCESS] Page {page_num}: QR code generated ({len(image_bytes)} bytes, {qr_mode}): "
+             f"{payload[:50]}{'...' if len(payload) > 50 else ''}")
 
-            page = pdf_doc[page_num - 1]
-            qr_code_img = Image.open(qr_code_filename)
+    with stats.stage("stamp"):
+        stamp_qr(pdf_doc[page_num - 1], qr, payload, image_bytes, qr_mode, image_xrefs)
 
-            # Convert image to bytes
-            img_bytes = io.BytesIO()
-            qr_code_img.save(img_bytes, format='PNG')
-            img_bytes.seek(0)
+    return payload
 
-            # Insert image into PDF page
-            image_rect = fitz.Rect(qr["x"], page.rect.height - qr["size"] - qr["y"], qr["x"] + qr["size"], page.rect.height - qr["y"])
-            page.insert_image(image_rect, stream=img_bytes)
+def stamp_document(pdf_doc: "fitz.Document", search_text: str, qr: dict, qr_mode: str = "raster",
+                   clips: dict = None, page_texts: list[str] = None, stats: RunStats = None,
+                   reporter: Progress = None, cleaner: Cleaner = DEFAULT_CLEANER, cache=None) -> dict:
+    """
+    Stamp a QR code on every marker page of an open document (in place, not
+    saved). page_texts may hold the already extracted marker-region text of
+    every page; otherwise pages are read as the scan reaches them, so
+    progress and cancellation follow the scan. cleaner holds the form
+    profile's vocabulary; cache is the page-text cache of the document's
+    source file (text_cache.py).
+    Used by embed_qr_codes_in_pdf and the in-memory stream API.
+    Returns {"qr_count", "marker_pages" (1-based), "payloads"}.
+    """
+    stats = stats or RunStats()
+    reporter = reporter or Progress()
+    total_pages = pdf_doc.page_count
+    marker_region = clips["marker"] if clips else None
+    marker_pages = []  # 1-based pages that received a QR code
+    payloads = []
+    image_xrefs = {}  # payload -> image / Form XObject xref already embedded in this document
+    lookahead = None  # (index, text) of the next page read for the last marker
+
+    def scanned_text(index: int) -> str:
+        if page_texts is not None:
+            return page_texts[index]
+        if lookahead is not None and lookahead[0] == index:
+            return lookahead[1]
+        with stats.stage("extract"):
+            return extract_page_text(pdf_doc[index], marker_region, cache)
+
+    reporter.start(total_pages)
+
+    for index in range(total_pages):
+        reporter.update(index)
+        if has_marker(scanned_text(index), search_text):
+            stats.count("markers_found")
 
-            qr_count += 1
+            # Check if next page exists
+            if index + 1 >= total_pages:
+                log.warning(f"[WARNING] Page {index + 2} does not exist, skipping...")
+                continue
 
-    output_file = pdf_file.replace(".pdf","") + '_qr.pdf'
-    pdf_doc.save(output_file)
+            lookahead = (index + 1, scanned_text(index + 1))
+            payloads.append(stamp_marker_page(pdf_doc, index + 1, lookahead[1], qr, qr_mode,
+                                              clips, stats, cleaner, image_xrefs, cache))
+            marker_pages.append(index + 1)
 
-    print(f"\n{'='*80}")
-    print(f"✓ Successfully embedded {qr_count} QR code(s)")
-    print(f"✓ Output file: {output_file}")
-    print(f"{'='*80}\n")
+    reporter.update(total_pages)
+    stats.count("pages_scanned", total_pages)
 
-    # Remove generated QR code images (optional)
-    for qr_code_filename in os.listdir():
-        if qr_code_filename.startswith('qr_code_'):
-            os.remove(qr_code_filename)
+    return {"qr_count": len(payloads), "marker_pages": marker_pages, "payloads": payloads}
+
+def prepare_part_file(pdf_file: str, part_file: str, resume: dict = None):
+    """
+    Working copy for windowed stamping. A resumed run cuts the copy back to
+    the size recorded after its last completed window (dropping a half
+    written update); otherwise the input is copied as is, or rewritten once
+    when it cannot take incremental updates (e.g. a repaired xref table).
+    """
+    import fitz
+    if resume is not None:
+        with open(part_file, "r+b") as f:
+            f.truncate(resume["part_size"])
+        return
+
+    shutil.copyfile(pdf_file, part_file)
+    with fitz.open(part_file) as pdf_doc:
+        incremental_ok = pdf_doc.can_save_incrementally()
+    if not incremental_ok:
+        with fitz.open(pdf_file) as pdf_doc:
+            pdf_doc.save(part_file, **SAVE_OPTIONS)
+
+def stamp_file_windowed(part_file: str, search_text: str, qr: dict, qr_mode: str = "raster",
+                        window: int = DEFAULT_WINDOW, clips: dict = None, stats: RunStats = None,
+                        reporter: Progress = None, cleaner: Cleaner = DEFAULT_CLEANER,
+                        resume: dict = None, checkpoint=None, cache=None) -> dict:
+    """
+    Stamp part_file in place, `window` pages at a time. Page text is read as
+    the scan reaches a page (only the next page's text is kept), every window
+    is persisted with an incremental save (appended to the file, nothing is
+    rewritten) and the document is reopened afterwards, so objects parsed
+    for earlier windows are dropped and memory stays bounded by the window.
+    After every saved window checkpoint(state) is called with
+    {"done_pages", "part_size", "marker_pages", "payloads"}; passing such a
+    state as resume continues an interrupted run after its last window.
+    cache is the page-text cache of the input part_file was copied from
+    (same pages, so the input's texts apply). Returns that state with "qr_count" and "pages" added.
+    """
+    import fitz
+    stats = stats or RunStats()
+    reporter = reporter or Progress()
+    marker_region = clips["marker"] if clips else None
+    state = dict(resume) if resume else {"done_pages": 0, "marker_pages": [], "payloads": []}
+    image_xrefs = {}  # payload -> image / Form XObject xref, valid across windows (saved objects keep their xref)
+    lookahead = None  # (index, full text) of the last next page read
+
+    pdf_doc = fitz.open(part_file)
+    try:
+        total_pages = pdf_doc.page_count
+        reporter.start(total_pages)
+        reporter.update(state["done_pages"])
+
+        for window_start in range(state["done_pages"], total_pages, window):
+            window_end = min(window_start + window, total_pages)
+            for index in range(window_start, window_end):
+                reporter.update(index)
+                with stats.stage("extract"):
+                    if lookahead is not None and lookahead[0] == index:
+                        page_text = lookahead[1]
+                    else:
+                        page_text = extract_page_text(pdf_doc[index], marker_region, cache)
+                stats.count("pages_scanned")
+                if not has_marker(page_text, search_text):
+                    continue
+                stats.count("markers_found")
+
+                if index + 1 >= total_pages:
+                    log.warning(f"[WARNING] Page {index + 2} does not exist, skipping...")
+                    continue
+
+                next_page_text = None
+                if not clips:
+                    with stats.stage("extract"):
+                        next_page_text = extract_page_text(pdf_doc[index + 1], cache=cache)
+                    lookahead = (index + 1, next_page_text)
+
+                state["payloads"].append(stamp_marker_page(pdf_doc, index + 1, next_page_text, qr, qr_mode, clips,
+                                                           stats, cleaner, image_xrefs, cache))
+                state["marker_pages"].append(index + 1)
+
+            with stats.stage("save"):
+                pdf_doc.save(part_file, **INCREMENTAL_SAVE_OPTIONS)
+            state["done_pages"] = window_end
+            state["part_size"] = os.path.getsize(part_file)
+            stats.count("windows_saved")
+            log.info(f"  Saved pages {window_start + 1}-{window_end} of {total_pages}")
+            if checkpoint is not None:
+                checkpoint(state)
+
+            pdf_doc.close()
+            pdf_doc = fitz.open(part_file)
+
+        reporter.update(total_pages)
+    finally:
+        pdf_doc.close()
+
+    return {**state, "qr_count": len(state["payloads"]), "pages": total_pages}
+
+def embed_qr_codes_in_pdf(pdf_file: str, search_text: str | None, search_text_id: str, qr: dict | None,
+                          qr_mode: str = "raster", jobs: int = 1, clip_profile: str = None,
+                          incremental: bool = False, stats: RunStats = None, progress=None, cancel=None,
+                          form_profile: str = None, window: int = 0, text_cache: bool = True):
+    """
+    Embed QR codes in PDF with flexible keyword matching.
+    Searches for multiple possible identifiers in the next page.
+    qr_mode="raster" inserts a PNG image, qr_mode="vector" draws the QR
+    matrix as vector rectangles (one Form XObject per payload, sharp in print).
+    With jobs > 1 page text is extracted by that many processes in parallel
+    page-range shards (same result as the sequential scan).
+    With a clip_profile (see pdf_text.CLIP_PROFILES) only the header region
+    is probed for the marker and only the identity block of the next page is
+    extracted, falling back to the full page when the clip is empty.
+    form_profile names a form profile (see form_profiles.py) or is "auto" to
+    detect it from the first pages; None is the built-in profile. The
+    profile supplies the marker (unless search_text is given), the QR
+    placement (keys given in qr win), the clip regions (unless clip_profile
+    is given) and the cleaning vocabulary.
+    With incremental=True a manifest next to the output (<name>_qr.manifest.json)
+    records hash, settings, marker pages and payloads; the input is skipped
+    when neither the file nor the settings changed since the last run.
+    With window > 0 (pages, see stamp_file_windowed) the document is stamped
+    window by window in a working copy <name>_qr.part.pdf that is extended
+    with an incremental save after every window and renamed to the output
+    at the end: memory stays bounded and there is no full rewrite at the
+    end (the output keeps the input's own objects as they are). Combined
+    with incremental=True every saved window is checkpointed in the
+    manifest, so a run that crashed or was cancelled resumes after its last
+    saved window. jobs is not used in this mode.
+    progress(done_pages, total_pages) is called for every page; setting the
+    cancel event (threading.Event) raises progress.Cancelled before the next
+    page and nothing is written (windowed with incremental=True: the saved
+    windows are kept for the next run).
+    text_cache=False neither reads nor fills the page text cache.
+    Returns a summary dict with the output file, page count, QR count, the
+    1-based marker pages with their payloads (input for verify.py) and the
+    run statistics.
+    """
+    import fitz
+    if qr_mode not in ("raster", "vector"):
+        raise ValueError(f"Unknown qr_mode '{qr_mode}', expected 'raster' or 'vector'")
+
+    stats = stats or RunStats()
+    debug = log.isEnabledFor(logging.DEBUG)
+    output_file = pdf_file.replace(".pdf","") + '_qr.pdf'
+    part_file = os.path.splitext(output_file)[0] + ".part.pdf"
+    resume = None
+    file_hash = None
+
+    if form_profile is None:
+        # Built-in profile: known without opening the document
+        search_text = search_text or DEFAULT_MARKER
+        qr = {**DEFAULT_QR, **(qr or {})}
+
+    if incremental:
+        settings = {"marker": search_text, "qr": dict(qr or {}), "qr_mode": qr_mode, "clip_profile": clip_profile}
+        if form_profile is not None:
+            settings["form_profile"] = form_profile
+        manifest = Manifest(os.path.splitext(output_file)[0] + ".manifest.json")
+        with stats.stage("hash"):
+            file_hash = file_sha256(pdf_file)
+        entry = manifest.get(pdf_file)
+        if is_current(entry, file_hash, settings):
+            log.info(f"✓ Unchanged since last run, skipping: {output_file}\n")
+            stats.count("skipped")
+            return {"output_file": output_file, "pages": entry["pages"], "qr_count": len(entry["payloads"]),
+                    "marker_pages": entry["marker_pages"], "payloads": entry["payloads"], "skipped": True,
+                    "stats": stats.to_dict()}
+        if window and is_resumable(entry, file_hash, settings, part_file):
+            resume = {key: entry[key] for key in ("done_pages", "part_size", "marker_pages", "payloads")}
+            log.info(f"Resuming after page {resume['done_pages']} ({len(resume['payloads'])} QR code(s) saved)")
+
+    # Single parse: the same document is used for text and for inserting images
+    cache = None
+    try:
+        with fitz.open(pdf_file) as pdf_doc:
+            if text_cache:
+                cache = open_text_cache(pdf_file, pdf_doc.page_count, stats, file_hash)
+            profile = resolve_form_profile(pdf_doc, form_profile)
+            search_text = search_text or profile.marker
+            qr = {**profile.qr, **(qr or {})}
+            clips = profile_clips(profile, form_profile, clip_profile)
+            marker_region = clips["marker"] if clips else None
+
+            if not window:
+                page_texts = None
+                if jobs > 1:
+                    with stats.stage("extract"):
+                        page_texts = extract_page_texts_parallel(pdf_file, jobs, pdf_doc.page_count, marker_region,
+                                                                 cache)
+
+                stamped = stamp_document(pdf_doc, search_text, qr, qr_mode, clips, page_texts, stats,
+                                         Progress(progress, cancel), profile.cleaner, cache)
+
+                with stats.stage("save"):
+                    pdf_doc.save(output_file, **SAVE_OPTIONS)
+                page_count = pdf_doc.page_count
+
+        if window:
+            def checkpoint(state: dict):
+                manifest.put(pdf_file, {"hash": file_hash, "settings": settings, "complete": False, "pages": None,
+                                        **state, "outputs": []})
+
+            with stats.stage("save"):
+                prepare_part_file(pdf_file, part_file, resume)
+            try:
+                stamped = stamp_file_windowed(part_file, search_text, qr, qr_mode, window, clips, stats,
+                                              Progress(progress, cancel), profile.cleaner, resume,
+                                              checkpoint if incremental else None, cache)
+            except BaseException as e:
+                if incremental:
+                    log.warning(f"✗ {type(e).__name__}: saved windows are kept in {part_file}, "
+                                f"the next run resumes there")
+                else:
+                    os.remove(part_file)
+                raise
+            os.replace(part_file, output_file)
+            page_count = stamped["pages"]
+    finally:
+        # Texts read so far are kept even when the run fails or is cancelled
+        if cache is not None:
+            cache.close()
+
+    qr_count = stamped["qr_count"]
+    marker_pages = stamped["marker_pages"]
+    payloads = stamped["payloads"]
+
+    stats.count("qr_codes", qr_count)
+    stats.count("files_written")
+    stats.count("bytes_written", os.path.getsize(output_file))
+
+    if incremental:
+        manifest.put(pdf_file, {"hash": file_hash, "settings": settings, "complete": True, "pages": page_count,
+                                "marker_pages": marker_pages, "payloads": payloads, "outputs": [output_file]})
+
+    log.info(f"\n{'='*80}")
+    log.info(f"✓ Successfully embedded {qr_count} QR code(s)")
+    log.info(f"✓ Output file: {output_file}")
+    stats.log_summary(log)
+    log.info(f"{'='*80}\n")
+
+    return {"output_file": output_file, "pages": page_count, "qr_count": qr_count, "marker_pages": marker_pages,
+            "payloads": payloads, "stats": stats.to_dict()}
 
 def open_file_dialog():
+    # GUI only: tkinter is not loaded by headless callers of this module
+    import tkinter as tk
+    from tkinter import filedialog, messagebox
+    from gui_progress import run_with_progress
+
+    # One Tk instance for the dialogs and the progress window
     root = tk.Tk()
     root.withdraw()
+    try:
+        file_path = filedialog.askopenfilename(parent=root, filetypes=[("PDF files", "*.pdf")])
+        if not file_path:
+            log.info("No file selected.")
+            return
 
-    file_path = filedialog.askopenfilename(filetypes=[("PDF files", "*.pdf")])
-    if file_path:
-        print(f"\n{'='*80}")
-        print(f"Flexible QR Code Generator")
-        print(f"Processing: {file_path}")
-        print(f"{'='*80}\n")
+        log.info(f"\n{'='*80}")
+        log.info(f"Flexible QR Code Generator")
+        log.info(f"Processing: {file_path}")
+        log.info(f"{'='*80}\n")
 
         pdf_file = file_path
-        search_text_qr = 'BLOK IV. CATATAN'
+        search_text_qr = DEFAULT_MARKER
         search_text_id = None  # Not used anymore - flexible search
-        qr = {"size": 180, "x": 780, "y": 50}
-
-        embed_qr_codes_in_pdf(pdf_file, search_text_qr, search_text_id, qr)
-    else:
-        print("No file selected.")
+        qr = dict(DEFAULT_QR)
+
+        # Run in a background thread so the window stays responsive
+        try:
+            summary = run_with_progress(root, "Embedding QR codes...", embed_qr_codes_in_pdf,
+                                        pdf_file, search_text_qr, search_text_id, qr)
+        except Cancelled:
+            log.warning("✗ Cancelled, no output written.")
+            messagebox.showwarning("Cancelled", "QR embedding cancelled.\nNo output file was written.")
+            return
+        except Exception as e:
+            log.exception(f"✗ Error: {e}")
+            messagebox.showerror("Error", f"An error occurred:\n{str(e)}")
+            return
+
+        messagebox.showinfo("QR Codes Added",
+            f"Embedded {summary['qr_count']} QR code(s).\n\nOutput file:\n{summary['output_file']}")
+    finally:
+        root.destroy()
 
 if __name__ == "__main__":
+    setup_logging(os.environ.get("PRELIST_LOG_LEVEL", "INFO"))
     open_file_dialog()
@@ -0,0 +1,97 @@
+"""
+Single-archive output for split segments (ZIP or tar)
+Segments are written into one archive as they are produced instead of one
+file each: member names are de-duplicated in memory (no os.path.exists per
+candidate name, which is slow on network shares), and an index member maps
+every archive member to its page range and QR payload. Archives are
+written sequentially, so the target can also be a non-seekable stream.
+"""
+import io
+import json
+import os
+import tarfile
+import time
+import zipfile
+from typing import BinaryIO
+
+# Supported archive formats and their file extensions
+ARCHIVE_FORMATS = {"zip": ".zip", "tar": ".tar"}
+
+# Index member, written last (after every segment)
+INDEX_NAME = "index.json"
+
+def unique_member_name(base_filename: str, used: set) -> str:
+    """
+    In-memory counterpart of split.unique_output_path for archive members and
+    streamed outputs: base_filename.pdf, then _1, _2, ... Adds the result to used.
+    """
+    filename = f"{base_filename}.pdf"
+    counter = 1
+    while filename in used:
+        filename = f"{base_filename}_{counter}.pdf"
+        counter += 1
+    used.add(filename)
+    return filename
+
+class SegmentArchive:
+    """
+    Write-only ZIP/tar archive of split segments on a binary file object.
+    PDF segments are already compressed, so ZIP members are stored.
+    """
+
+    def __init__(self, fileobj: BinaryIO, archive_format: str = "zip", source: str = None,
+                 marker: str = None, index: bool = True):
+        if archive_format not in ARCHIVE_FORMATS:
+            raise ValueError(f"Unknown archive format '{archive_format}', expected one of {sorted(ARCHIVE_FORMATS)}")
+        self.fileobj = fileobj
+        self.format = archive_format
+        self.source = source
+        self.marker = marker
+        self.index = index
+        self.used_names = {INDEX_NAME}
+        self.members = []
+        self.mtime = time.time()
+        if archive_format == "zip":
+            self.archive = zipfile.ZipFile(fileobj, "w", compression=zipfile.ZIP_STORED)
+        else:
+            # Stream mode: no seeking, works on sockets and pipes as well
+            self.archive = tarfile.open(fileobj=fileobj, mode="w|", format=tarfile.PAX_FORMAT)
+
+    def _write(self, name: str, data: bytes):
+        if self.format == "zip":
+            self.archive.writestr(zipfile.ZipInfo(name, time.localtime(self.mtime)[:6]), data)
+        else:
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mtime = self.mtime
+            self.archive.addfile(info, io.BytesIO(data))
+
+    def add(self, base_filename: str, data: bytes, start_page: int = None, end_page: int = None,
+            payload: str = None) -> str:
+        """
+        Add one segment as base_filename.pdf (_1, _2, ... for duplicates) with
+        its 0-based start_page and exclusive end_page. Returns the member name.
+        """
+        name = unique_member_name(base_filename, self.used_names)
+        self._write(name, data)
+        entry = {"name": name, "size": len(data)}
+        if start_page is not None:
+            entry.update({"start": start_page + 1, "end": end_page, "pages": end_page - start_page})
+        entry["payload"] = payload
+        self.members.append(entry)
+        return name
+
+    def close(self, complete: bool = True):
+        """
+        Write the index member (complete=False after a cancelled run) and
+        finish the archive. The file object itself is left open.
+        """
+        if self.index:
+            index = {"source": self.source, "marker": self.marker, "complete": complete, "members": self.members}
+            self._write(INDEX_NAME, json.dumps(index, indent=1, ensure_ascii=False).encode("utf-8"))
+        self.archive.close()
+
+def archive_path(output_folder: str, pdf_path: str, archive_format: str) -> str:
+    """<output_folder>/<input name>.zip (or .tar)"""
+    base = os.path.splitext(os.path.basename(pdf_path))[0]
+    return os.path.join(output_folder, base + ARCHIVE_FORMATS[archive_format])
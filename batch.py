@@ -0,0 +1,375 @@
+"""
+Headless batch runner for addQR.py and split.py
+Processes many PDFs (files, directories or glob patterns) in a pool of
+worker processes, without any tkinter dialog.
+"""
+import argparse
+import glob
+import json
+import os
+import time
+
+from addQR import DEFAULT_WINDOW, embed_qr_codes_in_pdf
+from archive import ARCHIVE_FORMATS
+from export import EXPORT_FORMATS, IdentityExport
+from form_profiles import profile_names
+from pdf_text import CLIP_PROFILES
+from pipeline import stamp_and_split
+from run_log import RunStats, setup_logging
+from split import split_pdf_by_marker
+from verify import verify_stamped_pdf
+
+def collect_pdf_files(inputs: list[str]) -> list[str]:
+    """
+    Expand files, directories and glob patterns into a sorted, de-duplicated
+    list of absolute PDF paths. Directories are searched recursively and
+    previously generated *_qr.pdf files (and *_qr.part.pdf working copies of
+    unfinished windowed runs) inside them are skipped.
+    """
+    pdf_files = []
+    seen = set()
+
+    for item in inputs:
+        if os.path.isdir(item):
+            matches = glob.glob(os.path.join(item, '**', '*.pdf'), recursive=True)
+            matches = [m for m in matches if not m.endswith(('_qr.pdf', '_qr.part.pdf'))]
+        elif glob.has_magic(item):
+            matches = glob.glob(item, recursive=True)
+        else:
+            matches = [item]
+
+        for path in sorted(matches):
+            path = os.path.abspath(path)
+            if path not in seen:
+                seen.add(path)
+                pdf_files.append(path)
+
+    return pdf_files
+
+def failed_result(pdf_file: str, error: str | None = None) -> dict:
+    """Result of a document that did not finish (the shape process_pdf returns)"""
+    return {"file": pdf_file, "ok": False, "skipped": False, "pages": 0, "outputs": [], "error": error,
+            "stats": None, "rows": None, "seconds": 0.0}
+
+def output_folder_for(pdf_file: str, options: dict) -> str:
+    """
+    Split output folder of one input. One sub folder per input keeps
+    concurrent workers from racing on the same duplicate-name suffixes.
+    """
+    name = os.path.splitext(os.path.basename(pdf_file))[0]
+    return os.path.join(options["output"] or os.path.dirname(pdf_file), name)
+
+def output_snapshot(mode: str, pdf_file: str, options: dict) -> set[str] | None:
+    """Names in the split output folder of pdf_file before a run (None in qr mode, which overwrites)"""
+    if mode == "qr":
+        return None
+    folder = output_folder_for(pdf_file, options)
+    return set(os.listdir(folder)) if os.path.isdir(folder) else set()
+
+def remove_partial_outputs(mode: str, pdf_file: str, options: dict, snapshot: set[str] | None):
+    """
+    Delete the files a dead worker added to the split output folder since
+    output_snapshot, so a rerun does not write them again under suffixed names.
+    """
+    folder = output_folder_for(pdf_file, options)
+    if snapshot is None or not os.path.isdir(folder):
+        return
+    for name in set(os.listdir(folder)) - snapshot:
+        path = os.path.join(folder, name)
+        if os.path.isfile(path):
+            os.remove(path)
+
+def process_pdf(mode: str, pdf_file: str, options: dict) -> dict:
+    """
+    Run one stage on one PDF. Never raises: failures are reported in the
+    returned dict so one broken document cannot stop the batch.
+    """
+    result = failed_result(pdf_file)
+    # Identity rows go back to the parent, which writes the single export file
+    rows = [] if options["export"] else None
+    export = rows.append if rows is not None else None
+    start = time.perf_counter()
+
+    # Workers do not inherit the parent's logging setup on every platform
+    setup_logging(options["log_level"])
+
+    try:
+        if mode == "qr":
+            summary = embed_qr_codes_in_pdf(pdf_file, options["marker"], None, options["qr"],
+                                            qr_mode=options["qr_mode"], jobs=options["scan_jobs"],
+                                            clip_profile=options["clip_profile"],
+                                            incremental=options["incremental"],
+                                            form_profile=options["form_profile"], window=options["window"],
+                                            text_cache=options["text_cache"])
+            result["outputs"] = [summary["output_file"]]
+            if options["verify"]:
+                # Decode the stamped file and compare with the payloads recorded while stamping
+                stats = RunStats()
+                stats.merge(summary["stats"])
+                report = verify_stamped_pdf(summary["output_file"],
+                                            dict(zip(summary["marker_pages"], summary["payloads"])),
+                                            options["qr"], jobs=options["scan_jobs"], stats=stats,
+                                            form_profile=options["form_profile"])
+                summary["stats"] = report["stats"]
+                if not report["passed"]:
+                    result["stats"] = report["stats"]
+                    raise ValueError(f"QR verification failed: {len(report['mismatches'])} mismatch(es), "
+                                     f"{len(report['undecoded'])} undecoded")
+        else:
+            output_folder = output_folder_for(pdf_file, options)
+            os.makedirs(output_folder, exist_ok=True)
+            if mode == "qr-split":
+                summary = stamp_and_split(pdf_file, output_folder, options["marker"], options["qr"],
+                                          qr_mode=options["qr_mode"], clip_profile=options["clip_profile"],
+                                          incremental=options["incremental"], export=export,
+                                          form_profile=options["form_profile"], text_cache=options["text_cache"])
+            else:
+                summary = split_pdf_by_marker(pdf_file, output_folder, options["marker"],
+                                              streaming=options["streaming"], jobs=options["scan_jobs"],
+                                              clip_profile=options["clip_profile"],
+                                              incremental=options["incremental"],
+                                              archive_format=options["archive"], export=export,
+                                              form_profile=options["form_profile"],
+                                              text_cache=options["text_cache"])
+            if summary.get("archive"):
+                result["outputs"] = [summary["archive"]]
+            else:
+                result["outputs"] = [os.path.join(output_folder, f) for f in summary["files"]]
+
+        result["pages"] = summary["pages"]
+        result["skipped"] = summary.get("skipped", False)
+        result["stats"] = summary["stats"]
+        result["rows"] = rows
+        result["ok"] = True
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+def process_pdf_isolated(mode: str, pdf_file: str, options: dict, initializer=None) -> dict:
+    """process_pdf in a worker process of its own: if it dies, only this document fails"""
+    from concurrent.futures import ProcessPoolExecutor
+    from concurrent.futures.process import BrokenProcessPool
+
+    with ProcessPoolExecutor(max_workers=1, initializer=initializer) as executor:
+        try:
+            return executor.submit(process_pdf, mode, pdf_file, options).result()
+        except BrokenProcessPool:
+            return failed_result(pdf_file, "BrokenProcessPool: worker process died (crash or out of memory)")
+        except Exception as e:
+            return failed_result(pdf_file, f"{type(e).__name__}: {e}")
+
+def run_batch(mode: str, pdf_files: list[str], options: dict, jobs: int, export=None) -> list[dict]:
+    """
+    Process all files with `jobs` worker processes, printing one line per
+    document. With export, the identity rows of every finished document are
+    written to it as soon as the document is done. If a worker process dies
+    the pool breaks; the documents it had not finished are run again, each
+    in a process of its own, so only the one that kills its worker fails.
+    Split outputs a dead worker left behind are deleted before the retry.
+    """
+    results = []
+
+    def report(result: dict):
+        if export is not None and result["rows"]:
+            for row in result["rows"]:
+                export(row)
+        result["rows"] = None
+        results.append(result)
+        status = "✓" if result["ok"] else "✗"
+        detail = f"{len(result['outputs'])} output(s)" if result["ok"] else result["error"]
+        if result["skipped"]:
+            detail += ", unchanged"
+        print(f"  [{len(results)}/{len(pdf_files)}] {status} {os.path.basename(result['file'])} "
+              f"({result['pages']} page(s), {result['seconds']:.1f}s) {detail}")
+
+    if jobs <= 1:
+        for pdf_file in pdf_files:
+            report(process_pdf(mode, pdf_file, options))
+    else:
+        from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+        from concurrent.futures.process import BrokenProcessPool
+
+        snapshots = {pdf_file: output_snapshot(mode, pdf_file, options) for pdf_file in pdf_files}
+
+        unfinished = []  # documents of a broken pool
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            futures = {executor.submit(process_pdf, mode, pdf_file, options): pdf_file for pdf_file in pdf_files}
+            for future in as_completed(futures):
+                try:
+                    report(future.result())
+                except BrokenProcessPool:
+                    unfinished.append(futures[future])
+                except Exception as e:
+                    report(failed_result(futures[future], f"{type(e).__name__}: {e}"))
+
+        if unfinished:
+            print(f"  ✗ A worker process died, running {len(unfinished)} unfinished document(s) again "
+                  f"in isolated processes")
+            for pdf_file in unfinished:
+                remove_partial_outputs(mode, pdf_file, options, snapshots[pdf_file])
+            with ThreadPoolExecutor(max_workers=jobs) as threads:
+                retries = [threads.submit(process_pdf_isolated, mode, pdf_file, options)
+                           for pdf_file in sorted(unfinished, key=pdf_files.index)]
+                for future in as_completed(retries):
+                    report(future.result())
+
+    return results
+
+def batch_stats(results: list[dict]) -> RunStats:
+    """Stage timers and counters of all successful documents added together"""
+    totals = RunStats()
+    for r in results:
+        if r["stats"]:
+            totals.merge(r["stats"])
+    return totals
+
+def print_summary(results: list[dict], elapsed: float, jobs: int):
+    """Print throughput, summed stage statistics and failures for the whole batch"""
+    done = [r for r in results if r["ok"]]
+    failed = [r for r in results if not r["ok"]]
+    pages = sum(r["pages"] for r in done)
+    outputs = sum(len(r["outputs"]) for r in done)
+    skipped = sum(1 for r in done if r["skipped"])
+
+    print(f"\n{'='*80}")
+    print(f"BATCH SUMMARY")
+    print(f"{'='*80}")
+    print(f"Documents: {len(done)} ok ({skipped} unchanged), {len(failed)} failed ({len(results)} total)")
+    print(f"Pages: {pages}")
+    print(f"Outputs: {outputs}")
+    print(f"Workers: {jobs}")
+    print(f"Elapsed: {elapsed:.2f}s")
+    if elapsed > 0:
+        print(f"Throughput: {pages / elapsed:.1f} pages/s, {len(done) / elapsed:.2f} docs/s")
+
+    stats_lines = batch_stats(results).summary_lines()
+    if stats_lines:
+        print(f"\nStatistics (summed over documents):")
+        print("\n".join(stats_lines))
+
+    if failed:
+        print(f"\nFailures:")
+        for r in failed:
+            print(f"  ✗ {r['file']}: {r['error']}")
+    print(f"{'='*80}\n")
+
+def write_stats_json(path: str, mode: str, results: list[dict], elapsed: float, jobs: int):
+    """Export per-document and total statistics of this run as JSON"""
+    report = {
+        "mode": mode,
+        "jobs": jobs,
+        "elapsed": round(elapsed, 3),
+        "totals": batch_stats(results).to_dict(),
+        "documents": [{"file": r["file"], "ok": r["ok"], "skipped": r["skipped"], "pages": r["pages"],
+                       "seconds": round(r["seconds"], 3), "outputs": len(r["outputs"]), "error": r["error"],
+                       "stats": r["stats"]} for r in results],
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+def add_processing_arguments(parser: argparse.ArgumentParser):
+    """Stage options shared by batch.py and watch.py"""
+    parser.add_argument("mode", choices=["qr", "split", "qr-split"],
+                        help="qr: embed QR codes, split: split by marker, qr-split: both in one pass")
+    parser.add_argument("--scan-jobs", type=int, default=1,
+                        help="worker processes scanning page shards of each single PDF (for very large files)")
+    parser.add_argument("--form-profile", choices=profile_names(),
+                        help="form profile (form_profiles.json) supplying marker, vocabulary, QR placement and "
+                             "clip regions; 'auto' detects it per file (default: built-in SERUTI 2024 profile)")
+    parser.add_argument("--marker", help="marker text (default: the form profile's marker)")
+    parser.add_argument("--qr-size", type=float, help="qr: QR size in points (default: the form profile's)")
+    parser.add_argument("--qr-x", type=float, help="qr: QR x position in points")
+    parser.add_argument("--qr-y", type=float, help="qr: QR y position from the bottom")
+    parser.add_argument("--qr-mode", choices=["raster", "vector"], default="raster",
+                        help="qr: PNG image (raster) or vector rectangles (vector, sharp in print)")
+    parser.add_argument("--window", type=int, default=0, metavar="PAGES",
+                        help="qr: stamp PAGES pages at a time with incremental saves (bounded memory for huge "
+                             f"files, resumable with --incremental; e.g. {DEFAULT_WINDOW})")
+    parser.add_argument("--streaming", action="store_true",
+                        help="split: bounded memory for huge files, no parallel marker pre-scan (--scan-jobs ignored)")
+    parser.add_argument("--archive", choices=sorted(ARCHIVE_FORMATS),
+                        help="split: write all segments of an input into one archive with an index.json")
+    parser.add_argument("--clip-profile", choices=sorted(CLIP_PROFILES),
+                        help="only read the header/identity regions of this form profile")
+    parser.add_argument("--verify", action="store_true",
+                        help="qr: decode every stamped QR code and compare it with its payload (needs OpenCV)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="keep a manifest and skip inputs/segments unchanged since the last run (resumable)")
+    parser.add_argument("--no-text-cache", action="store_true",
+                        help="do not read or fill the persistent page-text cache (see text_cache.py)")
+    parser.add_argument("-v", "--verbose", action="store_true",
+                        help="show per-document progress (same as --log-level INFO)")
+    parser.add_argument("--log-level", choices=["DEBUG", "INFO", "WARNING", "ERROR"],
+                        help="log level of the document processing (default: WARNING, DEBUG dumps every page)")
+
+def processing_options(args: argparse.Namespace, output: str | None) -> dict:
+    """options dict for process_pdf() from the parsed shared arguments"""
+    return {
+        "marker": args.marker,
+        # Only the values given; the rest comes from the form profile
+        "qr": {key: value for key, value in (("size", args.qr_size), ("x", args.qr_x), ("y", args.qr_y))
+               if value is not None},
+        "form_profile": args.form_profile,
+        "qr_mode": args.qr_mode,
+        "window": args.window,
+        "streaming": args.streaming,
+        "archive": args.archive,
+        "scan_jobs": args.scan_jobs,
+        "clip_profile": args.clip_profile,
+        "incremental": args.incremental,
+        "verify": args.verify,
+        "text_cache": not args.no_text_cache,
+        "export": False,
+        "output": output,
+        "log_level": args.log_level or ("INFO" if args.verbose else "WARNING"),
+    }
+
+def main(argv: list[str] = None) -> int:
+    """Command line entry point, returns the process exit code"""
+    parser = argparse.ArgumentParser(description="Batch QR embedding / splitting of DSRT/prelist PDFs")
+    add_processing_arguments(parser)
+    parser.add_argument("inputs", nargs="+", help="PDF files, directories or glob patterns")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1,
+                        help="number of worker processes (default: CPU count)")
+    parser.add_argument("-o", "--output", help="split/qr-split: output root folder (default: next to each input)")
+    parser.add_argument("--stats-json", help="write per-document and total stage timings/counters to this file")
+    parser.add_argument("--export", help="split/qr-split: write the identity data of every segment to this "
+                                         ".csv or .xlsx file")
+    args = parser.parse_args(argv)
+
+    if args.export and args.mode == "qr":
+        parser.error("--export needs split or qr-split mode")
+    if args.export and os.path.splitext(args.export)[1].lower() not in EXPORT_FORMATS:
+        parser.error(f"--export must end with one of {sorted(EXPORT_FORMATS)}")
+
+    pdf_files = collect_pdf_files(args.inputs)
+    if not pdf_files:
+        print("✗ No PDF files found.")
+        return 1
+
+    options = processing_options(args, args.output)
+    options["export"] = bool(args.export)
+    jobs = max(1, min(args.jobs, len(pdf_files)))
+
+    print(f"Processing {len(pdf_files)} PDF file(s) with {jobs} worker(s)...\n")
+    start = time.perf_counter()
+    if args.export:
+        with IdentityExport(args.export) as export:
+            results = run_batch(args.mode, pdf_files, options, jobs, export)
+    else:
+        results = run_batch(args.mode, pdf_files, options, jobs)
+    elapsed = time.perf_counter() - start
+    print_summary(results, elapsed, jobs)
+
+    if args.export:
+        print(f"✓ {export.rows} identity row(s) written to {args.export}")
+    if args.stats_json:
+        write_stats_json(args.stats_json, args.mode, results, elapsed, jobs)
+        print(f"✓ Statistics written to {args.stats_json}")
+
+    return 0 if all(r["ok"] for r in results) else 2
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,104 @@
+"""
+Micro-benchmark and equivalence check for the payload cleaning engine
+Compares text_clean.build_qr_payload with the previous implementation
+(keyword loop + ~40 sequential str.replace passes) on generated identity
+pages covering the "Identitas SLS", "Identitas Blok Sensus", upper-case
+and no-keyword layouts. Exits with status 1 if any output differs.
+
+Usage:
+    python3 benchmarks/bench_clean.py [--samples N] [--rounds N]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from text_clean import POSSIBLE_KEYWORDS, REMOVE_STRINGS, build_qr_payload
+
+def legacy_payload(text: str) -> str:
+    """Previous extract_qr_data_from_text / generate_qr_code_for_text logic"""
+    filtered_lines = []
+    text_lines = text.splitlines()
+    for keyword in POSSIBLE_KEYWORDS:
+        temp_lines = [line for line in text_lines if keyword.lower() in line.lower()]
+        if temp_lines:
+            filtered_lines = temp_lines
+            break
+
+    if filtered_lines:
+        filtered_text = "\n".join(filtered_lines)
+        for keyword in POSSIBLE_KEYWORDS:
+            filtered_text = filtered_text.replace(keyword, "")
+    else:
+        filtered_text = text
+
+    filtered_text = ' '.join(filtered_text.split())
+    for s in REMOVE_STRINGS:
+        filtered_text = filtered_text.replace(s, "")
+    return ' '.join(filtered_text.split()).strip()
+
+PLACES = ["PAPUA", "PAPUA PEGUNUNGAN", "YALIMO", "ALIMUHUK", "JAYAPURA", "MERAUKE", "ACEH BESAR",
+          "KOTA BANDUNG", "SUKAJADI", "DESA_X", "KAMPUNG BARU", "NUSA TENGGARA TIMUR"]
+LABELS = ["1. Provinsi", "2. Kabupaten/Kota", "3. Kecamatan", "4. Desa/Kelurahan",
+          "6. Kode SLS/Sub-SLS", "7. Nomor Kode Sampel (NKS)Perkotaan", "Nomor Blok Sensus",
+          "Kabupaten/Kota *)", "Desa/Kelurahan *)"]
+HEADERS = ["SERUTI24.DSRT", "RAHASIA", "DAFTAR SAMPEL RUMAH TANGGA",
+           "SURVEI EKONOMI RUMAH TANGGA TRIWULANAN 2024 Triwulan 2",
+           "BLOK I. IDENTITAS SAMPEL BLOK SENSUS", "BLOK I. IDENTITAS SAMPEL SATUAN LINGKUNGAN SETEMPAT",
+           "BLOK II. KETERANGAN PETUGAS", "Nama Pencacah Tanda Tangan", "BLOK III. CATATAN",
+           "Sumber Data : DTSEN", "*) Coret yang tidak perlu", "5. Klasifikasi Desa/Kelurahan Perkotaan Pedesaan",
+           # Glued by the text layer: the removal order decides what is left
+           "SAMPEL SERUTI24.DSRT", "Nomor Blok PedesaanSensus", "BLOK I.BLOK II. CATATAN"]
+KEYWORD_FORMS = ["Identitas SLS", "Identitas Blok Sensus", "IDENTITAS SAMPEL BLOK SENSUS",
+                 "identitas sls", "Identitas", None]
+
+def random_page(rng: random.Random) -> str:
+    """One synthetic identity page (header lines, labelled identity lines, noise)"""
+    keyword = rng.choice(KEYWORD_FORMS)
+    lines = rng.sample(HEADERS, rng.randint(2, 6))
+    for label in rng.sample(LABELS, rng.randint(3, 6)):
+        value = f"{rng.choice(PLACES)} {rng.randint(0, 9999):0{rng.randint(1, 4)}d}"
+        prefix = f"{keyword} " if keyword and rng.random() < 0.8 else ""
+        lines.append(f"{prefix}{label}{rng.choice([' ', '  ', ' : ', chr(9)])}{value}")
+    lines.append(f"{rng.randint(1, 30)} rumah tangga")
+    rng.shuffle(lines)
+    return "\n".join(lines) + rng.choice(["", "\n", "  \n"])
+
+def timed(func, samples: list[str], rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for text in samples:
+            func(text)
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--samples", type=int, default=2000)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    samples = [random_page(rng) for _ in range(args.samples)]
+
+    mismatches = [text for text in samples if legacy_payload(text) != build_qr_payload(text)]
+    for text in mismatches[:5]:
+        print(f"✗ MISMATCH\n  input:  {text!r}\n  legacy: {legacy_payload(text)!r}\n  new:    {build_qr_payload(text)!r}")
+
+    legacy_time = timed(legacy_payload, samples, args.rounds)
+    new_time = timed(build_qr_payload, samples, args.rounds)
+    calls = args.samples * args.rounds
+
+    print(f"Samples: {args.samples} x {args.rounds} rounds, {len(mismatches)} mismatch(es)")
+    print(f"legacy: {legacy_time:.3f}s ({legacy_time / calls * 1e6:.1f} µs/page)")
+    print(f"engine: {new_time:.3f}s ({new_time / calls * 1e6:.1f} µs/page)")
+    print(f"speedup: {legacy_time / new_time:.1f}x")
+
+    if mismatches:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Benchmark: PyPDF2 extract_text() vs the shared PyMuPDF extraction (pdf_text.py)
+Also checks that both backends find the same marker pages and produce the
+same QR payload for every segment.
+
+Usage:
+    python3 benchmarks/bench_extract.py file1.pdf [file2.pdf ...] [--marker TEXT]
+"""
+import argparse
+import os
+import sys
+import time
+
+import PyPDF2
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pdf_text import find_marker_pages, open_pdf_with_text
+from split import extract_qr_data_from_text
+
+def extract_with_pypdf2(pdf_file: str) -> list[str]:
+    """Previous extraction path, kept here as the baseline"""
+    with open(pdf_file, 'rb') as pdf:
+        reader = PyPDF2.PdfReader(pdf)
+        return [page.extract_text() for page in reader.pages]
+
+def extract_with_pymupdf(pdf_file: str) -> list[str]:
+    pdf_doc, page_texts = open_pdf_with_text(pdf_file)
+    pdf_doc.close()
+    return page_texts
+
+def payloads(page_texts: list[str], marker_pages: list[int]) -> list[str]:
+    """QR payload of every segment, as split.py computes it"""
+    return [extract_qr_data_from_text(page_texts[p + 1]) if p + 1 < len(page_texts) else "no_data"
+            for p in marker_pages]
+
+def timed(func, *args) -> tuple[object, float]:
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("pdf_files", nargs="+")
+    parser.add_argument("--marker", default="BLOK IV. CATATAN")
+    args = parser.parse_args()
+
+    mismatches = 0
+    print(f"{'file':<40} {'pages':>6} {'PyPDF2 s':>9} {'PyMuPDF s':>10} {'speedup':>8}  match")
+    for pdf_file in args.pdf_files:
+        old_texts, old_time = timed(extract_with_pypdf2, pdf_file)
+        new_texts, new_time = timed(extract_with_pymupdf, pdf_file)
+
+        old_markers = find_marker_pages(old_texts, args.marker)
+        new_markers = find_marker_pages(new_texts, args.marker)
+        same_markers = old_markers == new_markers
+        same_payloads = same_markers and payloads(old_texts, old_markers) == payloads(new_texts, new_markers)
+
+        status = "ok" if same_payloads else ("PAYLOAD DIFF" if same_markers else "MARKER DIFF")
+        if not same_payloads:
+            mismatches += 1
+        speedup = old_time / new_time if new_time else float("inf")
+        print(f"{os.path.basename(pdf_file)[:40]:<40} {len(new_texts):>6} {old_time:>9.2f} {new_time:>10.2f} "
+              f"{speedup:>7.1f}x  {status}")
+
+    if mismatches:
+        print(f"\n✗ {mismatches} file(s) differ between backends")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Benchmark: raster (PNG) vs vector QR rendering in embed_qr_codes_in_pdf
+Reports run time and output size of both modes for every input file.
+
+Usage:
+    python3 benchmarks/bench_qr_mode.py file1.pdf [file2.pdf ...]
+"""
+import argparse
+import contextlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import addQR
+
+MODES = ("raster", "vector")
+
+def run_mode(pdf_file: str, mode: str, marker: str) -> tuple[float, int, int]:
+    """Embed QR codes into a temp copy, returns (seconds, output_bytes, qr_count)"""
+    addQR.render_qr_png.cache_clear()
+    addQR.render_qr_pdf.cache_clear()
+
+    with tempfile.TemporaryDirectory(prefix="bench_qr_") as workdir:
+        work_file = os.path.join(workdir, os.path.basename(pdf_file))
+        shutil.copyfile(pdf_file, work_file)
+
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            summary = addQR.embed_qr_codes_in_pdf(work_file, marker, None, dict(addQR.DEFAULT_QR), qr_mode=mode)
+        seconds = time.perf_counter() - start
+
+        return seconds, os.path.getsize(summary["output_file"]), summary["qr_count"]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("pdf_files", nargs="+")
+    parser.add_argument("--marker", default=addQR.DEFAULT_MARKER)
+    args = parser.parse_args()
+
+    print(f"{'file':<32} {'input KB':>9} {'QRs':>5} " + " ".join(f"{m + ' s':>9} {m + ' KB':>10}" for m in MODES))
+    for pdf_file in args.pdf_files:
+        row = [f"{os.path.basename(pdf_file)[:32]:<32}", f"{os.path.getsize(pdf_file) / 1024:>9.0f}"]
+        results = {mode: run_mode(pdf_file, mode, args.marker) for mode in MODES}
+        row.append(f"{results['raster'][2]:>5}")
+        for mode in MODES:
+            seconds, size, _ = results[mode]
+            row.append(f"{seconds:>9.2f} {size / 1024:>10.0f}")
+        print(" ".join(row))
+
+if __name__ == "__main__":
+    main()
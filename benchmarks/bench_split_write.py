@@ -0,0 +1,98 @@
+"""
+Benchmark: split output writing, PyPDF2 page-by-page (previous backend) vs
+PyMuPDF range copy saved with SAVE_OPTIONS (current backend)
+Reports bytes and write time per segment file and in total, plus the size
+and save time of a full-document save (as used for *_qr.pdf) with and
+without SAVE_OPTIONS.
+
+Usage:
+    python3 benchmarks/bench_split_write.py file.pdf [--marker TEXT] [--per-file]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import fitz
+import PyPDF2
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pdf_text import SAVE_OPTIONS, copy_page_range, extract_page_texts, find_marker_pages
+
+def segments(pdf_file: str, marker: str) -> list[tuple[int, int]]:
+    with fitz.open(pdf_file) as pdf_doc:
+        marker_pages = find_marker_pages(extract_page_texts(pdf_doc), marker)
+        ends = marker_pages[1:] + [pdf_doc.page_count]
+    return list(zip(marker_pages, ends))
+
+def write_pypdf2(pdf_file: str, ranges: list, workdir: str) -> list[tuple[int, float]]:
+    results = []
+    with open(pdf_file, 'rb') as pdf:
+        reader = PyPDF2.PdfReader(pdf)
+        for i, (start_page, end_page) in enumerate(ranges):
+            output_path = os.path.join(workdir, f"pypdf2_{i}.pdf")
+            start = time.perf_counter()
+            writer = PyPDF2.PdfWriter()
+            for page_num in range(start_page, end_page):
+                writer.add_page(reader.pages[page_num])
+            with open(output_path, 'wb') as output_file:
+                writer.write(output_file)
+            results.append((os.path.getsize(output_path), time.perf_counter() - start))
+    return results
+
+def write_pymupdf(pdf_file: str, ranges: list, workdir: str) -> list[tuple[int, float]]:
+    results = []
+    with fitz.open(pdf_file) as pdf_doc:
+        for i, (start_page, end_page) in enumerate(ranges):
+            output_path = os.path.join(workdir, f"pymupdf_{i}.pdf")
+            start = time.perf_counter()
+            segment_doc = copy_page_range(pdf_doc, start_page, end_page)
+            segment_doc.save(output_path, **SAVE_OPTIONS)
+            segment_doc.close()
+            results.append((os.path.getsize(output_path), time.perf_counter() - start))
+    return results
+
+def full_save(pdf_file: str, workdir: str, options: dict) -> tuple[int, float]:
+    output_path = os.path.join(workdir, "full.pdf")
+    with fitz.open(pdf_file) as pdf_doc:
+        start = time.perf_counter()
+        pdf_doc.save(output_path, **options)
+        seconds = time.perf_counter() - start
+    return os.path.getsize(output_path), seconds
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("pdf_file")
+    parser.add_argument("--marker", default="BLOK IV. CATATAN")
+    parser.add_argument("--per-file", action="store_true", help="print every segment file")
+    args = parser.parse_args()
+
+    ranges = segments(args.pdf_file, args.marker)
+    print(f"{len(ranges)} segment(s)\n")
+
+    with tempfile.TemporaryDirectory(prefix="bench_split_") as workdir:
+        before = write_pypdf2(args.pdf_file, ranges, workdir)
+        after = write_pymupdf(args.pdf_file, ranges, workdir)
+
+        if args.per_file:
+            print(f"{'segment':<10} {'pages':>6} {'before B':>10} {'before s':>9} {'after B':>10} {'after s':>9}")
+            for (start_page, end_page), (b_size, b_time), (a_size, a_time) in zip(ranges, before, after):
+                print(f"{start_page + 1:<10} {end_page - start_page:>6} {b_size:>10} {b_time:>9.4f} "
+                      f"{a_size:>10} {a_time:>9.4f}")
+            print()
+
+        for label, results in (("PyPDF2 (before)", before), ("PyMuPDF (after)", after)):
+            total_bytes = sum(size for size, _ in results)
+            total_time = sum(seconds for _, seconds in results)
+            print(f"{label:<18} {total_bytes / 1024:>10.0f} KB {total_time:>8.2f}s "
+                  f"({total_bytes / max(len(results), 1) / 1024:.1f} KB/file)")
+
+        print()
+        for label, options in (("full save plain", {}), ("full save options", SAVE_OPTIONS)):
+            size, seconds = full_save(args.pdf_file, workdir, options)
+            print(f"{label:<18} {size / 1024:>10.0f} KB {seconds:>8.2f}s")
+
+if __name__ == "__main__":
+    main()
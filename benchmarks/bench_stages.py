@@ -0,0 +1,202 @@
+"""
+Benchmark suite: per-stage timings on synthetic DSRT/prelist PDFs
+Generates forms with benchmarks/synth_dsrt.py at each requested page count
+and times every stage of the QR + split path separately: text extraction,
+marker scan, payload cleaning, QR generation, image insertion, save and
+split write. Results are written as JSON (one run per page count, best of
+--repeat) so two versions can be compared with --compare.
+
+Usage:
+    python3 benchmarks/bench_stages.py [--pages 100 1000 10000] [--qr-mode raster|vector]
+                                       [--repeat N] [--output results.json] [--compare old.json]
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import fitz
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import addQR
+from pdf_text import SAVE_OPTIONS, copy_page_range, extract_page_texts, find_marker_pages
+from synth_dsrt import MARKER, write_document
+from text_clean import build_qr_payload
+
+STAGES = ("extract", "marker_scan", "clean", "qr_generate", "image_insert", "save", "split_write")
+
+# Changes below this ratio (new / old) or on stages faster than
+# MIN_SECONDS are treated as noise
+NOISE_RATIO = 1.10
+MIN_SECONDS = 0.01
+
+def run_once(pdf_file: str, qr_mode: str, workdir: str) -> tuple[dict, dict]:
+    """Run all stages once, returns ({stage: seconds}, counters)"""
+    timings = {}
+    render = addQR.render_qr_pdf if qr_mode == "vector" else addQR.render_qr_png
+    render.cache_clear()
+
+    start = time.perf_counter()
+    pdf_doc = fitz.open(pdf_file)
+    page_texts = extract_page_texts(pdf_doc)
+    timings["extract"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    marker_pages = find_marker_pages(page_texts, MARKER)
+    timings["marker_scan"] = time.perf_counter() - start
+
+    # Same pairing as addQR: the identity page follows the marker page
+    stamped = [page_num for page_num in marker_pages if page_num + 1 < pdf_doc.page_count]
+
+    start = time.perf_counter()
+    payloads = [build_qr_payload(page_texts[page_num + 1]) or "NO_DATA" for page_num in stamped]
+    timings["clean"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    images = [render(payload)[0] for payload in payloads]
+    timings["qr_generate"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    image_xrefs = {}
+    for page_num, payload, image_bytes in zip(stamped, payloads, images):
+        addQR.stamp_qr(pdf_doc[page_num], addQR.DEFAULT_QR, payload, image_bytes, qr_mode, image_xrefs)
+    timings["image_insert"] = time.perf_counter() - start
+
+    output_file = os.path.join(workdir, "stamped.pdf")
+    start = time.perf_counter()
+    pdf_doc.save(output_file, **SAVE_OPTIONS)
+    timings["save"] = time.perf_counter() - start
+    output_bytes = os.path.getsize(output_file)
+    pdf_doc.close()
+
+    # Split the stamped output, as split.py does after addQR.py
+    split_bytes = 0
+    start = time.perf_counter()
+    with fitz.open(output_file) as stamped_doc:
+        ends = marker_pages[1:] + [stamped_doc.page_count]
+        for i, (start_page, end_page) in enumerate(zip(marker_pages, ends)):
+            segment_file = os.path.join(workdir, f"segment_{i}.pdf")
+            segment_doc = copy_page_range(stamped_doc, start_page, end_page)
+            segment_doc.save(segment_file, **SAVE_OPTIONS)
+            segment_doc.close()
+            split_bytes += os.path.getsize(segment_file)
+    timings["split_write"] = time.perf_counter() - start
+
+    counters = {"segments": len(marker_pages), "qr_codes": len(stamped),
+                "output_bytes": output_bytes, "split_bytes": split_bytes}
+    return timings, counters
+
+def run_pages(pages: int, qr_mode: str, repeat: int, seed: int) -> dict:
+    """Generate one synthetic form and benchmark it, keeping the best time per stage"""
+    with tempfile.TemporaryDirectory(prefix="bench_stages_") as workdir:
+        pdf_file = os.path.join(workdir, f"synthetic_{pages}.pdf")
+        start = time.perf_counter()
+        write_document(pdf_file, pages, seed)
+        generate_seconds = time.perf_counter() - start
+        input_bytes = os.path.getsize(pdf_file)
+
+        best = {}
+        for _ in range(repeat):
+            timings, counters = run_once(pdf_file, qr_mode, workdir)
+            for stage, seconds in timings.items():
+                best[stage] = min(seconds, best.get(stage, seconds))
+
+    total = sum(best.values())
+    return {"pages": pages, "input_bytes": input_bytes, "generate_seconds": round(generate_seconds, 4),
+            "stages": {stage: round(best[stage], 6) for stage in STAGES},
+            "total_seconds": round(total, 6), "pages_per_second": round(pages / total, 1) if total else None,
+            **counters}
+
+def git_revision() -> str | None:
+    """Short commit id of the checkout, if it is a git repository"""
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def print_run(run: dict):
+    print(f"\n{run['pages']} pages, {run['segments']} segment(s), {run['input_bytes'] / 1024:.0f} KB input")
+    for stage in STAGES:
+        seconds = run["stages"][stage]
+        print(f"  {stage:<14} {seconds:>9.4f}s  {seconds / run['pages'] * 1e3:>8.3f} ms/page")
+    print(f"  {'total':<14} {run['total_seconds']:>9.4f}s  {run['pages_per_second']} pages/s")
+
+def compare(results: dict, baseline_file: str) -> int:
+    """Print new/old ratio per stage for page counts present in both files, returns regressions"""
+    with open(baseline_file, encoding="utf-8") as f:
+        baseline = json.load(f)
+    old_runs = {run["pages"]: run for run in baseline["runs"]}
+    regressions = 0
+
+    print(f"\n{'='*80}")
+    print(f"COMPARE with {baseline_file} ({baseline['meta'].get('revision')})")
+    print(f"{'='*80}")
+    for run in results["runs"]:
+        old = old_runs.get(run["pages"])
+        if old is None:
+            continue
+        print(f"\n{run['pages']} pages:")
+        for stage in STAGES + ("total",):
+            new_s = run["total_seconds"] if stage == "total" else run["stages"][stage]
+            old_s = old["total_seconds"] if stage == "total" else old["stages"].get(stage)
+            if not old_s:
+                continue
+            ratio = new_s / old_s
+            flag = ""
+            if max(new_s, old_s) < MIN_SECONDS:
+                pass
+            elif ratio > NOISE_RATIO:
+                flag = "  ✗ slower"
+                regressions += 1
+            elif ratio < 1 / NOISE_RATIO:
+                flag = "  ✓ faster"
+            print(f"  {stage:<14} {old_s:>9.4f}s -> {new_s:>9.4f}s  x{ratio:.2f}{flag}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pages", type=int, nargs="+", default=[100, 1000],
+                        help="page counts to generate (default: 100 1000)")
+    parser.add_argument("--qr-mode", choices=["raster", "vector"], default="raster")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per page count, best time is kept")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", default="bench_stages.json", help="JSON results file")
+    parser.add_argument("--compare", help="previous JSON results to compare against")
+    args = parser.parse_args()
+
+    results = {
+        "meta": {
+            "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "pymupdf": fitz.VersionBind,
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "qr_mode": args.qr_mode,
+            "repeat": args.repeat,
+            "seed": args.seed,
+        },
+        "runs": [],
+    }
+
+    for pages in args.pages:
+        run = run_pages(pages, args.qr_mode, max(1, args.repeat), args.seed)
+        results["runs"].append(run)
+        print_run(run)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"\n✓ Results written to {args.output}")
+
+    if args.compare and compare(results, args.compare):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
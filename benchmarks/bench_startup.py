@@ -0,0 +1,130 @@
+"""
+Startup benchmark: import time per module and cold start per subcommand
+Every measurement runs in a fresh interpreter, so nothing is cached in the
+process. Import times come from `python -X importtime` (cumulative time of
+the module and everything it pulls in) together with the heavy
+dependencies each import loads; cold start is the wall time of one
+`prelist.py <command>` process on a small synthetic PDF (benchmarks/synth_dsrt.py),
+with the page-text cache disabled so only startup and the work itself count.
+
+Usage:
+    python3 benchmarks/bench_startup.py [--pages 20] [--repeat 5] [--output startup.json]
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from synth_dsrt import write_document
+
+# Modules whose import time is measured: the heavy dependencies, then the tools
+MODULES = ("fitz", "qrcode", "PIL.Image", "tkinter", "cv2", "numpy", "concurrent.futures.process",
+           "prelist", "pdf_text", "text_cache", "form_profiles", "addQR", "split", "pipeline", "export",
+           "verify", "batch", "stream_api", "server", "watch")
+
+# Dependencies reported when an import loads them
+HEAVY = ("fitz", "qrcode", "PIL", "tkinter", "cv2", "numpy", "multiprocessing")
+
+# Subcommand runs: name -> prelist.py arguments ({pdf} and {out} are filled in)
+COMMANDS = {
+    "help": ["--help"],
+    "qr --help": ["qr", "--help"],
+    "preview": ["preview", "{pdf}"],
+    "split": ["split", "{pdf}", "-o", "{out}", "-j", "1"],
+    "qr": ["qr", "{pdf}", "-j", "1"],
+    "qr-split": ["qr-split", "{pdf}", "-o", "{out}", "-j", "1"],
+}
+
+def import_time(module: str) -> tuple[float | None, list[str]]:
+    """(cumulative import time in ms, heavy dependencies loaded), None if the module is not installed"""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], cwd=ROOT,
+                          capture_output=True, text=True)
+    if proc.returncode != 0:
+        return None, []
+    loaded = set()
+    cumulative = None
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative_us, name = line.split("|")
+        if name.strip() == module and not name[1:].startswith(" "):
+            cumulative = int(cumulative_us) / 1000
+        top = name.strip().split(".")[0]
+        if top in HEAVY:
+            loaded.add(top)
+    return cumulative, sorted(loaded)
+
+def cold_start(args: list[str], env: dict) -> float:
+    """Wall time in seconds of one prelist.py process"""
+    start = time.perf_counter()
+    subprocess.run([sys.executable, os.path.join(ROOT, "prelist.py"), *args], cwd=ROOT, env=env,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pages", type=int, default=20, help="pages of the synthetic PDF (default: 20)")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per measurement, best time is kept")
+    parser.add_argument("--output", help="JSON results file")
+    args = parser.parse_args()
+    repeat = max(1, args.repeat)
+
+    print(f"{'='*80}")
+    print(f"IMPORT TIME (best of {repeat}, fresh interpreter each)")
+    print(f"{'='*80}")
+    imports = {}
+    for module in MODULES:
+        times, loaded = [], []
+        for _ in range(repeat):
+            ms, loaded = import_time(module)
+            if ms is None:
+                break
+            times.append(ms)
+        if not times:
+            print(f"  {module:<28} not installed")
+            continue
+        imports[module] = {"ms": round(min(times), 1), "loads": loaded}
+        print(f"  {module:<28} {min(times):>8.1f} ms  {', '.join(loaded)}")
+
+    print(f"\n{'='*80}")
+    print(f"COLD START prelist.py <command> ({args.pages}-page PDF, best of {repeat})")
+    print(f"{'='*80}")
+    env = {**os.environ, "PRELIST_TEXT_CACHE": "0"}
+    starts = {}
+    with tempfile.TemporaryDirectory(prefix="bench_startup_") as workdir:
+        pdf_file = os.path.join(workdir, "synthetic.pdf")
+        write_document(pdf_file, args.pages, 1)
+        for name, command in COMMANDS.items():
+            times = []
+            for run in range(repeat):
+                out = os.path.join(workdir, f"out_{len(starts)}_{run}")
+                times.append(cold_start([arg.format(pdf=pdf_file, out=out) for arg in command], env))
+            starts[name] = round(min(times), 3)
+            print(f"  {name:<28} {min(times):>8.3f} s")
+
+    if args.output:
+        results = {
+            "meta": {
+                "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "pages": args.pages,
+                "repeat": repeat,
+            },
+            "imports": imports,
+            "cold_start": starts,
+        }
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\n✓ Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Synthetic DSRT/prelist PDF generator for the benchmarks
+Builds landscape forms offline: every sample is a marker page
+("BLOK IV. CATATAN"), an identity page ("Identitas Blok Sensus" for DSRT,
+"Identitas SLS" for prelist, plus upper-case and no-keyword variants) and
+household list pages, with the header strings from text_clean.REMOVE_STRINGS.
+Half of the identity pages draw each label and its ": value" as two spans
+on one baseline, as the real forms do, so extraction has to join them.
+The output is deterministic for a given page count and seed.
+
+Usage:
+    python3 benchmarks/synth_dsrt.py output.pdf --pages 1000 [--seed N]
+"""
+import argparse
+import os
+import random
+import sys
+
+import fitz
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from text_clean import REMOVE_STRINGS
+
+PAGE_WIDTH, PAGE_HEIGHT = 1008, 612  # 14 x 8.5 in, landscape like the real forms
+MARKER = "BLOK IV. CATATAN"
+LINE_HEIGHT = 14  # insert_text line spacing at fontsize 10
+VALUE_X = 320  # x of the value span of a two-span identity line
+
+PROVINCES = ["PAPUA", "PAPUA PEGUNUNGAN", "ACEH", "JAWA BARAT", "NUSA TENGGARA TIMUR", "MALUKU"]
+REGENCIES = ["YALIMO", "JAYAPURA", "MERAUKE", "ACEH BESAR", "KOTA BANDUNG", "KUPANG"]
+DISTRICTS = ["ALIMUHUK", "ABENAHO", "SUKAJADI", "KOTA RAJA", "OEBOBO", "SENTANI"]
+VILLAGES = ["KAMPUNG BARU", "DESA_X", "CIPEDES", "HOLTEKAMP", "WAENA", "NAIONI"]
+
+# (keyword, header lines, identity labels) per form layout
+LAYOUTS = [
+    ("Identitas Blok Sensus",
+     ["SERUTI24.DSRT", "DAFTAR SAMPEL RUMAH TANGGA", "RAHASIA",
+      "SURVEI EKONOMI RUMAH TANGGA TRIWULANAN 2024", "Triwulan 2", "BLOK I. IDENTITAS SAMPEL BLOK SENSUS"],
+     ["1. Provinsi", "2. Kabupaten/Kota", "3. Kecamatan", "4. Desa/Kelurahan", "Nomor Blok Sensus"]),
+    ("Identitas SLS",
+     ["DAFTAR PEMUTAKHIRAN RUMAH TANGGA", "Sumber Data : DTSEN", "SAMPEL SERUTI",
+      "BLOK I. IDENTITAS SAMPEL SATUAN LINGKUNGAN SETEMPAT"],
+     ["1. Provinsi", "Kabupaten/Kota *)", "3. Kecamatan", "Desa/Kelurahan *)", "6. Kode SLS/Sub-SLS"]),
+    ("IDENTITAS SAMPEL BLOK SENSUS",
+     ["SURVEI SOSIAL EKONOMI NASIONAL 2020", "RAHASIA"],
+     ["1. Provinsi", "2. Kabupaten/Kota", "3. Kecamatan", "4. Desa/Kelurahan"]),
+    (None,
+     ["SERUTI24.DSRT", "DAFTAR SAMPEL RUMAH TANGGA"],
+     ["1. Provinsi", "2. Kabupaten/Kota", "3. Kecamatan"]),
+]
+
+# Header strings not already used by a layout, spread over the other pages;
+# the marker ("BLOK IV. ...") is left out so only marker pages carry it
+FILLER_HEADERS = [s for s in REMOVE_STRINGS
+                  if not s.startswith(("BLOK I.", "BLOK IV.", "Identitas")) and MARKER.lower() not in s.lower()]
+
+def identity_lines(rng: random.Random, sample: int) -> list[str | tuple[str, str]]:
+    """Header and identity lines of one identity page, (label, value) for a two-span line"""
+    keyword, headers, labels = LAYOUTS[sample % len(LAYOUTS)] if rng.random() < 0.95 else LAYOUTS[-1]
+    values = [f"{rng.choice(PROVINCES)} {rng.randint(11, 97)}", f"{rng.choice(REGENCIES)} {rng.randint(1, 99):02d}",
+              f"{rng.choice(DISTRICTS)} {rng.randint(1, 999):03d}", f"{rng.choice(VILLAGES)} {rng.randint(1, 999):03d}",
+              f"{sample:04d}{rng.randint(0, 9)}"]
+    lines = list(headers)
+    two_spans = rng.random() < 0.5
+    for label, value in zip(labels, values):
+        prefix = f"{keyword} " if keyword else ""
+        lines.append((f"{prefix}{label}", f": {value}") if two_spans else f"{prefix}{label} {value}")
+    lines += rng.sample(FILLER_HEADERS, 3)
+    return lines
+
+def household_lines(rng: random.Random, rows: int) -> list[str]:
+    """Lines of one household list page"""
+    lines = [rng.choice(FILLER_HEADERS), "No. Nama Kepala Rumah Tangga Alamat Jumlah ART"]
+    for row in range(1, rows + 1):
+        lines.append(f"{row}. KRT {rng.randint(1000, 9999)} RT {rng.randint(1, 20):03d} {rng.randint(1, 9)}")
+    return lines
+
+def build_document(pages: int, seed: int = 1) -> fitz.Document:
+    """
+    In-memory document with exactly `pages` pages. Samples are 3 to 5 pages
+    long (marker page, identity page, list pages); the last sample is cut
+    short when the page budget runs out.
+    """
+    rng = random.Random(seed)
+    pdf_doc = fitz.open()
+    sample = 0
+
+    while pdf_doc.page_count < pages:
+        sample_pages = [[MARKER, "Catatan petugas", rng.choice(FILLER_HEADERS)], identity_lines(rng, sample)]
+        for _ in range(rng.randint(1, 3)):
+            sample_pages.append(household_lines(rng, rng.randint(10, 25)))
+
+        for lines in sample_pages[:pages - pdf_doc.page_count]:
+            page = pdf_doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+            if all(isinstance(line, str) for line in lines):
+                page.insert_text((40, 50), "\n".join(lines), fontsize=10)
+                continue
+            for i, line in enumerate(lines):
+                y = 50 + i * LINE_HEIGHT
+                if isinstance(line, str):
+                    page.insert_text((40, y), line, fontsize=10)
+                else:
+                    page.insert_text((40, y), line[0], fontsize=10)
+                    page.insert_text((VALUE_X, y), line[1], fontsize=10)
+        sample += 1
+
+    return pdf_doc
+
+def write_document(output_file: str, pages: int, seed: int = 1) -> str:
+    """Generate and save a synthetic form, returns output_file"""
+    pdf_doc = build_document(pages, seed)
+    pdf_doc.save(output_file, garbage=3, deflate=True)
+    pdf_doc.close()
+    return output_file
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("output_file")
+    parser.add_argument("--pages", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    write_document(args.output_file, args.pages, args.seed)
+    print(f"✓ {args.output_file}: {args.pages} page(s), {os.path.getsize(args.output_file) / 1024:.0f} KB")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,293 @@
+"""
+CSV / Excel export of the identity data of every marker segment
+One row per segment: source PDF, output file, page range, the parsed
+identity columns (parsed with the form profile's field labels, see
+text_clean.Cleaner.parse_identity_fields) and the QR payload.
+Rows are written as they are produced (CSV, or a write-only XLSX whose
+sheet is streamed into the archive), so memory stays flat for any number
+of segments. split_pdf_by_marker and stamp_and_split accept an `export`
+callback and reuse the identity text of their own extraction pass; this
+module's command line does an export-only pass without writing PDFs.
+
+Usage:
+    python3 export.py input.pdf [more.pdf ...] -o identitas.xlsx [--form-profile auto]
+"""
+import argparse
+import csv
+import os
+import re
+import zipfile
+from html import escape
+
+from form_profiles import profile_clips, profile_names, resolve_form_profile
+from pdf_text import CLIP_PROFILES, extract_identity_text, extract_page_text, iter_marker_segments
+from run_log import RunStats, get_logger, setup_logging
+from text_cache import open_text_cache
+from text_clean import DEFAULT_CLEANER, Cleaner
+
+log = get_logger("export")
+
+# Output columns, in order
+EXPORT_COLUMNS = [
+    "source", "file", "start_page", "end_page",
+    "provinsi", "kode_provinsi", "kabupaten_kota", "kode_kabupaten_kota",
+    "kecamatan", "kode_kecamatan", "desa", "kode_desa", "kode_sampel",
+    "payload",
+]
+
+# Supported formats by file extension
+EXPORT_FORMATS = {".csv": "csv", ".xlsx": "xlsx"}
+
+def identity_row(source: str, filename: str | None, start_page: int, end_page: int,
+                 next_page_text: str | None, payload: str, cleaner: Cleaner = DEFAULT_CLEANER) -> dict:
+    """
+    Export row of one segment (pages 0-based, end exclusive, as in
+    iter_marker_segments; written 1-based). next_page_text is the identity
+    page text the caller already extracted (None if there is none), parsed
+    with the cleaner's (form profile's) field labels.
+    """
+    row = {"source": source, "file": filename or "", "start_page": start_page + 1, "end_page": end_page,
+           "payload": payload}
+    row.update(cleaner.parse_identity_fields(next_page_text or ""))
+    return row
+
+# Characters not allowed in XML 1.0 (control characters except tab/newline/CR)
+_XML_ILLEGAL_RE = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+def column_letter(index: int) -> str:
+    """0 -> A, 25 -> Z, 26 -> AA"""
+    letters = ""
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+class XLSXWriter:
+    """
+    Minimal write-only XLSX (one sheet, inline strings, no styles). The
+    sheet XML is streamed into the ZIP row by row, so nothing accumulates.
+    """
+
+    STATIC_PARTS = {
+        "[Content_Types].xml": (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/xl/workbook.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+            '<Override PartName="/xl/worksheets/sheet1.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+            '</Types>'),
+        "_rels/.rels": (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            '<Relationship Id="rId1" '
+            'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+            'Target="xl/workbook.xml"/>'
+            '</Relationships>'),
+        "xl/workbook.xml": (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+            'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+            '<sheets><sheet name="Identitas" sheetId="1" r:id="rId1"/></sheets>'
+            '</workbook>'),
+        "xl/_rels/workbook.xml.rels": (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            '<Relationship Id="rId1" '
+            'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+            'Target="worksheets/sheet1.xml"/>'
+            '</Relationships>'),
+    }
+
+    def __init__(self, path: str, columns: list[str]):
+        self.columns = columns
+        self.letters = [column_letter(i) for i in range(len(columns))]
+        self.rows = 0
+        self.archive = zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED)
+        for name, content in self.STATIC_PARTS.items():
+            self.archive.writestr(name, content)
+        self.sheet = self.archive.open("xl/worksheets/sheet1.xml", "w", force_zip64=True)
+        self.sheet.write(b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                         b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                         b'<sheetData>')
+        self.write_values(columns)
+
+    def write_values(self, values: list):
+        self.rows += 1
+        cells = []
+        for letter, value in zip(self.letters, values):
+            ref = f"{letter}{self.rows}"
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                cells.append(f'<c r="{ref}"><v>{value}</v></c>')
+            elif value not in (None, ""):
+                # Kept as text: area codes and NKS have leading zeros
+                text = escape(_XML_ILLEGAL_RE.sub("", str(value)), quote=False)
+                cells.append(f'<c r="{ref}" t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>')
+        self.sheet.write(f'<row r="{self.rows}">{"".join(cells)}</row>'.encode("utf-8"))
+
+    def writerow(self, row: dict):
+        self.write_values([row.get(column) for column in self.columns])
+
+    def close(self):
+        self.sheet.write(b"</sheetData></worksheet>")
+        self.sheet.close()
+        self.archive.close()
+
+class CSVWriter:
+    """CSV with a UTF-8 BOM, so Excel detects the encoding"""
+
+    def __init__(self, path: str, columns: list[str]):
+        self.file = open(path, "w", encoding="utf-8-sig", newline="")
+        self.writer = csv.DictWriter(self.file, fieldnames=columns, extrasaction="ignore")
+        self.writer.writeheader()
+
+    def writerow(self, row: dict):
+        self.writer.writerow(row)
+
+    def close(self):
+        self.file.close()
+
+class IdentityExport:
+    """
+    Streaming identity export to .csv or .xlsx (chosen by the extension).
+    Usable as the `export` callback of split_pdf_by_marker / stamp_and_split
+    (export(row)) and as a context manager.
+    """
+
+    def __init__(self, path: str, columns: list[str] = None):
+        extension = os.path.splitext(path)[1].lower()
+        if extension not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown export format '{extension}', expected one of {sorted(EXPORT_FORMATS)}")
+        self.path = path
+        self.rows = 0
+        writer_class = XLSXWriter if EXPORT_FORMATS[extension] == "xlsx" else CSVWriter
+        self.writer = writer_class(path, columns or EXPORT_COLUMNS)
+
+    def __call__(self, row: dict):
+        self.writer.writerow(row)
+        self.rows += 1
+
+    def close(self):
+        self.writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def export_identities(pdf_file: str, export, marker: str = None, clip_profile: str = None,
+                      stats: RunStats = None, form_profile: str = None) -> int:
+    """
+    Export-only pass: one row per marker segment of pdf_file, without
+    writing any PDF (file column left empty). form_profile is handled as in
+    split_pdf_by_marker.
+    Returns the number of rows.
+    """
+    import fitz
+    stats = stats or RunStats()
+    source = os.path.basename(pdf_file)
+    rows = 0
+
+    with fitz.open(pdf_file) as pdf_doc:
+        profile = resolve_form_profile(pdf_doc, form_profile)
+        clips = profile_clips(profile, form_profile, clip_profile)
+        cleaner = profile.cleaner
+        cache = open_text_cache(pdf_file, pdf_doc.page_count, stats)
+        try:
+            segments = stats.timed_iter("extract", iter_marker_segments(pdf_doc, marker or profile.marker, clips,
+                                                                        cleaner, cache))
+            for start_page, end_page, next_page_text in segments:
+                with stats.stage("clean"):
+                    payload = cleaner.build_qr_payload(next_page_text) if next_page_text else ""
+                    row = identity_row(source, None, start_page, end_page, next_page_text, payload, cleaner)
+                with stats.stage("export"):
+                    export(row)
+                rows += 1
+        finally:
+            if cache is not None:
+                cache.close()
+        stats.count("pages_scanned", pdf_doc.page_count)
+
+    stats.count("rows_exported", rows)
+    return rows
+
+def export_recorded_segments(pdf_file: str, segments: list[dict], export, form_profile: str = None,
+                             clip_profile: str = None, stats: RunStats = None, file_hash: str = None,
+                             no_data: str = "", text_cache: bool = True) -> int:
+    """
+    Export rows of an input skipped as unchanged, from the segments its
+    manifest entry records (0-based start, exclusive end, file). Only the
+    identity page of each segment is read again, through the text cache.
+    no_data is the payload of an identity page without data ("no_data" for
+    split, as in its filenames). text_cache=False reads the pages without the
+    page text cache. Returns the number of rows.
+    """
+    import fitz
+    stats = stats or RunStats()
+    source = os.path.basename(pdf_file)
+
+    with fitz.open(pdf_file) as pdf_doc:
+        profile = resolve_form_profile(pdf_doc, form_profile)
+        clips = profile_clips(profile, form_profile, clip_profile)
+        cleaner = profile.cleaner
+        cache = open_text_cache(pdf_file, pdf_doc.page_count, stats, file_hash) if text_cache else None
+        try:
+            for segment in segments:
+                start_page, end_page = segment["start"], segment["end"]
+                next_page_text = None
+                if start_page + 1 < pdf_doc.page_count:
+                    with stats.stage("extract"):
+                        page = pdf_doc[start_page + 1]
+                        if clips:
+                            next_page_text = extract_identity_text(page, clips, cleaner, cache)
+                        else:
+                            next_page_text = extract_page_text(page, cache=cache)
+                with stats.stage("clean"):
+                    payload = (cleaner.build_qr_payload(next_page_text) or no_data) if next_page_text else ""
+                    row = identity_row(source, segment["file"], start_page, end_page, next_page_text, payload,
+                                       cleaner)
+                with stats.stage("export"):
+                    export(row)
+        finally:
+            if cache is not None:
+                cache.close()
+
+    stats.count("rows_exported", len(segments))
+    return len(segments)
+
+def main(argv: list[str] = None) -> int:
+    """Command line entry point, returns the process exit code"""
+    parser = argparse.ArgumentParser(description="Export the identity data of every marker segment to CSV/XLSX")
+    parser.add_argument("inputs", nargs="+", help="PDF files")
+    parser.add_argument("-o", "--output", required=True, help="output file (.csv or .xlsx)")
+    parser.add_argument("--marker", help="marker text (default: the form profile's marker)")
+    parser.add_argument("--clip-profile", choices=sorted(CLIP_PROFILES),
+                        help="only read the header/identity regions of this form profile")
+    parser.add_argument("--form-profile", choices=profile_names(),
+                        help="form profile (form_profiles.json), 'auto' detects it per file")
+    parser.add_argument("--log-level", choices=["DEBUG", "INFO", "WARNING", "ERROR"], default="INFO")
+    args = parser.parse_args(argv)
+
+    setup_logging(args.log_level)
+    stats = RunStats()
+    failed = 0
+    with IdentityExport(args.output) as export:
+        for pdf_file in args.inputs:
+            try:
+                rows = export_identities(pdf_file, export, args.marker, args.clip_profile, stats,
+                                         args.form_profile)
+                log.info(f"✓ {os.path.basename(pdf_file)}: {rows} row(s)")
+            except Exception as e:
+                failed += 1
+                log.error(f"✗ {os.path.basename(pdf_file)}: {type(e).__name__}: {e}")
+
+    log.info(f"\n✓ {export.rows} row(s) written to {args.output}")
+    stats.log_summary(log)
+    return 0 if not failed else 2
+
+if __name__ == "__main__":
+    raise SystemExit(main())
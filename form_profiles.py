@@ -0,0 +1,169 @@
+"""
+Declarative form profiles
+A profile describes one form family: the strings that identify it on its
+first pages, the segment marker, the identity keywords (priority order),
+the header strings removed from the payload, the identity field labels,
+the QR placement and the clip regions. The built-in profile is the 2024
+SERUTI/SUSENAS vocabulary; more profiles are read from form_profiles.json
+next to this file (or the file named by PRELIST_PROFILES), so a new form is
+a config change. Each profile is compiled once (text_clean.Cleaner); a
+document's profile is chosen once from its first pages and every page is
+then processed with that profile only.
+"""
+import json
+import os
+from functools import lru_cache
+
+from pdf_text import CLIP_PROFILES
+from run_log import get_logger
+from text_clean import IDENTITY_COLUMNS, IDENTITY_FIELDS, POSSIBLE_KEYWORDS, REMOVE_STRINGS, Cleaner
+
+log = get_logger("form_profiles")
+
+# Default marker and QR placement (in points, from bottom-left of the page)
+DEFAULT_MARKER = 'BLOK IV. CATATAN'
+DEFAULT_QR = {"size": 180, "x": 780, "y": 50}
+
+BUILTIN_PROFILE = "seruti2024"
+
+# Profile file read on top of the built-in profile
+PROFILES_FILE = os.environ.get("PRELIST_PROFILES",
+                               os.path.join(os.path.dirname(os.path.abspath(__file__)), "form_profiles.json"))
+
+# Pages read to detect the profile of a document
+DETECT_PAGES = 3
+
+# Keys of a profile in the JSON file; all but "name" are optional and,
+# except "detect", inherited from the profile named in "extends"
+# (default: the built-in profile)
+PROFILE_KEYS = {"name", "extends", "description", "detect", "marker", "keywords", "remove_strings", "fields",
+                "qr", "clips"}
+
+# Mapping keys merged key by key with the parent profile instead of replaced
+MERGED_KEYS = ("fields", "qr", "clips")
+
+BUILTIN_SPEC = {
+    "name": BUILTIN_PROFILE,
+    "description": "SERUTI 2024 DSRT/prelist and SUSENAS forms",
+    "detect": ["SERUTI24.DSRT", "DAFTAR SAMPEL RUMAH TANGGA", "DAFTAR PEMUTAKHIRAN RUMAH TANGGA",
+               "SURVEI SOSIAL EKONOMI NASIONAL"],
+    "marker": DEFAULT_MARKER,
+    "keywords": POSSIBLE_KEYWORDS,
+    "remove_strings": REMOVE_STRINGS,
+    "fields": IDENTITY_FIELDS,
+    "qr": DEFAULT_QR,
+    "clips": CLIP_PROFILES["dsrt"],
+}
+
+class FormProfile:
+    """One compiled form profile"""
+
+    def __init__(self, spec: dict):
+        self.name = spec["name"]
+        self.description = spec.get("description", "")
+        self.detect = list(spec.get("detect", []))
+        self.marker = spec["marker"]
+        self.qr = {key: float(spec["qr"][key]) for key in ("size", "x", "y")}
+        self.clips = {region: tuple(spec["clips"][region]) for region in ("marker", "identity")}
+        self.cleaner = Cleaner(spec["keywords"], spec["remove_strings"], spec["fields"])
+        self._detect_lower = [s.lower() for s in self.detect]
+
+    def detect_score(self, text_lower: str) -> int:
+        """Number of this profile's detect strings found in the (lowercased) text"""
+        return sum(1 for s in self._detect_lower if s in text_lower)
+
+    def __repr__(self):
+        return f"FormProfile({self.name!r})"
+
+def compile_profile(spec: dict, specs: dict[str, dict]) -> tuple[dict, FormProfile]:
+    """Resolve "extends" against the already loaded specs and compile; returns (full spec, profile)"""
+    unknown = set(spec) - PROFILE_KEYS
+    if unknown:
+        raise ValueError(f"Form profile '{spec.get('name')}': unknown key(s) {sorted(unknown)}")
+    base_name = spec.get("extends", BUILTIN_PROFILE)
+    if base_name not in specs:
+        raise ValueError(f"Form profile '{spec.get('name')}' extends unknown profile '{base_name}'")
+
+    full_spec = {key: value for key, value in specs[base_name].items() if key not in ("detect", "description")}
+    for key, value in spec.items():
+        if key in MERGED_KEYS:
+            full_spec[key] = {**full_spec[key], **value}
+        elif key != "extends":
+            full_spec[key] = value
+    unknown_fields = set(full_spec["fields"]) - set(IDENTITY_COLUMNS)
+    if unknown_fields:
+        raise ValueError(f"Form profile '{spec['name']}': unknown identity field(s) {sorted(unknown_fields)}, "
+                         f"expected {IDENTITY_COLUMNS}")
+    return full_spec, FormProfile(full_spec)
+
+@lru_cache(maxsize=None)
+def load_profiles(path: str = PROFILES_FILE) -> dict[str, FormProfile]:
+    """
+    Compiled profiles by name: those of the profile file in file order (a
+    missing file means none), then the built-in profile unless the file
+    redefines it. Cached, so each profile is compiled once per process.
+    """
+    specs = {BUILTIN_PROFILE: BUILTIN_SPEC}
+    profiles = {}
+
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            config = json.load(f)
+        for spec in config.get("profiles", []):
+            if "name" not in spec:
+                raise ValueError(f"{path}: every form profile needs a name")
+            specs[spec["name"]], profiles[spec["name"]] = compile_profile(spec, specs)
+
+    if BUILTIN_PROFILE not in profiles:
+        profiles[BUILTIN_PROFILE] = FormProfile(BUILTIN_SPEC)
+    return profiles
+
+def profile_names() -> list[str]:
+    """Choices for --form-profile: "auto" and every loaded profile"""
+    return ["auto"] + list(load_profiles())
+
+def get_form_profile(name: str | None = None) -> FormProfile:
+    """Profile by name; None is the built-in profile"""
+    profiles = load_profiles()
+    name = name or BUILTIN_PROFILE
+    if name not in profiles:
+        raise ValueError(f"Unknown form profile '{name}', expected one of {profile_names()}")
+    return profiles[name]
+
+def detect_form_profile(pdf_doc: "fitz.Document", pages: int = DETECT_PAGES) -> FormProfile:
+    """
+    Profile whose detect strings occur most often in the first pages of the
+    document; ties go to the profile defined first, no match to the
+    built-in profile.
+    """
+    text_lower = "\n".join(pdf_doc[page_num].get_text("text")
+                           for page_num in range(min(pages, pdf_doc.page_count))).lower()
+    best, best_score = get_form_profile(), 0
+    for profile in load_profiles().values():
+        score = profile.detect_score(text_lower)
+        if score > best_score:
+            best, best_score = profile, score
+    return best
+
+def resolve_form_profile(pdf_doc: "fitz.Document", name: str | None) -> FormProfile:
+    """
+    Profile for one document: None is the built-in profile (the tools'
+    behaviour without profiles), "auto" detects it, anything else is a name.
+    """
+    if name == "auto":
+        profile = detect_form_profile(pdf_doc)
+        log.info(f"Form profile: {profile.name} (detected)")
+        return profile
+    return get_form_profile(name)
+
+def profile_clips(profile: FormProfile, form_profile: str | None, clip_profile: str | None) -> dict | None:
+    """
+    Clip regions to use: an explicit clip_profile (pdf_text.CLIP_PROFILES)
+    wins; with a form profile chosen its regions are used; without either
+    whole pages are read.
+    """
+    if clip_profile is not None:
+        if clip_profile not in CLIP_PROFILES:
+            raise ValueError(f"Unknown clip profile '{clip_profile}', expected one of {sorted(CLIP_PROFILES)}")
+        return CLIP_PROFILES[clip_profile]
+    return profile.clips if form_profile is not None else None
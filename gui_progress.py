@@ -0,0 +1,90 @@
+"""
+Tkinter progress window for addQR.py and split.py
+The engine function runs in a background thread; the window polls its
+progress updates, shows a progress bar with pages/s and ETA, and a Cancel
+button that sets the engine's cancel event. The UI thread never blocks.
+"""
+import queue
+import threading
+import tkinter as tk
+from tkinter import ttk
+
+from progress import RateEstimator, format_eta
+
+# How often the window picks up progress updates from the worker
+POLL_MS = 100
+
+def run_with_progress(root: tk.Tk, title: str, func, *args, **kwargs):
+    """
+    Call func(*args, progress=..., cancel=..., **kwargs) in a worker thread
+    while a progress window is shown as a Toplevel of root (the application's
+    single Tk instance, which may be withdrawn). Returns func's result, or
+    re-raises its exception (progress.Cancelled when the user pressed Cancel).
+    """
+    window = tk.Toplevel(root)
+    window.title(title)
+    window.resizable(False, False)
+
+    cancel = threading.Event()
+    updates = queue.Queue()  # (done, total) tuples, None when the worker ends
+    outcome = {}
+
+    def worker():
+        try:
+            outcome["result"] = func(*args, progress=lambda done, total: updates.put((done, total)),
+                                     cancel=cancel, **kwargs)
+        except BaseException as e:
+            outcome["error"] = e
+        finally:
+            updates.put(None)
+
+    def on_cancel():
+        cancel.set()
+        cancel_button.config(state="disabled")
+        status.config(text="Cancelling...")
+
+    ttk.Label(window, text=title).pack(padx=16, pady=(12, 4), anchor="w")
+    bar = ttk.Progressbar(window, length=420, mode="determinate")
+    bar.pack(padx=16, pady=4)
+    status = ttk.Label(window, text="Starting...", width=60)
+    status.pack(padx=16, pady=4, anchor="w")
+    cancel_button = ttk.Button(window, text="Cancel", command=on_cancel)
+    cancel_button.pack(padx=16, pady=(4, 12), anchor="e")
+    window.protocol("WM_DELETE_WINDOW", on_cancel)
+
+    rate = RateEstimator()
+
+    def poll():
+        latest = None
+        finished = False
+        try:
+            while True:
+                item = updates.get_nowait()
+                if item is None:
+                    finished = True
+                    break
+                latest = item
+        except queue.Empty:
+            pass
+
+        if latest is not None and not cancel.is_set():
+            done, total = latest
+            bar.config(maximum=max(total, 1), value=done)
+            pages_per_second, remaining = rate.estimate(done, total)
+            status.config(text=f"{done}/{total} pages   {pages_per_second:.1f} pages/s   ETA {format_eta(remaining)}")
+
+        if finished:
+            window.destroy()
+        else:
+            window.after(POLL_MS, poll)
+
+    thread = threading.Thread(target=worker, daemon=True)
+    thread.start()
+    window.after(POLL_MS, poll)
+    # Runs the event loop until poll() destroys the window
+    window.wait_window()
+    thread.join()
+
+    if "error" in outcome:
+        raise outcome["error"]
+    return outcome["result"]
@@ -0,0 +1,210 @@
+"""
+Content-hash manifest for incremental and resumable reruns
+A JSON sidecar records, per input PDF, the file hash, the settings used,
+the segment page ranges, QR payloads and output files. A later run with the
+same hash and settings skips the input; a changed input only rewrites the
+segments whose content or payload changed. Entries are checkpointed while
+a document is processed, so an interrupted run resumes where it stopped.
+"""
+import hashlib
+import json
+import os
+import re
+
+from run_log import get_logger
+
+log = get_logger("manifest")
+
+# Sidecar file name inside a split output folder
+MANIFEST_NAME = ".prelist_manifest.json"
+
+# Save the manifest after this many new segments (resume granularity)
+CHECKPOINT_EVERY = 25
+
+def file_sha256(path: str) -> str:
+    """SHA-256 of a file, read in 1 MB chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+# Indirect reference inside an object's source ("12 0 R")
+_REF_RE = re.compile(r"\b(\d+) 0 R\b")
+
+def page_resources_source(pdf_doc: "fitz.Document", xref: int) -> str:
+    """Resources entry of a page (a dictionary or a reference), inherited from the page tree if needed"""
+    while xref:
+        kind, value = pdf_doc.xref_get_key(xref, "Resources")
+        if kind != "null":
+            return value
+        kind, value = pdf_doc.xref_get_key(xref, "Parent")
+        xref = int(value.split()[0]) if kind == "xref" else 0
+    return ""
+
+def update_resources_digest(pdf_doc: "fitz.Document", page: "fitz.Page", digest, stream_digests: dict):
+    """
+    Add everything the page draws with to digest: its resources and every
+    object reachable from them (images, forms, fonts, patterns, ...) with
+    their stream data. Object numbers are replaced by their order of first
+    use, so a renumbered but otherwise identical file hashes the same.
+    stream_digests caches stream hashes by xref across pages.
+    """
+    order = {}
+    pending = []
+
+    def normalize(source: str) -> str:
+        def number(match):
+            xref = int(match.group(1))
+            if xref not in order:
+                order[xref] = len(order)
+                pending.append(xref)
+            return f"#{order[xref]}"
+        return _REF_RE.sub(number, source)
+
+    digest.update(normalize(page_resources_source(pdf_doc, page.xref)).encode())
+    while pending:
+        xref = pending.pop(0)
+        source = pdf_doc.xref_object(xref, compressed=True)
+        if source.startswith("<</Type/Page"):
+            # A link back into the page tree (e.g. /P of a form): not followed
+            digest.update(b"\0page")
+            continue
+        digest.update(b"\0" + normalize(source).encode())
+        if pdf_doc.xref_is_stream(xref):
+            if xref not in stream_digests:
+                stream_digests[xref] = hashlib.sha256(pdf_doc.xref_stream_raw(xref) or b"").digest()
+            digest.update(stream_digests[xref])
+
+def segment_sha256(pdf_doc: "fitz.Document", start_page: int, end_page: int) -> str:
+    """
+    SHA-256 of pages start_page..end_page-1: content streams plus the
+    resources they draw (a replaced scan image changes the hash even though
+    the content stream still just says "/Im0 Do")
+    """
+    digest = hashlib.sha256()
+    stream_digests = {}
+    for page_num in range(start_page, end_page):
+        page = pdf_doc[page_num]
+        digest.update(page.read_contents())
+        update_resources_digest(pdf_doc, page, digest, stream_digests)
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+class Manifest:
+    """JSON manifest file: {input path: entry}"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.entries = {}
+        if os.path.exists(path):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError) as e:
+                log.warning(f"  Warning: ignoring unreadable manifest {path}: {e}")
+
+    def get(self, pdf_file: str) -> dict | None:
+        return self.entries.get(os.path.abspath(pdf_file))
+
+    def put(self, pdf_file: str, entry: dict):
+        """Store the entry and write the file atomically"""
+        self.entries[os.path.abspath(pdf_file)] = entry
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, indent=1, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+def is_current(entry: dict | None, file_hash: str, settings: dict, output_folder: str = "") -> bool:
+    """True if a complete entry matches hash and settings and all outputs still exist"""
+    return (entry is not None and entry.get("complete") and entry.get("hash") == file_hash
+            and entry.get("settings") == settings
+            and all(os.path.exists(os.path.join(output_folder, f)) for f in entry.get("outputs", [])))
+
+def is_resumable(entry: dict | None, file_hash: str, settings: dict, part_file: str) -> bool:
+    """
+    True if an incomplete windowed QR run (see addQR.stamp_file_windowed)
+    with the same hash and settings left a working copy that still holds
+    every window it checkpointed
+    """
+    return (entry is not None and not entry.get("complete") and entry.get("hash") == file_hash
+            and entry.get("settings") == settings and "part_size" in entry
+            and os.path.exists(part_file) and os.path.getsize(part_file) >= entry["part_size"])
+
+class IncrementalSplit:
+    """
+    Tracks one split of one input against its previous manifest entry.
+    Unchanged segments (same content hash and payload, file still present)
+    are reused instead of rewritten; previous outputs that are no longer
+    produced are removed when the run finishes. After a settings change
+    nothing is reused, but the previous outputs are still replaced/removed.
+    """
+
+    def __init__(self, manifest: Manifest, pdf_file: str, file_hash: str, settings: dict, output_folder: str):
+        self.manifest = manifest
+        self.pdf_file = pdf_file
+        self.file_hash = file_hash
+        self.settings = settings
+        self.output_folder = output_folder
+        self.segments = []
+
+        previous = manifest.get(pdf_file)
+        previous_segments = previous.get("segments", []) if previous else []
+        same_settings = previous is not None and previous.get("settings") == settings
+
+        self.previous_segments = previous_segments
+        # (segment hash, payload) -> reusable filenames, in previous order
+        self.reusable = {}
+        # Previous outputs not claimed yet: may be overwritten by this run
+        self.replaceable = set()
+        for segment in previous_segments:
+            if os.path.exists(os.path.join(output_folder, segment["file"])):
+                if same_settings:
+                    self.reusable.setdefault((segment["hash"], segment["payload"]), []).append(segment["file"])
+                self.replaceable.add(segment["file"])
+
+    def reuse(self, segment_hash: str, payload: str) -> str | None:
+        """Claim an unchanged previous output for this segment, if any"""
+        for filename in self.reusable.get((segment_hash, payload), []):
+            if filename in self.replaceable:
+                self.replaceable.discard(filename)
+                return filename
+        return None
+
+    def claim(self, filename: str):
+        """A new output is written under filename (possibly over a stale one)"""
+        self.replaceable.discard(filename)
+
+    def add(self, start_page: int, end_page: int, segment_hash: str, payload: str, filename: str):
+        self.segments.append({"start": start_page, "end": end_page, "hash": segment_hash,
+                              "payload": payload, "file": filename})
+        if len(self.segments) % CHECKPOINT_EVERY == 0:
+            self._save(complete=False)
+
+    def checkpoint(self):
+        """Save progress so far (e.g. when the run is cancelled)"""
+        self._save(complete=False)
+
+    def finish(self, pages: int):
+        """Record the completed run and remove stale outputs of this input"""
+        for filename in sorted(self.replaceable):
+            os.remove(os.path.join(self.output_folder, filename))
+            log.info(f"  Removed stale output: {filename}")
+        self.replaceable.clear()
+        self._save(complete=True, pages=pages)
+
+    def _save(self, complete: bool, pages: int = None):
+        segments = self.segments
+        if not complete:
+            # Keep unclaimed previous outputs known, so a resumed run can
+            # still reuse or replace them instead of adding _1 copies
+            segments = segments + [s for s in self.previous_segments if s["file"] in self.replaceable]
+        self.manifest.put(self.pdf_file, {
+            "hash": self.file_hash,
+            "settings": self.settings,
+            "complete": complete,
+            "pages": pages,
+            "marker_pages": [segment["start"] for segment in self.segments],
+            "segments": segments,
+            "outputs": [segment["file"] for segment in segments],
+        })
@@ -0,0 +1,253 @@
+"""
+Shared PDF text extraction for addQR.py and split.py
+Each document is opened once with PyMuPDF; the same handle is used for
+text extraction and for modifying/copying pages afterwards.
+"""
+from text_clean import DEFAULT_CLEANER, Cleaner
+
+# Page regions per form profile, as fractions of the page (x0, y0, x1, y1)
+# with the origin at the top-left corner.
+#   marker:   header band probed for the marker text
+#   identity: block holding the identity lines on the page after the marker
+CLIP_PROFILES = {
+    # SERUTI/SUSENAS DSRT and prelist forms (landscape)
+    "dsrt": {"marker": (0.0, 0.0, 1.0, 0.3), "identity": (0.0, 0.0, 1.0, 0.5)},
+}
+
+# Options for every PDF written by the tools: drop unused objects, merge
+# duplicate objects (shared fonts/images), compress all streams and pack
+# objects into object streams. garbage=4 would also compare stream contents
+# but is far too slow on documents with thousands of pages.
+SAVE_OPTIONS = {
+    "garbage": 3,
+    "deflate": True,
+    "deflate_images": True,
+    "deflate_fonts": True,
+    "use_objstms": 1,
+}
+
+# Options for appending changes to an existing PDF (windowed QR stamping):
+# only new and changed objects are written, compressed like SAVE_OPTIONS;
+# garbage collection and object streams need a full rewrite.
+INCREMENTAL_SAVE_OPTIONS = {
+    "incremental": True,
+    "encryption": 0,  # fitz.PDF_ENCRYPT_KEEP (fitz is imported lazily)
+    "deflate": True,
+    "deflate_images": True,
+    "deflate_fonts": True,
+}
+
+def copy_page_range(pdf_doc: "fitz.Document", start_page: int, end_page: int) -> "fitz.Document":
+    """New document with pages start_page..end_page-1 copied in bulk (resources shared)"""
+    import fitz
+    segment_doc = fitz.open()
+    segment_doc.insert_pdf(pdf_doc, from_page=start_page, to_page=end_page - 1)
+    return segment_doc
+
+def region_rect(page: "fitz.Page", region: tuple[float, float, float, float]) -> "fitz.Rect":
+    """Convert a fractional region to a rectangle on this page"""
+    import fitz
+    x0, y0, x1, y1 = region
+    rect = page.rect
+    return fitz.Rect(rect.x0 + x0 * rect.width, rect.y0 + y0 * rect.height,
+                     rect.x0 + x1 * rect.width, rect.y0 + y1 * rect.height)
+
+def baseline_text(page: "fitz.Page", clip: "fitz.Rect" = None) -> str:
+    """
+    Plain text of the page (or clip) with the lines that share a baseline
+    joined left to right, in order of first appearance. A label and its
+    value drawn as separate spans come out as one line, like
+    get_text("text", sort=True) but at a fraction of its cost.
+    """
+    import fitz
+    rows = []  # [baseline y, tolerance, [(x0, line text), ...]]
+    for block in page.get_text("dict", clip=clip, flags=fitz.TEXTFLAGS_TEXT)["blocks"]:
+        for line in block["lines"]:
+            spans = line["spans"]
+            if not spans:
+                continue
+            part = (line["bbox"][0], "".join(span["text"] for span in spans))
+            y = spans[0]["origin"][1]
+            for row in reversed(rows):
+                if abs(row[0] - y) <= row[1]:
+                    row[2].append(part)
+                    break
+            else:
+                rows.append([y, spans[0]["size"] / 2, [part]])
+    return "".join(" ".join(text for _, text in sorted(row[2])) + "\n" for row in rows)
+
+def region_text(page: "fitz.Page", region: tuple = None, cache=None) -> str:
+    """
+    Plain text of one page region (None: the whole page), in reading order:
+    spans on the same baseline (a label and its value) come out as one line.
+    With a cache (text_cache.DocumentTextCache of the page's source file)
+    the text is looked up there first and stored after a miss.
+    """
+    if cache is not None:
+        text = cache.get(page.number, region)
+        if text is not None:
+            return text
+    if region is not None:
+        text = baseline_text(page, region_rect(page, region))
+    else:
+        text = baseline_text(page)
+    if cache is not None:
+        cache.put(page.number, region, text)
+    return text
+
+def extract_page_text(page: "fitz.Page", region: tuple = None, cache=None) -> str:
+    """
+    Extract plain text of one page (content stream order, like PyPDF2).
+    With a region only that part of the page is extracted; if the clip comes
+    back empty the full page is used instead.
+    """
+    if region is not None:
+        text = region_text(page, region, cache)
+        if text.strip():
+            return text
+    return region_text(page, None, cache)
+
+def extract_identity_text(page: "fitz.Page", clip_profile: dict | None = None,
+                          cleaner: Cleaner = DEFAULT_CLEANER, cache=None) -> str:
+    """
+    Text of the identity page used for the QR payload. With a clip profile
+    only the identity block is extracted; the full page is used when the
+    clip is empty or contains no identity keyword of the cleaner's vocabulary.
+    """
+    if clip_profile is not None:
+        text = region_text(page, clip_profile["identity"], cache)
+        if text.strip() and cleaner.select_identity_lines(text)[0]:
+            return text
+    return region_text(page, None, cache)
+
+def extract_page_texts(pdf_doc: "fitz.Document", region: tuple = None, cache=None) -> list[str]:
+    """Extract text of all pages (optionally one region), index 0 is the first page"""
+    return [extract_page_text(page, region, cache) for page in pdf_doc]
+
+def _extract_shard(shard: tuple[str, int, int, tuple]) -> list[tuple[str, str | None]]:
+    """
+    Worker: open the file independently and extract pages start..end-1.
+    Returns (region text, full text when the region was empty) per page, so
+    the caller can fill the text cache.
+    """
+    import fitz
+    pdf_file, start, end, region = shard
+    texts = []
+    with fitz.open(pdf_file) as pdf_doc:
+        for page_num in range(start, end):
+            page = pdf_doc[page_num]
+            text = region_text(page, region)
+            texts.append((text, region_text(page) if region is not None and not text.strip() else None))
+    return texts
+
+def cached_page_texts(cache, page_count: int, region: tuple = None) -> list[str] | None:
+    """extract_page_text() of every page from the cache alone, None unless all pages are cached"""
+    page_texts = []
+    for page_num in range(page_count):
+        text = cache.get(page_num, region)
+        if text is not None and region is not None and not text.strip():
+            text = cache.get(page_num, None)
+        if text is None:
+            return None
+        page_texts.append(text)
+    return page_texts
+
+def extract_page_texts_parallel(pdf_file: str, jobs: int, page_count: int = None,
+                                region: tuple = None, cache=None) -> list[str]:
+    """
+    Extract text of all pages by splitting the document into page-range
+    shards scanned by `jobs` worker processes. Results are merged in page
+    order, so the output is identical to extract_page_texts(). With a cache
+    that already holds every page no worker is started; otherwise the
+    workers' texts are added to it.
+    """
+    import fitz
+    if page_count is None:
+        with fitz.open(pdf_file) as pdf_doc:
+            page_count = pdf_doc.page_count
+
+    if cache is not None:
+        page_texts = cached_page_texts(cache, page_count, region)
+        if page_texts is not None:
+            return page_texts
+
+    if jobs <= 1 or page_count < 2:
+        return merge_shard_texts([_extract_shard((pdf_file, 0, page_count, region))], region, cache)
+
+    # A few shards per worker keeps the pool busy when page costs vary
+    shard_count = min(page_count, jobs * 4)
+    shard_size = -(-page_count // shard_count)
+    shards = [(pdf_file, start, min(start + shard_size, page_count), region)
+              for start in range(0, page_count, shard_size)]
+
+    # Imported here: multiprocessing is only loaded when a scan is sharded
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        return merge_shard_texts(executor.map(_extract_shard, shards), region, cache)
+
+def merge_shard_texts(shards, region: tuple | None, cache=None) -> list[str]:
+    """Page texts of _extract_shard results in page order, stored in the cache when given"""
+    page_texts = []
+    for shard_texts in shards:
+        for text, full_text in shard_texts:
+            if cache is not None:
+                cache.put(len(page_texts), region, text)
+                if full_text is not None:
+                    cache.put(len(page_texts), None, full_text)
+            page_texts.append(full_text if full_text is not None else text)
+    return page_texts
+
+def open_pdf_with_text(pdf_file: str) -> tuple["fitz.Document", list[str]]:
+    """
+    Open a PDF once and return the document handle together with the text
+    of every page. The caller is responsible for closing the document.
+    """
+    import fitz
+    pdf_doc = fitz.open(pdf_file)
+    try:
+        page_texts = extract_page_texts(pdf_doc)
+    except Exception:
+        pdf_doc.close()
+        raise
+    return pdf_doc, page_texts
+
+def has_marker(page_text: str, marker: str) -> bool:
+    """Case-insensitive marker check used by both tools"""
+    return marker.lower() in page_text.lower()
+
+def find_marker_pages(page_texts: list[str], marker: str) -> list[int]:
+    """Return 0-based indexes of all pages containing the marker"""
+    return [page_num for page_num, page_text in enumerate(page_texts) if has_marker(page_text, marker)]
+
+def iter_marker_segments(pdf_doc: "fitz.Document", marker: str, clip_profile: dict | None = None,
+                         cleaner: Cleaner = DEFAULT_CLEANER, cache=None):
+    """
+    Walk the pages once and yield (start_page, end_page, next_page_text) for
+    every segment as soon as its end is known. Pages are 0-based, end_page is
+    exclusive, next_page_text is the text of start_page + 1 (None if there is
+    no such page). Pages before the first marker are not part of any segment.
+    Only the current segment's start and next page text are kept in memory.
+    With a clip profile only the header region is probed for the marker and
+    only the identity block of the next page is extracted. Text is read
+    through the page-text cache when one is given.
+    """
+    marker_region = clip_profile["marker"] if clip_profile else None
+    start_page = None
+    next_page_text = None
+
+    for page_num in range(pdf_doc.page_count):
+        page = pdf_doc[page_num]
+        page_text = extract_page_text(page, marker_region, cache)
+
+        if start_page is not None and page_num == start_page + 1:
+            next_page_text = extract_identity_text(page, clip_profile, cleaner, cache) if clip_profile else page_text
+
+        if has_marker(page_text, marker):
+            if start_page is not None:
+                yield start_page, page_num, next_page_text
+            start_page = page_num
+            next_page_text = None
+
+    if start_page is not None:
+        yield start_page, pdf_doc.page_count, next_page_text
@@ -0,0 +1,216 @@
+"""
+Fused "add QR + split" pipeline
+Finds each marker segment once, builds its QR payload once, stamps the QR
+on the marker page and writes the segment as its own PDF named after the
+payload. No intermediate *_qr.pdf copy and no second parse of the document.
+Output is the same as running addQR.py and then split.py on its result.
+"""
+import os
+
+from addQR import DEFAULT_MARKER, DEFAULT_QR, render_qr_pdf, render_qr_png, stamp_qr
+from export import export_recorded_segments, identity_row
+from form_profiles import profile_clips, resolve_form_profile
+from manifest import MANIFEST_NAME, IncrementalSplit, Manifest, file_sha256, is_current, segment_sha256
+from progress import Cancelled, Progress
+from pdf_text import SAVE_OPTIONS, copy_page_range, iter_marker_segments
+from run_log import RunStats, get_logger
+from split import sanitize_filename, unique_output_path
+from text_cache import open_text_cache
+from text_clean import DEFAULT_CLEANER, Cleaner
+
+log = get_logger("pipeline")
+
+def segment_payload(next_page_text: str | None, start_page: int, stats: RunStats,
+                    cleaner: Cleaner = DEFAULT_CLEANER) -> tuple[str, str | None]:
+    """
+    Same payload the two-step workflow produces for one segment: returns
+    (payload for the filename, "" if none; QR data to stamp, falling back to
+    NO_DATA, or None when there is no next page and no QR is stamped).
+    """
+    with stats.stage("clean"):
+        payload = cleaner.build_qr_payload(next_page_text) if next_page_text else ""
+    if next_page_text is None:
+        log.warning(f"  Warning: No next page available for QR data")
+    elif not next_page_text:
+        log.warning(f"  Warning: Page {start_page + 2} has no text")
+
+    return payload, (payload or "NO_DATA") if next_page_text is not None else None
+
+def stamped_segment(pdf_doc: "fitz.Document", start_page: int, end_page: int, qr_data: str | None, qr: dict,
+                    qr_mode: str, stats: RunStats) -> "fitz.Document":
+    """
+    Copy pages start_page..end_page-1 into a new document and stamp qr_data
+    on its first page (none when qr_data is None, as addQR.py skips a marker
+    on the last page).
+    """
+    with stats.stage("write"):
+        segment_doc = copy_page_range(pdf_doc, start_page, end_page)
+
+    if qr_data is not None:
+        render = render_qr_pdf if qr_mode == "vector" else render_qr_png
+        with stats.stage("qr_render"):
+            image_bytes, version = render(qr_data)
+        with stats.stage("stamp"):
+            stamp_qr(segment_doc[0], qr, qr_data, image_bytes, qr_mode, {})
+        stats.observe("qr_version", version)
+        stats.count("qr_codes")
+        if qr_data == "NO_DATA":
+            stats.count("no_data")
+        log.debug(f"  QR data: {qr_data[:50]}{'...' if len(qr_data) > 50 else ''} (version {version})")
+
+    return segment_doc
+
+def export_segment(export, pdf_file: str, filename: str, start_page: int, end_page: int,
+                   next_page_text: str | None, payload: str, stats: RunStats, cleaner: Cleaner = DEFAULT_CLEANER):
+    """Pass the identity row of one segment to the export callback, if any"""
+    if export is not None:
+        with stats.stage("export"):
+            export(identity_row(os.path.basename(pdf_file), filename, start_page, end_page, next_page_text, payload,
+                                cleaner))
+
+def stamp_and_split(pdf_file: str, output_folder: str, marker: str = None, qr: dict = None,
+                    qr_mode: str = "raster", clip_profile: str = None, incremental: bool = False,
+                    export=None, stats: RunStats = None, progress=None, cancel=None,
+                    form_profile: str = None, text_cache: bool = True) -> dict:
+    """
+    Stamp a QR code on every marker page and write each marker segment to
+    output_folder in a single streaming pass over pdf_file.
+    With incremental=True the output folder manifest (see split.py) is used
+    to skip an unchanged input and to keep unchanged segments.
+    export(row) is called with the identity row of every segment (see
+    export.IdentityExport), from the identity text already extracted.
+    form_profile works as in addQR.embed_qr_codes_in_pdf: a profile name,
+    "auto" to detect it, or None for the built-in profile; marker, the keys
+    given in qr and clip_profile override the profile's values.
+    progress/cancel work as in split_pdf_by_marker: the callback gets
+    (done_pages, total_pages) after every file and a set cancel event raises
+    progress.Cancelled, keeping the files already written.
+    text_cache=False neither reads nor fills the page text cache.
+    Returns a summary dict with the page count, created filenames, the QR
+    payload of each file (None where no QR could be stamped) and the run
+    statistics.
+    """
+    import fitz
+    if qr_mode not in ("raster", "vector"):
+        raise ValueError(f"Unknown qr_mode '{qr_mode}', expected 'raster' or 'vector'")
+
+    stats = stats or RunStats()
+    if form_profile is None:
+        # Built-in profile: known without opening the document
+        marker = marker or DEFAULT_MARKER
+        qr = {**DEFAULT_QR, **(qr or {})}
+
+    log.info(f"\n{'='*80}")
+    log.info(f"QR + SPLIT PIPELINE")
+    log.info(f"{'='*80}")
+    log.info(f"Input PDF: {pdf_file}")
+    log.info(f"Output folder: {output_folder}")
+    log.info(f"Marker: {marker or '(from form profile)'}")
+    log.info(f"{'='*80}\n")
+
+    created_files = []
+    payloads = []
+
+    tracker = None
+    file_hash = None
+    if incremental:
+        settings = {"marker": marker, "clip_profile": clip_profile, "qr": dict(qr or {}), "qr_mode": qr_mode}
+        if form_profile is not None:
+            settings["form_profile"] = form_profile
+        manifest = Manifest(os.path.join(output_folder, MANIFEST_NAME))
+        with stats.stage("hash"):
+            file_hash = file_sha256(pdf_file)
+        entry = manifest.get(pdf_file)
+        if is_current(entry, file_hash, settings, output_folder):
+            log.info(f"✓ Unchanged since last run, skipping ({len(entry['outputs'])} file(s) up to date)\n")
+            stats.count("skipped")
+            if export is not None:
+                export_recorded_segments(pdf_file, entry["segments"], export, form_profile, clip_profile, stats,
+                                         file_hash, text_cache=text_cache)
+            return {"pages": entry["pages"], "files": entry["outputs"],
+                    "payloads": [segment["payload"] for segment in entry["segments"]], "skipped": True,
+                    "stats": stats.to_dict()}
+        tracker = IncrementalSplit(manifest, pdf_file, file_hash, settings, output_folder)
+
+    with fitz.open(pdf_file) as pdf_doc:
+        total_pages = pdf_doc.page_count
+        log.info(f"Total pages: {total_pages}\n")
+
+        profile = resolve_form_profile(pdf_doc, form_profile)
+        marker = marker or profile.marker
+        qr = {**profile.qr, **(qr or {})}
+        clips = profile_clips(profile, form_profile, clip_profile)
+        cleaner = profile.cleaner
+
+        cache = open_text_cache(pdf_file, total_pages, stats, file_hash) if text_cache else None
+        reporter = Progress(progress, cancel)
+        reporter.start(total_pages)
+
+        try:
+            segments = stats.timed_iter("extract", iter_marker_segments(pdf_doc, marker, clips, cleaner, cache))
+            for start_page, end_page, next_page_text in segments:
+                # Pages before this segment are done; stop here if cancelled
+                reporter.update(start_page)
+                log.debug(f"{'-'*80}")
+                log.debug(f"Processing split {len(created_files) + 1} (pages {start_page + 1} to {end_page})")
+
+                payload, stamped = segment_payload(next_page_text, start_page, stats, cleaner)
+
+                if tracker:
+                    with stats.stage("hash"):
+                        segment_hash = segment_sha256(pdf_doc, start_page, end_page)
+                    filename = tracker.reuse(segment_hash, stamped)
+                    if filename:
+                        tracker.add(start_page, end_page, segment_hash, stamped, filename)
+                        created_files.append(filename)
+                        payloads.append(stamped)
+                        stats.count("files_reused")
+                        log.info(f"  ✓ Unchanged, kept {filename}")
+                        export_segment(export, pdf_file, filename, start_page, end_page, next_page_text,
+                                       payload, stats, cleaner)
+                        continue
+
+                segment_doc = stamped_segment(pdf_doc, start_page, end_page, stamped, qr, qr_mode, stats)
+
+                replaceable = tracker.replaceable if tracker else frozenset()
+                filename, output_path = unique_output_path(output_folder, sanitize_filename(payload or "no_data"),
+                                                           replaceable)
+                with stats.stage("write"):
+                    segment_doc.save(output_path, **SAVE_OPTIONS)
+                segment_doc.close()
+                stats.count("files_written")
+                stats.count("bytes_written", os.path.getsize(output_path))
+
+                if tracker:
+                    tracker.claim(filename)
+                    tracker.add(start_page, end_page, segment_hash, stamped, filename)
+
+                created_files.append(filename)
+                payloads.append(stamped)
+                log.info(f"  ✓ {filename} ({end_page - start_page} page(s))")
+                export_segment(export, pdf_file, filename, start_page, end_page, next_page_text, payload, stats,
+                               cleaner)
+            reporter.update(total_pages)
+        except Cancelled:
+            if tracker:
+                tracker.checkpoint()
+            log.warning(f"✗ Cancelled, files written so far are kept in {output_folder}")
+            raise
+        finally:
+            if cache is not None:
+                cache.close()
+
+    if tracker:
+        tracker.finish(total_pages)
+    stats.count("pages_scanned", total_pages)
+    stats.count("markers_found", len(created_files))
+
+    log.info(f"\n{'='*80}")
+    if created_files:
+        log.info(f"✓ Created {len(created_files)} file(s) with QR code in {output_folder}")
+    else:
+        log.warning(f"✗ No pages found with marker '{marker}'")
+    stats.log_summary(log)
+    log.info(f"{'='*80}\n")
+
+    return {"pages": total_pages, "files": created_files, "payloads": payloads, "stats": stats.to_dict()}
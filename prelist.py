@@ -0,0 +1,95 @@
+"""
+Single entry point for the prelist tools
+One command with subcommands instead of one script per tool. The command
+is dispatched before anything else is imported: only the module of the
+chosen subcommand is loaded, and the heavy dependencies are loaded later
+still, by the stage that needs them (PyMuPDF to open a PDF, qrcode/PIL to
+render a QR code, OpenCV to verify, tkinter for the GUI dialogs).
+`prelist.py --help` imports none of them. The per-tool scripts
+(addQR.py, split.py, batch.py, ...) keep working as before.
+
+Usage:
+    python3 prelist.py preview input.pdf            # segments split would write, nothing is written
+    python3 prelist.py qr input_folder/ [batch.py options]
+    python3 prelist.py split input.pdf -o output_folder [batch.py options]
+    python3 prelist.py <command> --help
+"""
+import argparse
+import importlib
+import sys
+import time
+
+# command -> (module, or None for this one; function; prepend the command
+# to its arguments; help)
+COMMANDS = {
+    "preview": (None, "preview_main", False, "list the segments split would write (markers only, fast)"),
+    "qr": ("batch", "main", True, "embed QR codes (batch.py qr)"),
+    "split": ("batch", "main", True, "split by marker (batch.py split)"),
+    "qr-split": ("batch", "main", True, "QR + split in one pass (batch.py qr-split)"),
+    "export": ("export", "main", False, "export identity data to CSV/XLSX (export.py)"),
+    "verify": ("verify", "main", False, "decode and check the QR codes of stamped PDFs (verify.py)"),
+    "watch": ("watch", "main", False, "watch-folder service (watch.py)"),
+    "serve": ("server", "main", False, "local HTTP service (server.py)"),
+}
+
+def preview_main(argv: list[str] = None) -> int:
+    """preview subcommand: print the segments split.py would write for each input, returns the exit code"""
+    from form_profiles import profile_names
+    from pdf_text import CLIP_PROFILES
+    from run_log import get_logger, setup_logging
+    from split import preview_split
+
+    parser = argparse.ArgumentParser(prog="prelist.py preview",
+                                     description="Dry-run split: list the segments and filenames, write nothing")
+    parser.add_argument("inputs", nargs="+", help="PDF files")
+    parser.add_argument("--marker", help="marker text (default: the form profile's marker)")
+    parser.add_argument("--clip-profile", choices=sorted(CLIP_PROFILES),
+                        help="only read the header/identity regions of this form profile")
+    parser.add_argument("--form-profile", choices=profile_names(),
+                        help="form profile (form_profiles.json), 'auto' detects it per file")
+    parser.add_argument("--log-level", choices=["DEBUG", "INFO", "WARNING", "ERROR"], default="WARNING")
+    args = parser.parse_args(argv)
+
+    setup_logging(args.log_level)
+    log = get_logger("preview")
+    failed = 0
+    for pdf_file in args.inputs:
+        start = time.perf_counter()
+        try:
+            preview = preview_split(pdf_file, args.marker, args.clip_profile, args.form_profile)
+        except Exception as e:
+            failed += 1
+            log.error(f"✗ {pdf_file}: {type(e).__name__}: {e}")
+            continue
+        elapsed = time.perf_counter() - start
+
+        segments = preview["segments"]
+        print(f"\n{pdf_file}: {preview['pages']} page(s), {len(segments)} segment(s) "
+              f"with marker '{preview['marker']}' ({elapsed:.2f}s)")
+        for i, segment in enumerate(segments, 1):
+            print(f"  {i:>4}. pages {segment['start']:>5}-{segment['end']:<5} ({segment['pages']:>3})  "
+                  f"{segment['file']}")
+        if not segments:
+            print(f"  ✗ No pages found with marker '{preview['marker']}'")
+
+    return 0 if not failed else 2
+
+def main(argv: list[str] = None) -> int:
+    """Command line entry point, returns the process exit code"""
+    parser = argparse.ArgumentParser(
+        prog="prelist.py", description="QR stamping and splitting of DSRT/prelist PDFs",
+        epilog="commands:\n" + "\n".join(f"  {name:<10} {spec[3]}" for name, spec in COMMANDS.items()),
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=list(COMMANDS), metavar="command")
+    parser.add_argument("args", nargs=argparse.REMAINDER, help="arguments of the command (see <command> --help)")
+    args = parser.parse_args(argv)
+
+    module_name, function_name, with_command, _ = COMMANDS[args.command]
+    if module_name is None:
+        function = globals()[function_name]
+    else:
+        function = getattr(importlib.import_module(module_name), function_name)
+    return function([args.command, *args.args] if with_command else args.args)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,53 @@
+"""
+Progress reporting and cancellation for long runs
+The engine functions (embed_qr_codes_in_pdf, split_pdf_by_marker,
+stamp_and_split) accept progress=callback(done_pages, total_pages) and
+cancel=threading.Event; a set event stops the run with Cancelled at the
+next page. Nothing here depends on tkinter, so headless callers can use it.
+"""
+import time
+
+class Cancelled(Exception):
+    """The run was stopped through its cancel event"""
+
+class Progress:
+    """Page progress of one run: forwards to the callback and checks the cancel event"""
+
+    def __init__(self, callback=None, cancel=None, total: int = 0):
+        self.callback = callback
+        self.cancel = cancel
+        self.total = total
+        self.done = 0
+
+    def start(self, total: int):
+        self.total = total
+        self.update(0)
+
+    def update(self, done: int):
+        """Report done pages out of total; raises Cancelled if cancellation was requested"""
+        if self.cancel is not None and self.cancel.is_set():
+            raise Cancelled(f"Cancelled after {self.done} of {self.total} page(s)")
+        self.done = done
+        if self.callback is not None:
+            self.callback(done, self.total)
+
+class RateEstimator:
+    """Pages/s and ETA from the progress updates seen since start"""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+
+    def estimate(self, done: int, total: int) -> tuple[float, float | None]:
+        """Return (pages per second, seconds remaining or None while unknown)"""
+        elapsed = time.perf_counter() - self.start
+        if done <= 0 or elapsed <= 0:
+            return 0.0, None
+        rate = done / elapsed
+        return rate, (total - done) / rate
+
+def format_eta(seconds: float | None) -> str:
+    if seconds is None:
+        return "--:--"
+    minutes, seconds = divmod(int(seconds + 0.5), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes:02d}:{seconds:02d}"
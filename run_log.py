@@ -0,0 +1,111 @@
+"""
+Leveled logging and per-run statistics for addQR.py, split.py and pipeline.py
+All tools log through the "prelist" logger: progress at INFO, per-page
+text dumps at DEBUG (skipped entirely at higher levels), problems at
+WARNING. RunStats collects stage timers, counters and histograms for one
+run; it can be logged as a summary or exported as JSON.
+"""
+import logging
+import sys
+import time
+from contextlib import contextmanager
+
+LOGGER_NAME = "prelist"
+
+def get_logger(name: str) -> logging.Logger:
+    """Child logger of the shared "prelist" logger"""
+    return logging.getLogger(f"{LOGGER_NAME}.{name}")
+
+def setup_logging(level: int | str = logging.INFO, stream=None):
+    """
+    Send the tools' messages to stream (default stdout) as plain lines, the
+    same output the former print() calls produced, filtered by level.
+    Safe to call again (e.g. in every worker process): handlers are replaced.
+    """
+    if isinstance(level, str):
+        level = logging.getLevelName(level.upper())
+    handler = logging.StreamHandler(stream or sys.stdout)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+
+    logger = logging.getLogger(LOGGER_NAME)
+    logger.handlers[:] = [handler]
+    logger.setLevel(level)
+    logger.propagate = False
+
+class RunStats:
+    """Stage timers (seconds), counters and value histograms of one run"""
+
+    def __init__(self):
+        self.timers = {}
+        self.counters = {}
+        self.histograms = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time a block; repeated blocks of the same stage are summed"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def add_time(self, name: str, seconds: float):
+        self.timers[name] = self.timers.get(name, 0.0) + seconds
+
+    def timed_iter(self, name: str, iterable):
+        """Yield from iterable, charging the time spent producing each item to stage name"""
+        iterator = iter(iterable)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.add_time(name, time.perf_counter() - start)
+                return
+            self.add_time(name, time.perf_counter() - start)
+            yield item
+
+    def count(self, name: str, n: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def observe(self, name: str, value):
+        """Add one value to histogram name (e.g. the QR version of each code)"""
+        histogram = self.histograms.setdefault(name, {})
+        histogram[str(value)] = histogram.get(str(value), 0) + 1
+
+    def merge(self, other: dict):
+        """Add the to_dict() output of another run (batch totals)"""
+        for name, seconds in other.get("timers", {}).items():
+            self.add_time(name, seconds)
+        for name, n in other.get("counters", {}).items():
+            self.count(name, n)
+        for name, histogram in other.get("histograms", {}).items():
+            merged = self.histograms.setdefault(name, {})
+            for value, n in histogram.items():
+                merged[value] = merged.get(value, 0) + n
+
+    def to_dict(self) -> dict:
+        return {
+            "timers": {name: round(seconds, 6) for name, seconds in self.timers.items()},
+            "counters": dict(self.counters),
+            "histograms": {name: dict(sorted(h.items(), key=lambda item: int(item[0]) if item[0].isdigit() else 0))
+                           for name, h in self.histograms.items()},
+        }
+
+    def summary_lines(self) -> list[str]:
+        """Human-readable summary, one line per timer/counter/histogram"""
+        lines = []
+        for name, seconds in self.timers.items():
+            lines.append(f"  {name:<16} {seconds:>9.3f}s")
+        for name, n in self.counters.items():
+            lines.append(f"  {name:<16} {n:>10}")
+        lookups = self.counters.get("text_cache_hits", 0) + self.counters.get("text_cache_misses", 0)
+        if lookups:
+            lines.append(f"  {'text_cache_rate':<16} {100 * self.counters.get('text_cache_hits', 0) / lookups:>9.1f}%")
+        for name, histogram in self.to_dict()["histograms"].items():
+            lines.append(f"  {name:<16} " + ", ".join(f"{value}: {n}" for value, n in histogram.items()))
+        return lines
+
+    def log_summary(self, logger: logging.Logger, level: int = logging.INFO):
+        if logger.isEnabledFor(level):
+            logger.log(level, "Run statistics:\n" + "\n".join(self.summary_lines()))
@@ -0,0 +1,220 @@
+"""
+Local HTTP service for QR stamping and splitting (stream_api.py over HTTP)
+POST the PDF as the request body; nothing is written to disk.
+
+    POST /qr         -> stamped PDF (application/pdf)
+    POST /split      -> ZIP of the split segments, streamed (chunked)
+    POST /qr-split   -> ZIP of the QR-stamped segments, streamed (chunked)
+    GET  /health     -> {"status": "ok"}
+
+Query parameters: marker, qr_mode (raster|vector), clip_profile,
+form_profile (a name from form_profiles.py or "auto"), qr_size, qr_x, qr_y;
+omitted ones come from the form profile. Requests are handled by a bounded pool of forked
+worker processes (threads plus one shared PyMuPDF lock where fork is not
+available, as PyMuPDF is not thread-safe).
+
+Usage:
+    python3 server.py [--host 127.0.0.1] [--port 8765] [--jobs 4]
+    curl --data-binary @input.pdf -o segments.zip "http://127.0.0.1:8765/split"
+"""
+import argparse
+import contextlib
+import itertools
+import json
+import os
+import socketserver
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from form_profiles import profile_names
+from pdf_text import CLIP_PROFILES
+from run_log import get_logger, setup_logging
+from stream_api import iter_segments, stamp_pdf_stream, write_zip_stream
+
+log = get_logger("server")
+
+# Largest accepted request body
+MAX_UPLOAD_BYTES = 512 * 1024 * 1024
+
+# Serializes PyMuPDF work in the threaded fallback server
+FITZ_LOCK = threading.Lock()
+
+class ChunkedWriter:
+    """File-like writer sending HTTP/1.1 chunked transfer encoding"""
+
+    def __init__(self, wfile):
+        self.wfile = wfile
+
+    def write(self, data: bytes) -> int:
+        if data:
+            self.wfile.write(f"{len(data):X}\r\n".encode() + bytes(data) + b"\r\n")
+        return len(data)
+
+    def flush(self):
+        self.wfile.flush()
+
+    def close(self):
+        """Terminating zero-length chunk"""
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+def request_options(query: str) -> dict:
+    """Stage options from the query string; omitted values come from the form profile"""
+    params = {key: values[-1] for key, values in parse_qs(query).items()}
+    qr_mode = params.get("qr_mode", "raster")
+    if qr_mode not in ("raster", "vector"):
+        raise ValueError(f"Unknown qr_mode '{qr_mode}', expected 'raster' or 'vector'")
+    clip_profile = params.get("clip_profile") or None
+    if clip_profile is not None and clip_profile not in CLIP_PROFILES:
+        raise ValueError(f"Unknown clip profile '{clip_profile}', expected one of {sorted(CLIP_PROFILES)}")
+    form_profile = params.get("form_profile") or None
+    if form_profile is not None and form_profile not in profile_names():
+        raise ValueError(f"Unknown form profile '{form_profile}', expected one of {profile_names()}")
+    return {
+        "marker": params.get("marker") or None,
+        "qr": {key: float(params[f"qr_{key}"]) for key in ("size", "x", "y") if f"qr_{key}" in params},
+        "qr_mode": qr_mode,
+        "clip_profile": clip_profile,
+        "form_profile": form_profile,
+    }
+
+class PDFRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # required for chunked responses
+    server_version = "PrelistPDF/1.0"
+
+    def log_message(self, format: str, *args):
+        log.info(f"{self.address_string()} {format % args}")
+
+    def send_json(self, status: int, body: dict):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if urlparse(self.path).path == "/health":
+            self.send_json(200, {"status": "ok"})
+        else:
+            self.send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path not in ("/qr", "/split", "/qr-split"):
+            self.send_json(404, {"error": "not found"})
+            return
+
+        length = int(self.headers.get("Content-Length") or 0)
+        if length <= 0:
+            self.send_json(411, {"error": "PDF body with Content-Length required"})
+            return
+        if length > MAX_UPLOAD_BYTES:
+            self.send_json(413, {"error": f"body larger than {MAX_UPLOAD_BYTES} bytes"})
+            self.close_connection = True
+            return
+
+        body = self.rfile.read(length)
+        try:
+            options = request_options(url.query)
+        except ValueError as e:
+            self.send_json(400, {"error": str(e)})
+            return
+
+        with self.server.fitz_guard():
+            if url.path == "/qr":
+                self.send_stamped(body, options)
+            else:
+                self.send_segments(body, options, stamp=url.path == "/qr-split")
+
+    def send_stamped(self, body: bytes, options: dict):
+        try:
+            pdf_bytes, summary = stamp_pdf_stream(body, options["marker"], options["qr"], options["qr_mode"],
+                                                  options["clip_profile"], form_profile=options["form_profile"])
+        except Exception as e:
+            self.send_json(422, {"error": f"{type(e).__name__}: {e}"})
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/pdf")
+        self.send_header("Content-Length", str(len(pdf_bytes)))
+        self.send_header("X-QR-Count", str(summary["qr_count"]))
+        self.send_header("X-Form-Profile", summary["form_profile"])
+        self.end_headers()
+        self.wfile.write(pdf_bytes)
+
+    def send_segments(self, body: bytes, options: dict, stamp: bool):
+        segments = iter_segments(body, options["marker"], options["clip_profile"], stamp=stamp,
+                                 qr=options["qr"], qr_mode=options["qr_mode"],
+                                 form_profile=options["form_profile"])
+        # Produce the first segment before the 200 goes out, so an unreadable
+        # PDF still gets a proper error status
+        try:
+            first = next(segments, None)
+        except Exception as e:
+            self.send_json(422, {"error": f"{type(e).__name__}: {e}"})
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/zip")
+        self.send_header("Content-Disposition", 'attachment; filename="segments.zip"')
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        writer = ChunkedWriter(self.wfile)
+        try:
+            members = write_zip_stream(writer, itertools.chain([first] if first else [], segments))
+        except Exception as e:
+            # Too late for a status code: drop the connection so the client
+            # sees a truncated response instead of a valid but partial ZIP
+            log.error(f"✗ Streaming failed: {type(e).__name__}: {e}")
+            self.close_connection = True
+            return
+        writer.close()
+        log.info(f"Streamed {members} segment(s)")
+
+class ForkingPDFServer(socketserver.ForkingMixIn, HTTPServer):
+    """One forked process per request, at most max_children at a time"""
+    block_on_close = True
+
+    def fitz_guard(self):
+        return contextlib.nullcontext()
+
+class ThreadingPDFServer(socketserver.ThreadingMixIn, HTTPServer):
+    """Fallback without fork (Windows): threads, PyMuPDF work serialized"""
+    daemon_threads = True
+
+    def fitz_guard(self):
+        return FITZ_LOCK
+
+def make_server(host: str = "127.0.0.1", port: int = 8765, jobs: int = 4) -> HTTPServer:
+    """Create the HTTP server with a pool of `jobs` request workers"""
+    if hasattr(os, "fork"):
+        server = ForkingPDFServer((host, port), PDFRequestHandler)
+        server.max_children = max(1, jobs)
+    else:
+        server = ThreadingPDFServer((host, port), PDFRequestHandler)
+    return server
+
+def main(argv: list[str] = None):
+    parser = argparse.ArgumentParser(description="Local HTTP service for QR stamping and splitting")
+    parser.add_argument("--host", default="127.0.0.1", help="bind address (default: local only)")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1,
+                        help="concurrent requests (default: CPU count)")
+    parser.add_argument("--log-level", choices=["DEBUG", "INFO", "WARNING", "ERROR"], default="INFO")
+    args = parser.parse_args(argv)
+
+    setup_logging(args.log_level)
+    server = make_server(args.host, args.port, args.jobs)
+    log.info(f"Serving on http://{args.host}:{args.port} ({args.jobs} worker(s))")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
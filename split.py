@@ -3,11 +3,22 @@ Split PDF by "BLOK IV. CATATAN" marker
 Each split file starts with a page containing "BLOK IV. CATATAN"
 Files are named using QR code data from the next page
 """
-import PyPDF2
 import os
 import re
-import tkinter as tk
-from tkinter import filedialog, messagebox
+import time
+
+from archive import ARCHIVE_FORMATS, SegmentArchive, archive_path, unique_member_name
+from export import export_recorded_segments, identity_row
+from form_profiles import DEFAULT_MARKER, profile_clips, resolve_form_profile
+from manifest import MANIFEST_NAME, IncrementalSplit, Manifest, file_sha256, is_current, segment_sha256
+from progress import Cancelled, Progress
+from text_clean import DEFAULT_CLEANER, Cleaner
+from pdf_text import (SAVE_OPTIONS, copy_page_range, extract_identity_text, extract_page_text,
+                      extract_page_texts_parallel, has_marker, iter_marker_segments)
+from run_log import RunStats, get_logger, setup_logging
+from text_cache import open_text_cache
+
+log = get_logger("split")
 
 def sanitize_filename(text: str, max_length: int = 100) -> str:
     """
@@ -37,215 +48,417 @@ def sanitize_filename(text: str, max_length: int = 100) -> str:
 
     return clean_text
 
-def extract_qr_data_from_text(text: str) -> str:
+def extract_qr_data_from_text(text: str, cleaner: Cleaner = DEFAULT_CLEANER) -> str:
     """
     Extract and clean data that would be used for QR code.
-    This should match the logic in the QR generation script.
+    Uses the same cleaning engine (and form profile vocabulary) as the QR
+    generation script.
     """
-    # Try multiple possible keywords (same as QR generation)
-    possible_keywords = [
-        'Identitas Blok Sensus',
-        'Identitas SLS',
-        'IDENTITAS SAMPEL SATUAN LINGKUNGAN SETEMPAT',
-        'IDENTITAS SAMPEL BLOK SENSUS',
-        'Identitas',
-    ]
-
-    filtered_lines = []
-    keyword_found = None
-    text_lines = text.splitlines()
-
-    # Try each keyword until we find matching lines
-    for keyword in possible_keywords:
-        temp_lines = []
-        for line in text_lines:
-            if keyword.lower() in line.lower():
-                temp_lines.append(line)
-
-        if temp_lines:
-            filtered_lines = temp_lines
-            keyword_found = keyword
-            break
-
-    # Process the text
-    if filtered_lines:
-        filtered_text = "\n".join(filtered_lines)
-        # Remove all possible keywords
-        for keyword in possible_keywords:
-            filtered_text = filtered_text.replace(keyword, "")
-    else:
-        filtered_text = text
-
-    # Clean the text (same as QR generation)
-    filtered_text = ' '.join(filtered_text.split())
-
-    # Remove common headers and labels
-    remove_strings = [
-        "SERUTI24.DSRT", "DAFTAR SAMPEL RUMAH TANGGA", "RAHASIA",
-        "BLOK I. IDENTITAS SAMPEL BLOK SENSUS", "1. Provinsi",
-        "2. Kabupaten/Kota", "3. Kecamatan", "4. Desa/Kelurahan",
-        "5. Klasifikasi Desa/Kelurahan", "7. Nomor Kode Sampel (NKS)Perkotaan",
-        "BLOK II. KETERANGAN PETUGAS", "Nama Pencacah",
-        "Pedesaan", "Perkotaan", "Nomor Blok Sensus", "Tgl. Pelaksanaan",
-        "Tanda Tangan", "Nama Pengawas", "BLOK III. CATATAN",
-        "SURVEI EKONOMI RUMAH TANGGA TRIWULANAN 2024", "Triwulan 2",
-        "BLOK I. IDENTITAS SAMPEL SATUAN LINGKUNGAN SETEMPAT",
-        "6. Kode SLS/Sub-SLS", "8. Satuan Lingkungan Setempat (SLS)",
-        "BLOK II. REKAPITULASI HASIL PEMUTAKHIRAN",
-        "BLOK III. KETERANGAN PETUGAS", "BLOK IV. CATATAN",
-        "Identitas Blok Sensus", "Identitas SLS",
-        "SURVEI SOSIAL EKONOMI NASIONAL 2020",
-        "DAFTAR PEMUTAKHIRAN RUMAH TANGGA", "Sumber Data : DTSEN",
-        "SAMPEL SERUTI", "BLOK I.", "BLOK II.", "BLOK III.", "BLOK IV.",
-        "Kabupaten/Kota *)", "Desa/Kelurahan *)", "*) Coret yang tidak perlu"
-    ]
-
-    for s in remove_strings:
-        filtered_text = filtered_text.replace(s, "")
-
-    # Remove extra spaces
-    filtered_text = ' '.join(filtered_text.split()).strip()
+    filtered_text = cleaner.build_qr_payload(text)
 
     return filtered_text if filtered_text else "no_data"
 
-def split_pdf_by_marker(pdf_path: str, output_folder: str, marker: str = "BLOK IV. CATATAN"):
+def unique_output_path(output_folder: str, base_filename: str, replaceable: set = frozenset()) -> tuple[str, str]:
+    """
+    Return (filename, path) for base_filename.pdf, adding _1, _2, ... if it
+    exists. Existing files listed in replaceable (stale outputs of a previous
+    run of the same input) may be overwritten.
+    """
+    filename = f"{base_filename}.pdf"
+
+    # Handle duplicate filenames
+    output_path = os.path.join(output_folder, filename)
+    counter = 1
+    while os.path.exists(output_path) and filename not in replaceable:
+        filename = f"{base_filename}_{counter}.pdf"
+        output_path = os.path.join(output_folder, filename)
+        counter += 1
+
+    return filename, output_path
+
+def write_split(pdf_doc: "fitz.Document", output_folder: str, start_page: int, end_page: int,
+                next_page_text: str | None, incremental: IncrementalSplit = None,
+                stats: RunStats = None, archive: SegmentArchive = None, export=None,
+                cleaner: Cleaner = DEFAULT_CLEANER) -> str:
+    """
+    Write pages start_page..end_page-1 (0-based) to a new PDF named after the
+    QR data of next_page_text (None when there is no next page).
+    With incremental, an unchanged segment from the previous run is kept
+    instead of being written again. With an archive the segment is added as
+    an archive member instead of a file in output_folder. export, if given,
+    is called with the identity row of the segment (export.identity_row).
+    cleaner holds the form profile's vocabulary.
+    Returns the created filename (member name with an archive).
+    """
+    stats = stats or RunStats()
+    log.debug(f"  Pages: {start_page + 1} to {end_page}")
+
+    # Extract QR data from next page (if exists)
+    qr_data = "no_data"
+    if next_page_text is not None:
+        if next_page_text:
+            with stats.stage("clean"):
+                qr_data = extract_qr_data_from_text(next_page_text, cleaner)
+            log.debug(f"  QR data extracted: {qr_data[:50]}{'...' if len(qr_data) > 50 else ''}")
+        else:
+            log.warning(f"  Warning: Page {start_page + 2} has no text")
+    else:
+        log.warning(f"  Warning: No next page available for QR data")
+
+    filename = store_split(pdf_doc, output_folder, start_page, end_page, qr_data, incremental, stats, archive)
+
+    if export is not None:
+        with stats.stage("export"):
+            export(identity_row(os.path.basename(pdf_doc.name), filename, start_page, end_page, next_page_text,
+                                qr_data if next_page_text else "", cleaner))
+    return filename
+
+def store_split(pdf_doc: "fitz.Document", output_folder: str, start_page: int, end_page: int, qr_data: str,
+                incremental: IncrementalSplit = None, stats: RunStats = None,
+                archive: SegmentArchive = None) -> str:
+    """Write (or with incremental, reuse) the segment file named after qr_data, returns its filename"""
+    stats = stats or RunStats()
+    if archive is not None:
+        with stats.stage("write"):
+            segment_doc = copy_page_range(pdf_doc, start_page, end_page)
+            data = segment_doc.tobytes(**SAVE_OPTIONS)
+            segment_doc.close()
+            filename = archive.add(sanitize_filename(qr_data), data, start_page, end_page, qr_data)
+        stats.count("files_written")
+        stats.count("bytes_written", len(data))
+        log.info(f"  ✓ {filename} ({end_page - start_page} page(s), {len(data) / 1024:.1f} KB)")
+        return filename
+
+    if incremental:
+        with stats.stage("hash"):
+            segment_hash = segment_sha256(pdf_doc, start_page, end_page)
+        filename = incremental.reuse(segment_hash, qr_data)
+        if filename:
+            incremental.add(start_page, end_page, segment_hash, qr_data, filename)
+            stats.count("files_reused")
+            log.info(f"  ✓ Unchanged, kept {filename}")
+            return filename
+
+    # Create filename
+    replaceable = incremental.replaceable if incremental else frozenset()
+    filename, output_path = unique_output_path(output_folder, sanitize_filename(qr_data), replaceable)
+
+    log.debug(f"  Output: {filename}")
+
+    # Create new PDF with pages from start_page to end_page (bulk copy)
+    start = time.perf_counter()
+    segment_doc = copy_page_range(pdf_doc, start_page, end_page)
+
+    # Write to file (garbage collected, deduplicated and compressed)
+    segment_doc.save(output_path, **SAVE_OPTIONS)
+    segment_doc.close()
+    write_time = time.perf_counter() - start
+    stats.add_time("write", write_time)
+    output_size = os.path.getsize(output_path)
+    stats.count("files_written")
+    stats.count("bytes_written", output_size)
+
+    if incremental:
+        incremental.claim(filename)
+        incremental.add(start_page, end_page, segment_hash, qr_data, filename)
+
+    log.info(f"  ✓ {filename} ({end_page - start_page} page(s), {output_size / 1024:.1f} KB, {write_time:.3f}s)")
+    return filename
+
+def finish_archive(archive: SegmentArchive, output_archive: str, complete: bool, keep: bool):
+    """Close the archive and move it to its final name, or drop it when keep is False"""
+    try:
+        archive.close(complete)
+    finally:
+        archive.fileobj.close()
+    if keep:
+        os.replace(output_archive + ".part", output_archive)
+    else:
+        os.remove(output_archive + ".part")
+
+def split_pages(pdf_doc: "fitz.Document", output_folder: str, marker: str,
+                jobs: int = 1, clips: dict = None, incremental: IncrementalSplit = None,
+                stats: RunStats = None, reporter: Progress = None,
+                archive: SegmentArchive = None, export=None,
+                cleaner: Cleaner = DEFAULT_CLEANER, cache=None) -> list[str]:
+    """
+    Walk the pages once and write every split as soon as the next marker is
+    found; only the current segment start and its next page text are kept.
+    With jobs > 1 the marker-region text of all pages is first extracted in
+    parallel page-range shards (held in memory). Returns created filenames.
+    """
+    stats = stats or RunStats()
+    reporter = reporter or Progress()
+    total_pages = pdf_doc.page_count
+    marker_region = clips["marker"] if clips else None
+
+    if jobs > 1:
+        log.info(f"Scanning for markers ({jobs} workers)...")
+        with stats.stage("extract"):
+            shard_texts = extract_page_texts_parallel(pdf_doc.name, jobs, total_pages, marker_region, cache)
+    else:
+        log.info("Scanning for markers...")
+        shard_texts = None
+
+    created_files = []
+    start_page = None  # first page of the segment being scanned
+    next_page_text = None  # scanned text of start_page + 1
+
+    def write(end_page: int):
+        log.debug(f"{'-'*80}")
+        log.debug(f"Processing split {len(created_files) + 1} (pages {start_page + 1}-{end_page})")
+        if start_page + 1 >= total_pages:
+            identity_text = None
+        elif clips:
+            with stats.stage("extract"):
+                identity_text = extract_identity_text(pdf_doc[start_page + 1], clips, cleaner, cache)
+        else:
+            identity_text = next_page_text or ""
+        created_files.append(write_split(pdf_doc, output_folder, start_page, end_page, identity_text,
+                                         incremental, stats, archive, export, cleaner))
+
+    for page_num in range(total_pages):
+        reporter.update(page_num)
+        if shard_texts is not None:
+            page_text = shard_texts[page_num]
+        else:
+            with stats.stage("extract"):
+                page_text = extract_page_text(pdf_doc[page_num], marker_region, cache)
+        if start_page is not None and page_num == start_page + 1:
+            next_page_text = page_text
+
+        if has_marker(page_text, marker):
+            log.debug(f"  ✓ Found '{marker}' on page {page_num + 1}")
+            if start_page is not None:
+                write(page_num)
+            start_page = page_num
+            next_page_text = None
+
+    if start_page is not None:
+        write(total_pages)
+    reporter.update(total_pages)
+
+    stats.count("pages_scanned", total_pages)
+    stats.count("markers_found", len(created_files))
+    if created_files:
+        log.info(f"\nFound {len(created_files)} marker(s), {len(created_files)} PDF file(s) written")
+    return created_files
+
+def split_pdf_by_marker(pdf_path: str, output_folder: str, marker: str = None,
+                        streaming: bool = False, jobs: int = 1, clip_profile: str = None,
+                        incremental: bool = False, archive_format: str = None, export=None,
+                        stats: RunStats = None, progress=None, cancel=None, form_profile: str = None,
+                        text_cache: bool = True):
     """
     Split PDF file into multiple files based on marker text.
     Each output file starts with a page containing the marker.
+    Errors are raised to the caller; no dialogs are shown (see main() for
+    the GUI), so the function can be used headless.
+    Pages are scanned in one pass and each file is written as soon as its
+    end is known. With jobs > 1 the marker scan is first sharded across that
+    many worker processes, which holds the marker-region text of every page;
+    streaming=True skips that pre-scan (jobs is ignored) so memory stays
+    bounded for any page count.
+    With a clip_profile (see pdf_text.CLIP_PROFILES) only the header region is
+    probed for the marker and only the identity block is extracted for the
+    filename, falling back to the full page when the clip is empty.
+    form_profile names a form profile (see form_profiles.py) or is "auto" to
+    detect it from the first pages; None is the built-in profile. It
+    supplies the marker (when marker is None), the clip regions (unless
+    clip_profile is given) and the cleaning vocabulary for the filenames.
+    With incremental=True a manifest in output_folder (MANIFEST_NAME) records
+    hashes, ranges, payloads and outputs; an unchanged input is skipped and
+    only changed segments of a changed input are written again.
+    With archive_format ("zip" or "tar", see archive.ARCHIVE_FORMATS) all
+    segments go into one archive <input name>.zip/.tar in output_folder,
+    with duplicate names resolved in memory and an index.json member listing
+    each member's page range and payload (not combined with incremental).
+    export(row) is called with the identity row of every segment (see
+    export.IdentityExport), built from the text this scan already extracted.
+    progress(done_pages, total_pages) is called for every scanned page;
+    setting the cancel event (threading.Event) raises progress.Cancelled
+    before the next page. Files already written are kept (and recorded in
+    the manifest with incremental=True, so a rerun resumes).
+    text_cache=False neither reads nor fills the page text cache.
+    Returns a summary dict with the page count, created filenames (archive
+    member names, plus the archive path, with archive_format) and the run
+    statistics.
     """
-    print(f"\n{'='*80}")
-    print(f"PDF SPLITTER")
-    print(f"{'='*80}")
-    print(f"Input PDF: {pdf_path}")
-    print(f"Output folder: {output_folder}")
-    print(f"Marker: {marker}")
-    print(f"{'='*80}\n")
-
+    import fitz
+    stats = stats or RunStats()
+    if archive_format is not None:
+        if archive_format not in ARCHIVE_FORMATS:
+            raise ValueError(f"Unknown archive format '{archive_format}', expected one of {sorted(ARCHIVE_FORMATS)}")
+        if incremental:
+            raise ValueError("incremental=True writes separate files and cannot be combined with an archive")
+    if form_profile is None:
+        marker = marker or DEFAULT_MARKER
+
+    log.info(f"\n{'='*80}")
+    log.info(f"PDF SPLITTER")
+    log.info(f"{'='*80}")
+    log.info(f"Input PDF: {pdf_path}")
+    log.info(f"Output folder: {output_folder}")
+    log.info(f"Marker: {marker or '(from form profile)'}")
+    log.info(f"{'='*80}\n")
+
+    tracker = None
+    archive = None
+    cache = None
+    file_hash = None
+    output_archive = archive_path(output_folder, pdf_path, archive_format) if archive_format else None
     try:
-        # Read the PDF
-        with open(pdf_path, 'rb') as pdf_file:
-            reader = PyPDF2.PdfReader(pdf_file)
-            total_pages = len(reader.pages)
-
-            print(f"Total pages: {total_pages}\n")
-
-            # Find all pages with the marker
-            marker_pages = []
-            page_texts = {}
-
-            print("Scanning for markers...")
-            for page_num in range(total_pages):
-                page = reader.pages[page_num]
-                page_text = page.extract_text()
-                page_texts[page_num] = page_text
-
-                if marker.lower() in page_text.lower():
-                    marker_pages.append(page_num)
-                    print(f"  ✓ Found '{marker}' on page {page_num + 1}")
-
-            if not marker_pages:
-                print(f"\n✗ No pages found with marker '{marker}'")
-                messagebox.showwarning("No Markers Found",
-                    f"No pages found containing '{marker}'.\nCannot split the PDF.")
-                return
-
-            print(f"\nFound {len(marker_pages)} marker(s)")
-            print(f"Will create {len(marker_pages)} PDF file(s)\n")
-
-            # Split the PDF
-            created_files = []
-
-            for i, start_page in enumerate(marker_pages):
-                # Determine end page
-                if i + 1 < len(marker_pages):
-                    end_page = marker_pages[i + 1]
-                else:
-                    end_page = total_pages
-
-                print(f"{'-'*80}")
-                print(f"Processing split {i + 1}/{len(marker_pages)}")
-                print(f"  Pages: {start_page + 1} to {end_page}")
-
-                # Extract QR data from next page (if exists)
-                qr_data = "no_data"
-                if start_page + 1 < total_pages:
-                    next_page_text = page_texts.get(start_page + 1, "")
-                    if next_page_text:
-                        qr_data = extract_qr_data_from_text(next_page_text)
-                        print(f"  QR data extracted: {qr_data[:50]}{'...' if len(qr_data) > 50 else ''}")
-                    else:
-                        print(f"  Warning: Page {start_page + 2} has no text")
-                else:
-                    print(f"  Warning: No next page available for QR data")
-
-                # Create filename
-                base_filename = sanitize_filename(qr_data)
-                filename = f"{base_filename}.pdf"
-
-                # Handle duplicate filenames
-                output_path = os.path.join(output_folder, filename)
-                counter = 1
-                while os.path.exists(output_path):
-                    filename = f"{base_filename}_{counter}.pdf"
-                    output_path = os.path.join(output_folder, filename)
-                    counter += 1
-
-                print(f"  Output: {filename}")
-
-                # Create new PDF with pages from start_page to end_page
-                writer = PyPDF2.PdfWriter()
-
-                for page_num in range(start_page, end_page):
-                    writer.add_page(reader.pages[page_num])
-
-                # Write to file
-                with open(output_path, 'wb') as output_file:
-                    writer.write(output_file)
-
-                created_files.append(filename)
-                print(f"  ✓ Created successfully ({end_page - start_page} page(s))")
-
-            print(f"\n{'='*80}")
-            print(f"✓ SPLIT COMPLETE")
-            print(f"{'='*80}")
-            print(f"Total files created: {len(created_files)}")
-            print(f"Output folder: {output_folder}")
-            print(f"\nFiles created:")
-            for i, filename in enumerate(created_files, 1):
-                print(f"  {i}. {filename}")
-            print(f"{'='*80}\n")
-
-            messagebox.showinfo("Split Complete",
-                f"Successfully split PDF into {len(created_files)} file(s).\n\n"
-                f"Output folder:\n{output_folder}")
-
-    except FileNotFoundError:
-        print(f"✗ Error: File not found: {pdf_path}")
-        messagebox.showerror("File Not Found", f"Cannot find file:\n{pdf_path}")
+        # Read the PDF once (text and page copying via PyMuPDF)
+        with fitz.open(pdf_path) as pdf_doc:
+            total_pages = pdf_doc.page_count
+
+            log.info(f"Total pages: {total_pages}\n")
+
+            profile = resolve_form_profile(pdf_doc, form_profile)
+            marker = marker or profile.marker
+            clips = profile_clips(profile, form_profile, clip_profile)
+
+            if incremental:
+                settings = {"marker": marker, "clip_profile": clip_profile}
+                if form_profile is not None:
+                    settings["form_profile"] = form_profile
+                manifest = Manifest(os.path.join(output_folder, MANIFEST_NAME))
+                with stats.stage("hash"):
+                    file_hash = file_sha256(pdf_path)
+                entry = manifest.get(pdf_path)
+                if is_current(entry, file_hash, settings, output_folder):
+                    log.info(f"✓ Unchanged since last run, skipping ({len(entry['outputs'])} file(s) up to date)\n")
+                    stats.count("skipped")
+                    if export is not None:
+                        export_recorded_segments(pdf_path, entry["segments"], export, form_profile, clip_profile,
+                                                 stats, file_hash, no_data="no_data", text_cache=text_cache)
+                    return {"pages": total_pages, "files": entry["outputs"], "skipped": True,
+                            "stats": stats.to_dict()}
+                tracker = IncrementalSplit(manifest, pdf_path, file_hash, settings, output_folder)
+
+            if text_cache:
+                cache = open_text_cache(pdf_path, total_pages, stats, file_hash)
+            reporter = Progress(progress, cancel)
+            reporter.start(total_pages)
+
+            if output_archive:
+                # Written under a temporary name, so a failed run never
+                # leaves a truncated archive under the final name
+                archive = SegmentArchive(open(output_archive + ".part", "wb"), archive_format,
+                                         os.path.basename(pdf_path), marker)
+
+            # Streaming: no parallel pre-scan, so memory does not grow with the page count
+            created_files = split_pages(pdf_doc, output_folder, marker, 1 if streaming else jobs, clips, tracker,
+                                        stats, reporter, archive, export, profile.cleaner, cache)
+
+            if tracker:
+                tracker.finish(total_pages)
+            if archive:
+                finish_archive(archive, output_archive, complete=True, keep=bool(created_files))
+
+    except Cancelled:
+        if tracker:
+            tracker.checkpoint()
+        if archive:
+            finish_archive(archive, output_archive, complete=False, keep=bool(archive.members))
+            log.warning(f"✗ Cancelled, segments written so far are kept in {output_archive}")
+        else:
+            log.warning(f"✗ Cancelled, files written so far are kept in {output_folder}")
+        raise
+    except (FileNotFoundError, fitz.FileNotFoundError):
+        log.error(f"✗ Error: File not found: {pdf_path}")
+        raise
     except Exception as e:
-        print(f"✗ Error: {e}")
-        import traceback
-        traceback.print_exc()
-        messagebox.showerror("Error", f"An error occurred:\n{str(e)}")
-
-def select_pdf_file():
-    """Open file dialog to select PDF file"""
-    root = tk.Tk()
-    root.withdraw()
+        if archive:
+            finish_archive(archive, output_archive, complete=False, keep=False)
+        log.error(f"✗ Error: {e}")
+        raise
+    finally:
+        if cache is not None:
+            cache.close()
+
+    if not created_files:
+        log.warning(f"\n✗ No pages found with marker '{marker}'")
+        return {"pages": total_pages, "files": [], "stats": stats.to_dict()}
+
+    log.info(f"\n{'='*80}")
+    log.info(f"✓ SPLIT COMPLETE")
+    log.info(f"{'='*80}")
+    log.info(f"Total files created: {len(created_files)}")
+    if output_archive:
+        log.info(f"Archive: {output_archive}")
+    else:
+        log.info(f"Output folder: {output_folder}")
+    log.debug(f"\nFiles created:")
+    for i, filename in enumerate(created_files, 1):
+        log.debug(f"  {i}. {filename}")
+    stats.log_summary(log)
+    log.info(f"{'='*80}\n")
+
+    summary = {"pages": total_pages, "files": created_files, "stats": stats.to_dict()}
+    if output_archive:
+        summary["archive"] = output_archive
+    return summary
+
+def preview_split(pdf_path: str, marker: str = None, clip_profile: str = None, form_profile: str = None,
+                  stats: RunStats = None) -> dict:
+    """
+    Dry run of split_pdf_by_marker: the segments it would write, without
+    copying or writing any page. Only the marker scan runs (the marker text
+    of each page and the identity text of each segment's next page, read
+    through the text cache); no QR code is rendered. Filenames are those a
+    fresh output folder gets. marker, clip_profile and form_profile work as
+    in split_pdf_by_marker.
+    Returns {"pages", "marker", "segments": [{"start", "end", "pages",
+    "file", "payload"}] (1-based, end inclusive), "stats"}.
+    """
+    import fitz
+    stats = stats or RunStats()
+    segments = []
+    used_names = set()
+
+    with fitz.open(pdf_path) as pdf_doc:
+        profile = resolve_form_profile(pdf_doc, form_profile)
+        marker = marker or profile.marker
+        clips = profile_clips(profile, form_profile, clip_profile)
+        cleaner = profile.cleaner
+        cache = open_text_cache(pdf_path, pdf_doc.page_count, stats)
+        try:
+            for start_page, end_page, next_page_text in stats.timed_iter(
+                    "extract", iter_marker_segments(pdf_doc, marker, clips, cleaner, cache)):
+                with stats.stage("clean"):
+                    qr_data = extract_qr_data_from_text(next_page_text, cleaner) if next_page_text else "no_data"
+                segments.append({"start": start_page + 1, "end": end_page, "pages": end_page - start_page,
+                                 "file": unique_member_name(sanitize_filename(qr_data), used_names),
+                                 "payload": qr_data if next_page_text else None})
+        finally:
+            if cache is not None:
+                cache.close()
+        total_pages = pdf_doc.page_count
+
+    stats.count("pages_scanned", total_pages)
+    stats.count("markers_found", len(segments))
+    return {"pages": total_pages, "marker": marker, "segments": segments, "stats": stats.to_dict()}
+
+def select_pdf_file(root):
+    """Open file dialog (over the Tk root) to select PDF file"""
+    # GUI only: tkinter is not loaded by headless callers of this module
+    from tkinter import filedialog
 
     file_path = filedialog.askopenfilename(
+        parent=root,
         title="Select PDF file to split",
         filetypes=[("PDF files", "*.pdf"), ("All files", "*.*")]
     )
 
     return file_path
 
-def select_output_folder():
-    """Open folder dialog to select output folder"""
-    root = tk.Tk()
-    root.withdraw()
+def select_output_folder(root):
+    """Open folder dialog (over the Tk root) to select output folder"""
+    from tkinter import filedialog
 
     folder_path = filedialog.askdirectory(
+        parent=root,
         title="Select folder to save split PDF files"
     )
 
@@ -253,45 +466,77 @@ def select_output_folder():
 
 def main():
     """Main function"""
-    print("\n" + "="*80)
-    print("PDF SPLITTER - Split by 'BLOK IV. CATATAN'")
-    print("="*80 + "\n")
-
-    # Select input PDF
-    print("Step 1: Select PDF file to split...")
-    pdf_path = select_pdf_file()
-
-    if not pdf_path:
-        print("✗ No file selected. Exiting.")
-        return
-
-    print(f"✓ Selected: {pdf_path}\n")
-
-    # Select output folder
-    print("Step 2: Select output folder...")
-    output_folder = select_output_folder()
+    import fitz
+    import tkinter as tk
+    from tkinter import messagebox
+    from gui_progress import run_with_progress
 
-    if not output_folder:
-        print("✗ No folder selected. Exiting.")
-        return
-
-    print(f"✓ Selected: {output_folder}\n")
-
-    # Confirm before proceeding
-    response = messagebox.askyesno(
-        "Confirm Split",
-        f"Split this PDF?\n\n"
-        f"Input: {os.path.basename(pdf_path)}\n"
-        f"Output: {output_folder}\n\n"
-        f"Files will be named based on QR code data."
-    )
-
-    if not response:
-        print("✗ Cancelled by user.")
-        return
-
-    # Perform the split
-    split_pdf_by_marker(pdf_path, output_folder)
+    # One Tk instance for the dialogs and the progress window
+    root = tk.Tk()
+    root.withdraw()
+    try:
+        log.info("\n" + "="*80)
+        log.info("PDF SPLITTER - Split by 'BLOK IV. CATATAN'")
+        log.info("="*80 + "\n")
+
+        # Select input PDF
+        log.info("Step 1: Select PDF file to split...")
+        pdf_path = select_pdf_file(root)
+
+        if not pdf_path:
+            log.info("✗ No file selected. Exiting.")
+            return
+
+        log.info(f"✓ Selected: {pdf_path}\n")
+
+        # Select output folder
+        log.info("Step 2: Select output folder...")
+        output_folder = select_output_folder(root)
+
+        if not output_folder:
+            log.info("✗ No folder selected. Exiting.")
+            return
+
+        log.info(f"✓ Selected: {output_folder}\n")
+
+        # Confirm before proceeding
+        response = messagebox.askyesno(
+            "Confirm Split",
+            f"Split this PDF?\n\n"
+            f"Input: {os.path.basename(pdf_path)}\n"
+            f"Output: {output_folder}\n\n"
+            f"Files will be named based on QR code data."
+        )
+
+        if not response:
+            log.info("✗ Cancelled by user.")
+            return
+
+        # Perform the split in a background thread, with a progress window
+        marker = DEFAULT_MARKER
+        try:
+            summary = run_with_progress(root, "Splitting PDF...", split_pdf_by_marker, pdf_path, output_folder, marker)
+        except Cancelled:
+            messagebox.showwarning("Cancelled", f"Split cancelled.\n\nFiles written so far are in:\n{output_folder}")
+            return
+        except (FileNotFoundError, fitz.FileNotFoundError):
+            messagebox.showerror("File Not Found", f"Cannot find file:\n{pdf_path}")
+            return
+        except Exception as e:
+            log.exception(f"✗ Error: {e}")
+            messagebox.showerror("Error", f"An error occurred:\n{str(e)}")
+            return
+
+        if not summary["files"]:
+            messagebox.showwarning("No Markers Found",
+                f"No pages found containing '{marker}'.\nCannot split the PDF.")
+        else:
+            messagebox.showinfo("Split Complete",
+                f"Successfully split PDF into {len(summary['files'])} file(s).\n\n"
+                f"Output folder:\n{output_folder}")
+    finally:
+        root.destroy()
 
 if __name__ == "__main__":
+    setup_logging(os.environ.get("PRELIST_LOG_LEVEL", "INFO"))
     main()
@@ -0,0 +1,110 @@
+"""
+In-memory API for QR stamping and splitting
+Accepts a PDF as bytes or a binary file-like object, opens it with
+fitz.open(stream=...) and never touches the filesystem: the stamped PDF is
+returned as bytes, split segments are produced one at a time (and can be
+written into a streamed ZIP) so only one segment is in memory at once.
+Segment names are the ones split.py gives its files.
+"""
+import zipfile
+from typing import BinaryIO, Iterator
+
+from addQR import stamp_document
+from archive import unique_member_name
+from form_profiles import profile_clips, resolve_form_profile
+from pdf_text import SAVE_OPTIONS, copy_page_range, iter_marker_segments
+from pipeline import segment_payload, stamped_segment
+from run_log import RunStats
+from split import extract_qr_data_from_text, sanitize_filename
+
+def open_pdf_stream(source: bytes | BinaryIO) -> "fitz.Document":
+    """Open a PDF from bytes or a readable binary file object (no temp file)"""
+    import fitz
+    if not isinstance(source, (bytes, bytearray, memoryview)):
+        source = source.read()
+    return fitz.open(stream=source, filetype="pdf")
+
+def stamp_pdf_stream(source: bytes | BinaryIO, marker: str = None, qr: dict = None,
+                     qr_mode: str = "raster", clip_profile: str = None, stats: RunStats = None,
+                     form_profile: str = None) -> tuple[bytes, dict]:
+    """
+    Stamp QR codes like embed_qr_codes_in_pdf (including its form_profile
+    handling) and return (pdf_bytes, summary) with the page count, QR count,
+    payloads and the form profile used.
+    """
+    if qr_mode not in ("raster", "vector"):
+        raise ValueError(f"Unknown qr_mode '{qr_mode}', expected 'raster' or 'vector'")
+
+    stats = stats or RunStats()
+    with open_pdf_stream(source) as pdf_doc:
+        profile = resolve_form_profile(pdf_doc, form_profile)
+        stamped = stamp_document(pdf_doc, marker or profile.marker, {**profile.qr, **(qr or {})}, qr_mode,
+                                 profile_clips(profile, form_profile, clip_profile), stats=stats,
+                                 cleaner=profile.cleaner)
+        with stats.stage("save"):
+            pdf_bytes = pdf_doc.tobytes(**SAVE_OPTIONS)
+        summary = {"pages": pdf_doc.page_count, "qr_count": stamped["qr_count"], "payloads": stamped["payloads"],
+                   "form_profile": profile.name}
+
+    stats.count("qr_codes", stamped["qr_count"])
+    stats.count("bytes_written", len(pdf_bytes))
+    return pdf_bytes, summary
+
+def iter_segments(source: bytes | BinaryIO, marker: str = None, clip_profile: str = None,
+                  stamp: bool = False, qr: dict = None, qr_mode: str = "raster",
+                  stats: RunStats = None, form_profile: str = None) -> Iterator[dict]:
+    """
+    Yield one dict per marker segment, in page order:
+    {"name", "start", "end" (1-based, inclusive), "payload", "data" (PDF bytes)}.
+    With stamp=True the QR code is stamped on each segment (qr-split);
+    names are sanitize_filename(payload) with _1, _2, ... for duplicates.
+    form_profile is handled as in split_pdf_by_marker.
+    """
+    if qr_mode not in ("raster", "vector"):
+        raise ValueError(f"Unknown qr_mode '{qr_mode}', expected 'raster' or 'vector'")
+
+    stats = stats or RunStats()
+    used_names = set()
+
+    with open_pdf_stream(source) as pdf_doc:
+        profile = resolve_form_profile(pdf_doc, form_profile)
+        marker = marker or profile.marker
+        qr = {**profile.qr, **(qr or {})}
+        clips = profile_clips(profile, form_profile, clip_profile)
+        cleaner = profile.cleaner
+        segments = stats.timed_iter("extract", iter_marker_segments(pdf_doc, marker, clips, cleaner))
+        for start_page, end_page, next_page_text in segments:
+            if stamp:
+                payload, qr_data = segment_payload(next_page_text, start_page, stats, cleaner)
+                segment_doc = stamped_segment(pdf_doc, start_page, end_page, qr_data, qr, qr_mode, stats)
+                name_source = payload or "no_data"
+            else:
+                with stats.stage("clean"):
+                    name_source = (extract_qr_data_from_text(next_page_text, cleaner) if next_page_text
+                                   else "no_data")
+                payload = name_source
+                with stats.stage("write"):
+                    segment_doc = copy_page_range(pdf_doc, start_page, end_page)
+
+            with stats.stage("write"):
+                data = segment_doc.tobytes(**SAVE_OPTIONS)
+            segment_doc.close()
+            stats.count("files_written")
+            stats.count("bytes_written", len(data))
+
+            yield {"name": unique_member_name(sanitize_filename(name_source), used_names),
+                   "start": start_page + 1, "end": end_page, "payload": payload, "data": data}
+
+def write_zip_stream(fileobj: BinaryIO, segments: Iterator[dict]) -> int:
+    """
+    Write segments into a ZIP on fileobj, which only needs write() (sockets,
+    HTTP responses): members are added as they are produced, so the whole
+    archive is never held in memory. PDFs are already compressed, so members
+    are stored. Returns the number of members.
+    """
+    count = 0
+    with zipfile.ZipFile(fileobj, "w", compression=zipfile.ZIP_STORED) as archive:
+        for segment in segments:
+            archive.writestr(segment["name"], segment["data"])
+            count += 1
+    return count
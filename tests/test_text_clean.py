@@ -0,0 +1,31 @@
+import random
+
+import pytest
+
+from benchmarks.bench_clean import legacy_payload, random_page
+from text_clean import REMOVE_STRINGS, build_qr_payload, strip_headers
+
+def legacy_strip_headers(text: str) -> str:
+    """The original header loop: one str.replace per string, in list order"""
+    text = " ".join(text.split())
+    for s in REMOVE_STRINGS:
+        text = text.replace(s, "")
+    return " ".join(text.split())
+
+@pytest.mark.parametrize("text, expected", [
+    # "SERUTI24.DSRT" comes before "SAMPEL SERUTI" in the list
+    ("SAMPEL SERUTI24.DSRT PAPUA 94", "SAMPEL PAPUA 94"),
+    # Removing "Pedesaan" joins "Nomor Blok Sensus", removed by a later pass
+    ("Nomor Blok PedesaanSensus 3", "3"),
+    ("BLOK I. IDENTITAS SAMPEL BLOK SENSUS 1. Provinsi PAPUA 94", "PAPUA 94"),
+    ("BLOK I.BLOK II. CATATAN", "CATATAN"),
+])
+def test_strip_headers_matches_sequential_replace(text, expected):
+    assert legacy_strip_headers(text) == expected
+    assert strip_headers(text) == expected
+
+def test_payload_matches_legacy_on_generated_pages():
+    rng = random.Random(7)
+    for _ in range(500):
+        text = random_page(rng)
+        assert build_qr_payload(text) == legacy_payload(text), text
@@ -0,0 +1,40 @@
+import argparse
+import asyncio
+import os
+
+import batch
+import watch
+from benchmarks.synth_dsrt import write_document
+
+real_process_pdf = batch.process_pdf
+
+def process_or_crash(mode: str, pdf_file: str, options: dict) -> dict:
+    """process_pdf whose worker process dies on files named crash*.pdf"""
+    if os.path.basename(pdf_file).startswith("crash"):
+        os._exit(1)
+    return real_process_pdf(mode, pdf_file, options)
+
+def test_crashed_worker_fails_only_its_own_file(tmp_path, monkeypatch):
+    # Workers are forked or spawned: both resolve process_or_crash from this module
+    monkeypatch.setattr(watch, "process_pdf", process_or_crash)
+    monkeypatch.setattr(batch, "process_pdf", process_or_crash)
+    monkeypatch.setenv("PRELIST_TEXT_CACHE", "0")
+
+    inbox, output, failed = tmp_path / "inbox", tmp_path / "output", tmp_path / "failed"
+    inbox.mkdir()
+    write_document(str(inbox / "good.pdf"), 20)
+    write_document(str(inbox / "crash.pdf"), 20)
+
+    parser = argparse.ArgumentParser()
+    batch.add_processing_arguments(parser)
+    options = batch.processing_options(parser.parse_args(["split"]), str(output))
+    service = watch.WatchFolder("split", str(inbox), str(output), str(failed), options, jobs=2)
+    counts = asyncio.run(service.run(once=True))
+
+    assert counts == {"ok": 1, "failed": 1}
+    assert os.listdir(inbox / watch.WORK_DIR_NAME) == []
+    assert sorted(os.listdir(failed)) == ["crash.error.txt", "crash.pdf"]
+    assert "BrokenProcessPool" in (failed / "crash.error.txt").read_text()
+    assert os.listdir(output / watch.DONE_DIR_NAME) == ["good.pdf"]
+    assert os.listdir(output / "good")
+    assert not (output / "crash").exists()
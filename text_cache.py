@@ -0,0 +1,238 @@
+"""
+Persistent per-page text cache shared by addQR.py, split.py and the other tools
+Text extracted from a page region is stored on disk keyed by the SHA-256 of
+the source file, the PyMuPDF version, the extraction mode and the region,
+so a later run over the same PDF (by any tool) reads the text instead of
+parsing the page again.
+There is one cache file per (document, region): a header, a fixed-size
+index of (offset, length) per page and the UTF-8 texts. Files are read
+through mmap, so only the pages looked up are paged in. The cache directory
+is kept under its size limit by removing the least recently used files.
+
+Settings (environment variables):
+    PRELIST_TEXT_CACHE=0          disable the cache
+    PRELIST_TEXT_CACHE_DIR=path   cache directory (default ~/.cache/prelist/text)
+    PRELIST_TEXT_CACHE_MB=256     size limit of the cache directory
+"""
+import hashlib
+import mmap
+import os
+import struct
+
+from manifest import file_sha256
+from run_log import RunStats, get_logger
+
+log = get_logger("text_cache")
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "prelist", "text")
+DEFAULT_CACHE_MB = 256
+
+# Cache file layout: HEADER, page_count x ENTRY, texts
+MAGIC = b"PLTXT01\0"
+HEADER = struct.Struct("<8sI")  # magic, page count
+ENTRY = struct.Struct("<QI")  # offset of the text, length in bytes
+MISSING = 0xFFFFFFFF  # length of a page not cached yet
+CACHE_SUFFIX = ".txc"
+
+# Extraction mode of pdf_text.region_text, changing it invalidates the cache
+TEXT_MODE = "baseline"
+
+# New text kept in memory per file before it is merged into the file
+FLUSH_BYTES = 8 * 1024 * 1024
+
+def cache_enabled() -> bool:
+    return os.environ.get("PRELIST_TEXT_CACHE", "1") != "0"
+
+def cache_dir() -> str:
+    return os.environ.get("PRELIST_TEXT_CACHE_DIR") or DEFAULT_CACHE_DIR
+
+def cache_max_bytes() -> int:
+    return int(os.environ.get("PRELIST_TEXT_CACHE_MB", DEFAULT_CACHE_MB)) * 1024 * 1024
+
+class RegionCacheFile:
+    """Texts of one region of every page of one document, read via mmap"""
+
+    def __init__(self, path: str, page_count: int):
+        self.path = path
+        self.page_count = page_count
+        self.new = {}  # page index -> encoded text not written yet
+        self.new_bytes = 0
+        self.map = None
+        self._open()
+
+    def _open(self):
+        try:
+            with open(self.path, "rb") as f:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (FileNotFoundError, ValueError):
+            return
+        except OSError as e:
+            log.debug(f"Text cache: cannot read {self.path}: {e}")
+            return
+        index_end = HEADER.size + self.page_count * ENTRY.size
+        if len(data) < index_end or HEADER.unpack_from(data) != (MAGIC, self.page_count):
+            data.close()
+            return
+        self.map = data
+        # Recently used files are the last to be evicted
+        try:
+            os.utime(self.path)
+        except OSError:
+            pass
+
+    def _entry(self, index: int) -> tuple[int, int] | None:
+        """(offset, length) of a stored page text, None if not stored"""
+        if self.map is None:
+            return None
+        offset, length = ENTRY.unpack_from(self.map, HEADER.size + index * ENTRY.size)
+        if length == MISSING or offset + length > len(self.map):
+            return None
+        return offset, length
+
+    def _stored(self, index: int) -> bytes | None:
+        entry = self._entry(index)
+        if entry is None:
+            return None
+        offset, length = entry
+        return self.map[offset:offset + length]
+
+    def get(self, index: int) -> str | None:
+        data = self.new.get(index)
+        if data is None:
+            data = self._stored(index)
+        return data.decode("utf-8", "surrogatepass") if data is not None else None
+
+    def put(self, index: int, text: str):
+        data = text.encode("utf-8", "surrogatepass")
+        self.new[index] = data
+        self.new_bytes += len(data)
+        if self.new_bytes >= FLUSH_BYTES:
+            self.flush()
+
+    def flush(self):
+        """
+        Merge the new texts with the stored ones into a new file (atomic
+        rename); stored texts are copied one page at a time.
+        """
+        if not self.new:
+            return
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            lengths = []
+            for index in range(self.page_count):
+                if index in self.new:
+                    lengths.append(len(self.new[index]))
+                else:
+                    entry = self._entry(index)
+                    lengths.append(entry[1] if entry else None)
+
+            with open(tmp_path, "wb") as f:
+                f.write(HEADER.pack(MAGIC, self.page_count))
+                offset = HEADER.size + self.page_count * ENTRY.size
+                for length in lengths:
+                    f.write(ENTRY.pack(offset, length) if length is not None else ENTRY.pack(0, MISSING))
+                    offset += length or 0
+                for index, length in enumerate(lengths):
+                    if length is not None:
+                        f.write(self.new[index] if index in self.new else self._stored(index))
+            self.close()
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            # Best effort: a full disk or a file in use only costs the cache
+            log.debug(f"Text cache: cannot write {self.path}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+        finally:
+            self.new = {}
+            self.new_bytes = 0
+        self._open()
+
+    def close(self):
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+
+class DocumentTextCache:
+    """
+    Page-text cache of one document (see pdf_text.region_text). Lookups are
+    counted in stats as text_cache_hits / text_cache_misses. close() writes
+    the new texts and trims the cache directory to its size limit.
+    """
+
+    def __init__(self, doc_hash: str, page_count: int, stats: RunStats = None, directory: str = None):
+        self.doc_hash = doc_hash
+        self.page_count = page_count
+        self.stats = stats or RunStats()
+        self.directory = directory or cache_dir()
+        self.files = {}
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _file(self, region: tuple | None) -> RegionCacheFile:
+        import fitz
+        cache_file = self.files.get(region)
+        if cache_file is None:
+            key = hashlib.sha256(f"{self.doc_hash}|{fitz.VersionBind}|{TEXT_MODE}|{region}".encode()).hexdigest()[:40]
+            cache_file = RegionCacheFile(os.path.join(self.directory, key + CACHE_SUFFIX), self.page_count)
+            self.files[region] = cache_file
+        return cache_file
+
+    def get(self, index: int, region: tuple | None) -> str | None:
+        """Cached text of one page region (None: whole page), None on a miss"""
+        text = self._file(region).get(index)
+        self.stats.count("text_cache_hits" if text is not None else "text_cache_misses")
+        return text
+
+    def put(self, index: int, region: tuple | None, text: str):
+        self._file(region).put(index, text)
+
+    def close(self):
+        for cache_file in self.files.values():
+            cache_file.flush()
+            cache_file.close()
+        self.files = {}
+        evict(self.directory, cache_max_bytes())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def evict(directory: str, max_bytes: int) -> int:
+    """Remove least recently used cache files until the directory fits max_bytes; returns files removed"""
+    files = []
+    for entry in os.scandir(directory):
+        if entry.name.endswith(CACHE_SUFFIX):
+            stat = entry.stat()
+            files.append((stat.st_mtime, stat.st_size, entry.path))
+    total = sum(size for _, size, _ in files)
+    removed = 0
+    for _, size, path in sorted(files):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+        removed += 1
+    return removed
+
+def open_text_cache(pdf_file: str, page_count: int, stats: RunStats = None,
+                    file_hash: str = None) -> DocumentTextCache | None:
+    """
+    Text cache of pdf_file, or None when the cache is disabled. file_hash
+    may be the file's SHA-256 if the caller already computed it.
+    """
+    if not cache_enabled():
+        return None
+    stats = stats or RunStats()
+    if file_hash is None:
+        with stats.stage("hash"):
+            file_hash = file_sha256(pdf_file)
+    try:
+        return DocumentTextCache(file_hash, page_count, stats)
+    except OSError as e:
+        log.debug(f"Text cache disabled: {e}")
+        return None
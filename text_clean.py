@@ -0,0 +1,167 @@
+"""
+Shared cleaning engine for QR payloads (addQR.py) and split filenames (split.py)
+All patterns are compiled once per vocabulary (Cleaner); keywords and
+headers are removed in list order, exactly as the original str.replace loops
+did. The module-level functions use the built-in vocabulary.
+"""
+import re
+
+# Identity keywords, in priority order: the first one found on the page wins
+POSSIBLE_KEYWORDS = [
+    'Identitas Blok Sensus',
+    'Identitas SLS',
+    'IDENTITAS SAMPEL SATUAN LINGKUNGAN SETEMPAT',
+    'IDENTITAS SAMPEL BLOK SENSUS',
+    'Identitas',
+]
+
+# Common headers and labels removed from the payload
+REMOVE_STRINGS = [
+    "SERUTI24.DSRT", "DAFTAR SAMPEL RUMAH TANGGA", "RAHASIA",
+    "BLOK I. IDENTITAS SAMPEL BLOK SENSUS", "1. Provinsi",
+    "2. Kabupaten/Kota", "3. Kecamatan", "4. Desa/Kelurahan",
+    "5. Klasifikasi Desa/Kelurahan", "7. Nomor Kode Sampel (NKS)Perkotaan",
+    "BLOK II. KETERANGAN PETUGAS", "Nama Pencacah",
+    "Pedesaan", "Perkotaan", "Nomor Blok Sensus", "Tgl. Pelaksanaan",
+    "Tanda Tangan", "Nama Pengawas", "BLOK III. CATATAN",
+    "SURVEI EKONOMI RUMAH TANGGA TRIWULANAN 2024", "Triwulan 2",
+    "BLOK I. IDENTITAS SAMPEL SATUAN LINGKUNGAN SETEMPAT",
+    "6. Kode SLS/Sub-SLS", "8. Satuan Lingkungan Setempat (SLS)",
+    "BLOK II. REKAPITULASI HASIL PEMUTAKHIRAN",
+    "BLOK III. KETERANGAN PETUGAS", "BLOK IV. CATATAN",
+    "Identitas Blok Sensus", "Identitas SLS",
+    "SURVEI SOSIAL EKONOMI NASIONAL 2020",
+    "DAFTAR PEMUTAKHIRAN RUMAH TANGGA", "Sumber Data : DTSEN",
+    "SAMPEL SERUTI", "BLOK I.", "BLOK II.", "BLOK III.", "BLOK IV.",
+    "Kabupaten/Kota *)", "Desa/Kelurahan *)", "*) Coret yang tidak perlu"
+]
+
+def remove_all(text: str, strings: tuple[str, ...]) -> str:
+    """
+    Remove the literal strings one after the other, in list order. The order
+    matters: removing one string can join the text around it into a later
+    one ("Nomor Blok PedesaanSensus" -> "Nomor Blok Sensus" -> ""), and an
+    earlier string wins over a later one that overlaps it ("SERUTI24.DSRT"
+    before "SAMPEL SERUTI"). Strings absent from the text cost one C-level
+    scan each.
+    """
+    for s in strings:
+        if s in text:
+            text = text.replace(s, "")
+    return text
+
+# Identity fields parsed for the export (export.py): field -> label pattern.
+# Labels may carry their item number ("1. Provinsi") and a "*)" footnote mark.
+# Form profiles may change the label patterns, not the field names.
+IDENTITY_FIELDS = {
+    "provinsi": r"Provinsi",
+    "kabupaten_kota": r"Kabupaten/Kota",
+    "kecamatan": r"Kecamatan",
+    "desa": r"Desa/Kelurahan",
+    "kode_sampel": r"Nomor Kode Sampel \(NKS\)\s*(?:Perkotaan|Pedesaan)?|Kode SLS/Sub-SLS|Nomor Blok Sensus",
+}
+
+def normalize_spaces(text: str) -> str:
+    """Collapse all whitespace (including newlines) into single spaces"""
+    return ' '.join(text.split())
+
+# "PAPUA 43" -> name "PAPUA", code "43"
+_NAME_CODE_RE = re.compile(r"^(.*?)\s*(\d+)$")
+
+class Cleaner:
+    """
+    Cleaning engine for one form vocabulary (see form_profiles.py): the
+    keyword list, header strings and identity field labels are compiled
+    once here, so every page is cleaned with prebuilt patterns.
+    """
+
+    def __init__(self, keywords: list[str], remove_strings: list[str], fields: dict[str, str]):
+        self.keywords = list(keywords)
+        self.remove_strings = list(remove_strings)
+        self.fields = dict(fields)
+        self._keywords_lower = [(keyword, keyword.lower()) for keyword in self.keywords]
+        self._keyword_tuple = tuple(self.keywords)
+        self._remove_tuple = tuple(self.remove_strings)
+        self._field_re = re.compile(
+            r"^(?:\d+\.\s*)?(?:" + "|".join(f"(?P<{field}>{label})" for field, label in self.fields.items())
+            + r")\s*(?:\*\))?\s*:?\s*(?P<value>.*)$", re.IGNORECASE)
+
+    def select_identity_lines(self, text: str) -> tuple[list[str], str | None]:
+        """
+        Return the lines containing the highest-priority keyword present in the
+        text (case-insensitive) and that keyword, or ([], None) if none is found.
+        Keywords absent from the whole page are rejected without a line scan.
+        """
+        lowered = text.lower()
+        for keyword, keyword_lower in self._keywords_lower:
+            if keyword_lower in lowered:
+                lines = [line for line in text.splitlines() if keyword_lower in line.lower()]
+                if lines:
+                    return lines, keyword
+        return [], None
+
+    def strip_keywords(self, text: str) -> str:
+        """Remove all identity keywords (case-sensitive, in list order)"""
+        return remove_all(text, self._keyword_tuple)
+
+    def strip_headers(self, text: str) -> str:
+        """Normalize spaces, remove all header strings in list order, normalize again"""
+        return normalize_spaces(remove_all(normalize_spaces(text), self._remove_tuple))
+
+    def identity_text(self, page_text: str) -> str:
+        """
+        Text of the identity page that goes into the QR code: the keyword lines
+        without the keywords, or the whole page if no keyword is found.
+        """
+        lines, _ = self.select_identity_lines(page_text)
+        if lines:
+            return self.strip_keywords("\n".join(lines))
+        return page_text
+
+    def build_qr_payload(self, page_text: str) -> str:
+        """Full cleaning pipeline; returns "" when nothing is left"""
+        return self.strip_headers(self.identity_text(page_text))
+
+    def parse_identity_fields(self, page_text: str) -> dict[str, str]:
+        """
+        Structured identity of an identity page: provinsi, kabupaten_kota,
+        kecamatan and desa (each with a kode_* column for the trailing area
+        code) and kode_sampel (NKS, SLS or census block number). The keyword
+        lines are read first, then the other lines; missing fields are "".
+        """
+        lines, _ = self.select_identity_lines(page_text)
+        candidates = [self.strip_keywords(line) for line in lines] + page_text.splitlines()
+
+        values = {}
+        for line in candidates:
+            match = self._field_re.match(normalize_spaces(line))
+            if not match or not match.group("value"):
+                continue
+            field = next(name for name in self.fields if match.group(name))
+            values.setdefault(field, match.group("value"))
+            if len(values) == len(self.fields):
+                break
+
+        fields = {}
+        for field in IDENTITY_COLUMNS:
+            value = values.get(field, "")
+            if field == "kode_sampel":
+                fields[field] = value
+                continue
+            match = _NAME_CODE_RE.match(value)
+            fields[field], fields[f"kode_{field}"] = match.groups() if match else (value, "")
+        return fields
+
+# Fields every vocabulary provides (export columns)
+IDENTITY_COLUMNS = list(IDENTITY_FIELDS)
+
+# Built-in vocabulary (2024 SERUTI/SUSENAS forms); the module-level functions
+# below use it, other forms get their own Cleaner through form_profiles.py
+DEFAULT_CLEANER = Cleaner(POSSIBLE_KEYWORDS, REMOVE_STRINGS, IDENTITY_FIELDS)
+
+select_identity_lines = DEFAULT_CLEANER.select_identity_lines
+strip_keywords = DEFAULT_CLEANER.strip_keywords
+strip_headers = DEFAULT_CLEANER.strip_headers
+identity_text = DEFAULT_CLEANER.identity_text
+build_qr_payload = DEFAULT_CLEANER.build_qr_payload
+parse_identity_fields = DEFAULT_CLEANER.parse_identity_fields
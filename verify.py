@@ -0,0 +1,298 @@
+"""
+QR verification pass for stamped PDFs (output of addQR.py)
+Renders only the QR rectangle of every stamped page at low DPI
+(page.get_pixmap(clip=...)), decodes it offline with OpenCV and compares
+the result with the payload recorded at generation time (or, for an
+existing file, the payload rebuilt from its text the same way addQR.py
+builds it). Pages are verified in batches by a pool of worker processes,
+each opening the file independently. Also reports QR rectangles that
+overlap page text or other images, or leave the page.
+
+OpenCV is optional for the other tools: pip install opencv-python-headless
+
+Usage:
+    python3 verify.py input_qr.pdf [--jobs 4] [--json report.json]
+"""
+import argparse
+import json
+import math
+import os
+import time
+
+from addQR import qr_module_count, qr_rect
+from form_profiles import get_form_profile, profile_clips, profile_names, resolve_form_profile
+from pdf_text import (CLIP_PROFILES, extract_identity_text, extract_page_texts, extract_page_texts_parallel,
+                      find_marker_pages)
+from run_log import RunStats, get_logger, setup_logging
+from text_cache import open_text_cache
+
+log = get_logger("verify")
+
+# Render resolution: each QR is rendered at the lowest DPI giving
+# PIXELS_PER_MODULE pixels per module for its expected version (long
+# fallback payloads make dense codes), but never below min_dpi. A code that
+# does not decode is rendered once more at RETRY_SCALE x that DPI.
+DEFAULT_DPI = 72
+PIXELS_PER_MODULE = 4.5
+RETRY_SCALE = 1.5
+
+# Quiet zone (border) of the stamped codes, in modules (see addQR.new_qr_code)
+QUIET_ZONE = 4
+
+# Pages per task sent to a worker process
+BATCH_SIZE = 64
+
+# OpenCV and numpy, imported by require_decoder() when a file is verified,
+# so importing this module (e.g. batch.py without --verify) stays cheap
+cv2 = None
+np = None
+
+def require_decoder():
+    global cv2, np
+    if cv2 is None:
+        try:
+            import cv2 as cv2_module
+            import numpy as np_module
+        except ImportError:
+            raise ImportError("QR verification needs OpenCV: pip install opencv-python-headless") from None
+        cv2, np = cv2_module, np_module
+
+def make_detector():
+    """Aruco-based detector where available (OpenCV >= 4.8, faster), else the classic one"""
+    if hasattr(cv2, "QRCodeDetectorAruco"):
+        return cv2.QRCodeDetectorAruco()
+    return cv2.QRCodeDetector()
+
+def render_clip(page: "fitz.Page", rect: "fitz.Rect", dpi: int):
+    """Grayscale image of one page rectangle as a numpy array"""
+    import fitz
+    pix = page.get_pixmap(clip=rect, dpi=dpi, colorspace=fitz.csGRAY, alpha=False)
+    return np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.stride)[:, :pix.width]
+
+def overlap_kinds(page: "fitz.Page", rect: "fitz.Rect") -> list[str]:
+    """What the QR rectangle collides with: "outside" the page, page "text" or another "image" """
+    import fitz
+    kinds = []
+    if not page.rect.contains(rect):
+        kinds.append("outside")
+    if page.get_text("words", clip=rect):
+        kinds.append("text")
+    for info in page.get_image_info():
+        bbox = fitz.Rect(info["bbox"])
+        # The stamped QR itself covers exactly the QR rectangle
+        is_qr = all(abs(a - b) < 1 for a, b in zip(bbox, rect))
+        if not is_qr and bbox.intersects(rect):
+            kinds.append("image")
+            break
+    return kinds
+
+def render_dpi(modules: int, rect: "fitz.Rect", min_dpi: int) -> int:
+    """Lowest DPI resolving `modules` QR modules across rect"""
+    return max(min_dpi, math.ceil(PIXELS_PER_MODULE * modules * 72 / rect.width))
+
+def decode_image(detector, image, modules: int) -> str | None:
+    """
+    Decode a rendered QR rectangle. The symbol is expected at its stamped
+    position (inside a 4-module quiet zone), so it is first decoded from
+    those corners without the costly detection step; if that fails (e.g.
+    the code is shifted) the whole image is searched.
+    """
+    height, width = image.shape
+    border = QUIET_ZONE / modules
+    x0, y0, x1, y1 = border * width, border * height, (1 - border) * width, (1 - border) * height
+    corners = np.array([[[x0, y0], [x1, y0], [x1, y1], [x0, y1]]], dtype=np.float32)
+    try:
+        text, _ = detector.decode(image, corners)
+    except cv2.error:
+        text = ""
+    if not text:
+        text, _, _ = detector.detectAndDecode(image)
+    return text or None
+
+def _verify_batch(task: tuple[str, list[tuple[int, str]], dict, int]) -> list[dict]:
+    """Worker: decode the QR rectangle of each (0-based page, expected payload) in the batch"""
+    import fitz
+    require_decoder()
+    pdf_file, pages, qr, min_dpi = task
+    # Parallelism comes from the worker processes
+    cv2.setNumThreads(1)
+    detector = make_detector()
+    results = []
+
+    with fitz.open(pdf_file) as pdf_doc:
+        for page_num, payload in pages:
+            page = pdf_doc[page_num]
+            rect = qr_rect(page, qr)
+            modules = qr_module_count(payload)
+            dpi = render_dpi(modules, rect, min_dpi)
+            render_time = decode_time = 0.0
+            for scale in (1, RETRY_SCALE):
+                start = time.perf_counter()
+                image = render_clip(page, rect, round(dpi * scale))
+                render_time += time.perf_counter() - start
+
+                start = time.perf_counter()
+                decoded = decode_image(detector, image, modules)
+                decode_time += time.perf_counter() - start
+                if decoded is not None:
+                    break
+
+            results.append({"page": page_num, "decoded": decoded, "retried": scale != 1,
+                            "overlap": overlap_kinds(page, rect), "render": render_time, "decode": decode_time})
+
+    return results
+
+def expected_payloads(pdf_file: str, marker: str = None, clip_profile: str = None,
+                      jobs: int = 1, form_profile: str = None) -> dict[int, str]:
+    """
+    Payloads addQR.py stamps on pdf_file: {1-based marker page: payload},
+    rebuilt from the text of the (stamped or original) document with the
+    same form profile handling as embed_qr_codes_in_pdf.
+    """
+    import fitz
+    with fitz.open(pdf_file) as pdf_doc:
+        profile = resolve_form_profile(pdf_doc, form_profile)
+        marker = marker or profile.marker
+        clips = profile_clips(profile, form_profile, clip_profile)
+        marker_region = clips["marker"] if clips else None
+        cache = open_text_cache(pdf_file, pdf_doc.page_count)
+
+        try:
+            if jobs > 1:
+                page_texts = extract_page_texts_parallel(pdf_file, jobs, pdf_doc.page_count, marker_region, cache)
+            else:
+                page_texts = extract_page_texts(pdf_doc, marker_region, cache)
+
+            expected = {}
+            for page_num in find_marker_pages(page_texts, marker):
+                # addQR.py skips a marker on the last page
+                if page_num + 1 >= len(page_texts):
+                    continue
+                if clips:
+                    text = extract_identity_text(pdf_doc[page_num + 1], clips, profile.cleaner, cache)
+                else:
+                    text = page_texts[page_num + 1]
+                expected[page_num + 1] = profile.cleaner.build_qr_payload(text.strip()) or "NO_DATA"
+        finally:
+            if cache is not None:
+                cache.close()
+
+    return expected
+
+def verify_stamped_pdf(pdf_file: str, expected: dict[int, str] = None, qr: dict = None,
+                       marker: str = None, clip_profile: str = None, jobs: int = 1,
+                       min_dpi: int = DEFAULT_DPI, batch_size: int = BATCH_SIZE, stats: RunStats = None,
+                       form_profile: str = None) -> dict:
+    """
+    Decode the QR code of every stamped page of pdf_file and compare it with
+    expected ({1-based page: payload}, e.g. from the marker_pages/payloads of
+    embed_qr_codes_in_pdf; rebuilt from the text when None).
+    Batches of batch_size pages are decoded by `jobs` worker processes;
+    each QR is rendered at the lowest DPI (at least min_dpi) that resolves
+    its modules. The QR placement, marker and vocabulary come from the form
+    profile (see embed_qr_codes_in_pdf); qr keys and marker override it.
+    Returns a report dict: checked/ok counts, mismatches, undecoded pages,
+    overlaps and the run statistics (verify_* stages and qr_* counters).
+    """
+    import fitz
+    require_decoder()
+    stats = stats or RunStats()
+    start = time.perf_counter()
+
+    if form_profile == "auto":
+        # Detected once; the expected payloads then use the same profile
+        with fitz.open(pdf_file) as pdf_doc:
+            form_profile = resolve_form_profile(pdf_doc, form_profile).name
+    qr = {**get_form_profile(form_profile).qr, **(qr or {})}
+
+    if expected is None:
+        with stats.stage("extract"):
+            expected = expected_payloads(pdf_file, marker, clip_profile, jobs, form_profile)
+
+    pages = [(page - 1, expected[page]) for page in sorted(expected)]
+    tasks = [(pdf_file, pages[i:i + batch_size], qr, min_dpi) for i in range(0, len(pages), batch_size)]
+
+    if jobs > 1 and len(tasks) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            batches = list(executor.map(_verify_batch, tasks))
+    else:
+        batches = [_verify_batch(task) for task in tasks]
+
+    mismatches = []
+    undecoded = []
+    overlaps = []
+    for result in (result for batch in batches for result in batch):
+        page = result["page"] + 1
+        stats.add_time("verify_render", result["render"])
+        stats.add_time("verify_decode", result["decode"])
+        stats.count("qr_verified")
+        if result["retried"]:
+            stats.count("qr_retried")
+        if result["overlap"]:
+            stats.count("qr_overlap")
+            overlaps.append({"page": page, "kinds": result["overlap"]})
+            log.warning(f"  ! Page {page}: QR overlaps {', '.join(result['overlap'])}")
+        if result["decoded"] is None:
+            stats.count("qr_undecoded")
+            undecoded.append(page)
+            log.warning(f"  ✗ Page {page}: QR code could not be decoded")
+        elif result["decoded"] != expected[page]:
+            stats.count("qr_mismatch")
+            mismatches.append({"page": page, "expected": expected[page], "decoded": result["decoded"]})
+            log.warning(f"  ✗ Page {page}: QR decodes to '{result['decoded'][:50]}', "
+                        f"expected '{expected[page][:50]}'")
+
+    seconds = time.perf_counter() - start
+    checked = len(pages)
+    ok = checked - len(mismatches) - len(undecoded)
+    log.info(f"✓ {ok}/{checked} QR code(s) verified in {seconds:.2f}s "
+             f"({len(mismatches)} mismatch(es), {len(undecoded)} undecoded, {len(overlaps)} overlap(s))")
+
+    return {"file": pdf_file, "checked": checked, "ok": ok, "passed": ok == checked,
+            "mismatches": mismatches, "undecoded": undecoded, "overlaps": overlaps,
+            "seconds": seconds, "stats": stats.to_dict()}
+
+def main(argv: list[str] = None) -> int:
+    """Command line entry point, returns the process exit code"""
+    parser = argparse.ArgumentParser(description="Decode and check the QR codes of stamped PDFs")
+    parser.add_argument("inputs", nargs="+", help="stamped PDF files (*_qr.pdf)")
+    parser.add_argument("--marker", help="marker text (default: the form profile's marker)")
+    parser.add_argument("--qr-size", type=float, help="QR size in points (default: the form profile's)")
+    parser.add_argument("--qr-x", type=float, help="QR x position in points")
+    parser.add_argument("--qr-y", type=float, help="QR y position from the bottom")
+    parser.add_argument("--clip-profile", choices=sorted(CLIP_PROFILES),
+                        help="clip profile used when the QR codes were stamped")
+    parser.add_argument("--form-profile", choices=profile_names(),
+                        help="form profile used when the QR codes were stamped ('auto' detects it)")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1,
+                        help="worker processes decoding batches (default: CPU count)")
+    parser.add_argument("--min-dpi", type=int, default=DEFAULT_DPI,
+                        help=f"lowest render resolution, dense codes use more (default: {DEFAULT_DPI})")
+    parser.add_argument("--json", help="write the verification reports to this file")
+    parser.add_argument("--log-level", choices=["DEBUG", "INFO", "WARNING", "ERROR"], default="INFO")
+    args = parser.parse_args(argv)
+
+    setup_logging(args.log_level)
+    qr = {key: value for key, value in (("size", args.qr_size), ("x", args.qr_x), ("y", args.qr_y))
+          if value is not None}
+    reports = []
+    for pdf_file in args.inputs:
+        log.info(f"Verifying {pdf_file}...")
+        report = verify_stamped_pdf(pdf_file, qr=qr, marker=args.marker, clip_profile=args.clip_profile,
+                                    jobs=args.jobs, min_dpi=args.min_dpi, form_profile=args.form_profile)
+        stats = RunStats()
+        stats.merge(report["stats"])
+        stats.log_summary(log)
+        reports.append(report)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(reports, f, indent=2, ensure_ascii=False)
+        log.info(f"✓ Report written to {args.json}")
+
+    return 0 if all(report["passed"] for report in reports) else 2
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,286 @@
+"""
+Watch-folder service: continuous QR/split processing of an inbox directory
+Polls the inbox, waits until a dropped PDF has stopped changing (debounce),
+queues it to a bounded pool of worker processes running the same stages as
+batch.py, and moves the result: outputs to the output folder, the original
+to output/_inputs, or the original plus an error note to the failed folder.
+The queue is bounded: while all workers are busy and the queue is full, no
+more files are claimed (they simply wait in the inbox). Ctrl+C / SIGTERM
+stops claiming new files and lets the running documents finish.
+If a worker process dies (crash, out of memory) the pool is replaced and
+the documents it was running are retried one by one in isolated processes:
+only the document that kills its worker goes to the failed folder.
+
+Usage:
+    python3 watch.py qr-split inbox/ -o output/ --failed failed/ [--jobs 2] [--once]
+"""
+import argparse
+import asyncio
+import os
+import signal
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from batch import (add_processing_arguments, output_folder_for, output_snapshot, process_pdf, process_pdf_isolated,
+                   processing_options, remove_partial_outputs)
+from run_log import get_logger, setup_logging
+from split import unique_output_path
+
+log = get_logger("watch")
+
+# Claimed files are moved here (inside the inbox, so the move is atomic)
+WORK_DIR_NAME = ".processing"
+
+# Originals of successfully processed files, inside the output folder
+DONE_DIR_NAME = "_inputs"
+
+def is_candidate(name: str) -> bool:
+    """PDF files only; hidden, temporary and partial files are ignored"""
+    return (name.lower().endswith(".pdf") and not name.startswith((".", "~"))
+            and not name.lower().endswith(("_qr.pdf", ".part.pdf")))
+
+def move_unique(path: str, folder: str) -> str:
+    """Move path into folder without overwriting (adds _1, _2, ...), returns the new path"""
+    os.makedirs(folder, exist_ok=True)
+    base = os.path.splitext(os.path.basename(path))[0]
+    _, target = unique_output_path(folder, base)
+    os.replace(path, target)
+    return target
+
+def ignore_sigint():
+    """Worker initializer: Ctrl+C is handled by the service, not by running jobs"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+class WatchFolder:
+    """
+    One inbox served by `jobs` worker processes.
+    Files are debounced: a file is queued once its size and mtime have not
+    changed for `settle` seconds. At most `queue_size` files wait for a
+    worker; the poller blocks while the queue is full (backpressure).
+    """
+
+    def __init__(self, mode: str, inbox: str, output: str, failed: str, options: dict,
+                 jobs: int = 2, queue_size: int = None, poll_interval: float = 2.0, settle: float = 5.0):
+        self.mode = mode
+        self.inbox = os.path.abspath(inbox)
+        self.output = os.path.abspath(output)
+        self.failed = os.path.abspath(failed)
+        self.work = os.path.join(self.inbox, WORK_DIR_NAME)
+        self.done = os.path.join(self.output, DONE_DIR_NAME)
+        self.options = dict(options, output=self.output)
+        self.jobs = max(1, jobs)
+        self.queue_size = queue_size or self.jobs * 2
+        self.poll_interval = poll_interval
+        self.settle = settle
+
+        self.candidates = {}  # path -> ((size, mtime_ns), time first seen with that signature)
+        self.pending = set()  # queued or running paths (not queued again)
+        self.counts = {"ok": 0, "failed": 0}
+        self.stopping = None
+        self.queue = None
+        self.pool = None
+
+    def new_pool(self) -> ProcessPoolExecutor:
+        """Worker pool; replaced when a dead worker breaks it"""
+        return ProcessPoolExecutor(max_workers=self.jobs, initializer=ignore_sigint)
+
+    def stop(self):
+        """Stop claiming new files; running documents are finished"""
+        if not self.stopping.is_set():
+            log.info("Stopping: waiting for running documents to finish...")
+            self.stopping.set()
+
+    def recover(self):
+        """Move files left in the work folder by an interrupted run back to the inbox"""
+        if not os.path.isdir(self.work):
+            return
+        for name in os.listdir(self.work):
+            path = os.path.join(self.work, name)
+            if os.path.isfile(path) and is_candidate(name):
+                log.warning(f"Recovering interrupted file: {name}")
+                move_unique(path, self.inbox)
+
+    def ready_files(self, debounce: bool = True) -> list[str]:
+        """Inbox files whose size and mtime have been stable for settle seconds, oldest first"""
+        now = time.monotonic()
+        seen = {}
+        ready = []
+
+        for entry in os.scandir(self.inbox):
+            if not entry.is_file() or not is_candidate(entry.name) or entry.path in self.pending:
+                continue
+            stat = entry.stat()
+            signature = (stat.st_size, stat.st_mtime_ns)
+            previous = self.candidates.get(entry.path)
+            since = previous[1] if previous and previous[0] == signature else now
+            seen[entry.path] = (signature, since)
+            if stat.st_size > 0 and (not debounce or now - since >= self.settle):
+                ready.append((stat.st_mtime_ns, entry.path))
+
+        # Forget files that disappeared or were queued
+        self.candidates = seen
+        return [path for _, path in sorted(ready)]
+
+    async def enqueue(self, path: str) -> bool:
+        """Put path on the queue, waiting while it is full; False if stopping first"""
+        put = asyncio.ensure_future(self.queue.put(path))
+        stop = asyncio.ensure_future(self.stopping.wait())
+        await asyncio.wait({put, stop}, return_when=asyncio.FIRST_COMPLETED)
+        stop.cancel()
+        if not put.done():
+            put.cancel()
+            return False
+        self.pending.add(path)
+        self.candidates.pop(path, None)
+        return True
+
+    async def poll(self, once: bool = False):
+        """Queue ready inbox files until stopped (or once, without debounce)"""
+        while not self.stopping.is_set():
+            for path in self.ready_files(debounce=not once):
+                if not await self.enqueue(path):
+                    return
+            if once:
+                return
+            try:
+                await asyncio.wait_for(self.stopping.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def worker(self):
+        """Take files from the queue until the None sentinel"""
+        while True:
+            path = await self.queue.get()
+            try:
+                if path is None:
+                    return
+                await self.process(path)
+            except Exception as e:
+                log.error(f"✗ {os.path.basename(path)}: {type(e).__name__}: {e}")
+            finally:
+                self.pending.discard(path)
+                self.queue.task_done()
+
+    async def process(self, path: str):
+        """Claim one inbox file, run the stage in the pool and move the results"""
+        name = os.path.basename(path)
+        os.makedirs(self.work, exist_ok=True)
+        work_path = os.path.join(self.work, name)
+        try:
+            os.replace(path, work_path)
+        except FileNotFoundError:
+            return  # removed from the inbox after it was queued
+
+        loop = asyncio.get_running_loop()
+        pool = self.pool
+        snapshot = output_snapshot(self.mode, work_path, self.options)
+        try:
+            result = await loop.run_in_executor(pool, process_pdf, self.mode, work_path, self.options)
+        except BrokenProcessPool:
+            # Every document running in the pool gets here, not only the one
+            # that killed its worker: the first replaces the pool, each retries
+            # alone so that only the culprit fails
+            if self.pool is pool:
+                log.warning("✗ A worker process died, restarting the worker pool")
+                self.pool = self.new_pool()
+                pool.shutdown(wait=False)
+            remove_partial_outputs(self.mode, work_path, self.options, snapshot)
+            result = await loop.run_in_executor(None, process_pdf_isolated, self.mode, work_path, self.options,
+                                                ignore_sigint)
+
+        if result["ok"]:
+            if self.mode == "qr":
+                # addQR writes next to its input: move <name>_qr.pdf (and its manifest)
+                for output_file in result["outputs"]:
+                    move_unique(output_file, self.output)
+                manifest_file = os.path.splitext(result["outputs"][0])[0] + ".manifest.json"
+                if os.path.exists(manifest_file):
+                    os.replace(manifest_file, os.path.join(self.output, os.path.basename(manifest_file)))
+            move_unique(work_path, self.done)
+            self.counts["ok"] += 1
+            log.info(f"✓ {name} ({result['pages']} page(s), {result['seconds']:.1f}s) "
+                     f"{len(result['outputs'])} output(s)")
+        else:
+            # Drop the empty per-input output folder created before the failure
+            output_folder = output_folder_for(work_path, self.options)
+            if os.path.isdir(output_folder) and not os.listdir(output_folder):
+                os.rmdir(output_folder)
+            # Outputs that exist (e.g. a stamped file that failed verification)
+            # go to the failed folder as well
+            for output_file in result["outputs"]:
+                if os.path.exists(output_file):
+                    move_unique(output_file, self.failed)
+            failed_path = move_unique(work_path, self.failed)
+            with open(os.path.splitext(failed_path)[0] + ".error.txt", "w", encoding="utf-8") as f:
+                f.write(f"{result['error']}\n")
+            self.counts["failed"] += 1
+            log.error(f"✗ {name}: {result['error']}")
+
+    async def run(self, once: bool = False):
+        """
+        Serve the inbox until stop() is called (or, with once=True, until every
+        file currently in the inbox is processed). Returns the ok/failed counts.
+        """
+        self.stopping = asyncio.Event()
+        self.queue = asyncio.Queue(maxsize=self.queue_size)
+        for folder in (self.inbox, self.output, self.failed):
+            os.makedirs(folder, exist_ok=True)
+        self.recover()
+
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, self.stop)
+            except (NotImplementedError, RuntimeError):
+                pass  # Windows / not the main thread: KeyboardInterrupt ends the run
+
+        log.info(f"Watching {self.inbox} ({self.mode}, {self.jobs} worker(s), queue {self.queue_size})")
+        self.pool = self.new_pool()
+        try:
+            workers = [asyncio.create_task(self.worker()) for _ in range(self.jobs)]
+
+            await self.poll(once)
+            if once:
+                await self.queue.join()
+
+            # Queued but unclaimed files stay in the inbox for the next run
+            while not self.queue.empty():
+                self.pending.discard(self.queue.get_nowait())
+                self.queue.task_done()
+            for _ in workers:
+                await self.queue.put(None)
+            await asyncio.gather(*workers)
+        finally:
+            self.pool.shutdown()
+
+        log.info(f"Stopped: {self.counts['ok']} processed, {self.counts['failed']} failed")
+        return dict(self.counts)
+
+def main(argv: list[str] = None) -> int:
+    """Command line entry point, returns the process exit code"""
+    parser = argparse.ArgumentParser(description="Watch an inbox folder and process every PDF dropped into it")
+    add_processing_arguments(parser)
+    parser.add_argument("inbox", help="folder to watch")
+    parser.add_argument("-o", "--output", required=True, help="folder for outputs (originals go to _inputs/)")
+    parser.add_argument("--failed", required=True, help="folder for inputs that could not be processed")
+    parser.add_argument("-j", "--jobs", type=int, default=2, help="worker processes (default: 2)")
+    parser.add_argument("--queue-size", type=int, help="files waiting for a worker (default: 2 x jobs)")
+    parser.add_argument("--poll", type=float, default=2.0, help="seconds between inbox scans (default: 2)")
+    parser.add_argument("--settle", type=float, default=5.0,
+                        help="seconds a file must stay unchanged before it is processed (default: 5)")
+    parser.add_argument("--once", action="store_true", help="process the files now in the inbox and exit")
+    args = parser.parse_args(argv)
+
+    setup_logging("INFO")
+    # Per-document messages come from the workers at --log-level (default WARNING)
+    service = WatchFolder(args.mode, args.inbox, args.output, args.failed, processing_options(args, args.output),
+                          jobs=args.jobs, queue_size=args.queue_size, poll_interval=args.poll, settle=args.settle)
+    try:
+        counts = asyncio.run(service.run(once=args.once))
+    except KeyboardInterrupt:
+        return 130
+    return 0 if counts["failed"] == 0 else 2
+
+if __name__ == "__main__":
+    raise SystemExit(main())